@@ -0,0 +1 @@
+# Scripts de mesure de performance (lancés à la main : python -m benchmarks.<script>).
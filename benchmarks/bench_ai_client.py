@@ -0,0 +1,104 @@
+"""
+Charge le client IA partagé contre le modèle local (utils.fake_gemini) : latence des appels interactifs
+sous charge de fond, puis comportement du disjoncteur pendant une panne du backend.
+
+    python -m benchmarks.bench_ai_client --interactive 60 --batch 120 --latency 0.2
+    python -m benchmarks.bench_ai_client --outage-seconds 3 --failure-rate 1.0
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+
+from utils.ai_client import AIClient, AIUnavailableError, FallbackResponse, INTERACTIVE, BATCH
+from utils.ai_accounting import AI_ACCOUNTING
+from utils.fake_gemini import StubGenerativeModel
+
+CONFIG = {
+    "MAX_CONCURRENCY": 4, "MAX_BATCH_CONCURRENCY": 2,
+    "TIMEOUT_SECONDS": {"interactive": 5, "batch": 30},
+    "MAX_ATTEMPTS": 3, "BACKOFF_BASE_SECONDS": 0.05, "BACKOFF_MAX_SECONDS": 0.5,
+    "BREAKER_FAILURE_THRESHOLD": 5, "BREAKER_RESET_SECONDS": 1.0,
+    "FALLBACKS": {"assistant": "{\"response_type\": \"escalate\"}"},
+}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+async def _call(client: AIClient, feature: str, priority: str, latencies, outcomes):
+    start = time.perf_counter()
+    try:
+        response = await client.generate("Question de test sur les produits.", feature=feature, priority=priority)
+        outcomes[priority, "repli" if isinstance(response, FallbackResponse) else "ok"] += 1
+    except AIUnavailableError:
+        outcomes[priority, "indisponible"] += 1
+    latencies[priority].append(time.perf_counter() - start)
+
+
+async def load_phase(client: AIClient, interactive: int, batch: int, duration: float, rng: random.Random):
+    """Appels interactifs et de fond répartis uniformément sur `duration` secondes."""
+    latencies, outcomes = defaultdict(list), Counter()
+    calls = [(INTERACTIVE, "assistant")] * interactive + [(BATCH, "coaching")] * batch
+    schedule = sorted((rng.uniform(0, duration), priority, feature) for priority, feature in calls)
+    start = time.perf_counter()
+    tasks = []
+    for at, priority, feature in schedule:
+        await asyncio.sleep(max(0.0, at - (time.perf_counter() - start)))
+        tasks.append(asyncio.create_task(_call(client, feature, priority, latencies, outcomes)))
+    await asyncio.gather(*tasks)
+    return latencies, outcomes
+
+
+def _report(title: str, latencies, outcomes, client: AIClient, model: StubGenerativeModel):
+    print(f"\n{title}")
+    for priority in (INTERACTIVE, BATCH):
+        values = latencies.get(priority, [])
+        if values:
+            print(f"  {priority:<12} {len(values):>5} appels  p50 {_percentile(values, 0.5) * 1000:7.0f} ms  "
+                  f"p95 {_percentile(values, 0.95) * 1000:7.0f} ms  max {max(values) * 1000:7.0f} ms")
+    print(f"  Issues : {dict(sorted(outcomes.items()))}")
+    print(f"  Modèle : {dict(model.counters)}, concurrence max observée {model.max_in_flight}")
+    print(f"  Disjoncteur : {client.breaker.state}, déclenché {client.breaker.trips} fois")
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    model = StubGenerativeModel(latency=args.latency, jitter=args.latency / 2, seed=args.seed)
+    client = AIClient(model)
+    client.configure(CONFIG)
+
+    latencies, outcomes = await load_phase(client, args.interactive, args.batch, args.duration, rng)
+    _report("Backend sain", latencies, outcomes, client, model)
+
+    model.failure_rate = args.failure_rate
+    model.counters.clear()
+    latencies, outcomes = await load_phase(client, args.interactive // 2, 0, args.outage_seconds, rng)
+    _report(f"Panne du backend ({args.failure_rate:.0%} d'erreurs)", latencies, outcomes, client, model)
+
+    model.failure_rate = 0.0
+    model.counters.clear()
+    await asyncio.sleep(CONFIG["BREAKER_RESET_SECONDS"])
+    latencies, outcomes = await load_phase(client, args.interactive // 2, 0, args.duration / 2, rng)
+    _report("Rétablissement", latencies, outcomes, client, model)
+    print()
+    print(AI_ACCOUNTING.report())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interactive", type=int, default=60)
+    parser.add_argument("--batch", type=int, default=120)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--outage-seconds", type=float, default=3.0)
+    parser.add_argument("--failure-rate", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compare le calcul des commissions par achat (CommissionEngine.commission) et vectorisé (batch_commissions).
+
+    python -m benchmarks.bench_commission --pairs 100000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from utils.commission import CommissionEngine, NUMPY_AVAILABLE
+
+
+def _iso(now: datetime, days: float) -> str:
+    return (now + timedelta(days=days)).isoformat()
+
+
+def _referrers(count: int, rng: random.Random):
+    """Instantanés de parrains variés : VIP expirés ou non, boosters, bonus de guilde."""
+    now = datetime.now(timezone.utc)
+    for _ in range(count):
+        data = {"level": rng.randint(1, 60)}
+        if rng.random() < 0.3:
+            data["vip_premium"] = {"expires_at": _iso(now, rng.uniform(-5, 5)), "consecutive_months": rng.randint(1, 4)}
+        if rng.random() < 0.2:
+            data["permanent_affiliate_bonus"] = True
+        if rng.random() < 0.2:
+            data["active_boosters"] = {"commission_booster_1": {"expires_at": _iso(now, rng.uniform(-2, 2)), "bonus": 0.10}}
+        if rng.random() < 0.15:
+            data["guild_bonus"] = rng.choice([{"type": "top1"}, {"type": "top2", "commission_boost": 0.20, "max_commission_rate": 0.90}])
+        yield data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=100000)
+    parser.add_argument("--referrers", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with open('config.json', 'r', encoding='utf-8') as f:
+        engine = CommissionEngine(json.load(f))
+    rng = random.Random(args.seed)
+    referrers = list(_referrers(args.referrers, rng))
+    pairs = [(rng.randrange(len(referrers)), round(rng.uniform(1, 80), 2)) for _ in range(args.pairs)]
+    product = {"margin_type": "total"}
+
+    start = time.perf_counter()
+    scalar = [engine.commission(referrers[index], price, product) for index, price in pairs]
+    scalar_seconds = time.perf_counter() - start
+    print(f"Par achat  : {args.pairs} commissions en {scalar_seconds * 1000:.0f} ms ({args.pairs / scalar_seconds:,.0f}/s)")
+
+    if not NUMPY_AVAILABLE:
+        print("numpy non installé : calcul vectorisé ignoré.")
+        return
+    start = time.perf_counter()
+    profiles = [engine.profile(data) for data in referrers]
+    batch = engine.batch_commissions([profiles[index] for index, _ in pairs], [price for _, price in pairs])
+    batch_seconds = time.perf_counter() - start
+    difference = max(abs(a - b) for a, b in zip(scalar, batch))
+    print(f"Vectorisé  : {args.pairs} commissions en {batch_seconds * 1000:.0f} ms ({args.pairs / batch_seconds:,.0f}/s), "
+          f"x{scalar_seconds / batch_seconds:.1f}, écart max {difference:.2e}")
+
+
+if __name__ == "__main__":
+    main()
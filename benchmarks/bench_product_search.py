@@ -0,0 +1,77 @@
+"""
+Mesure la latence de l'autocomplétion /produit sur un catalogue synthétique (délai Discord : 3 s).
+
+    python -m benchmarks.bench_product_search --products 20000 --queries 5000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from utils.product_search import ProductSearchIndex
+
+PRODUCTS_FILE = 'products.json'
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _synthetic_catalogue(base: list, size: int, rng: random.Random) -> list:
+    """Duplique le catalogue réel en variant ids, noms et tags pour atteindre `size` produits."""
+    words = sorted({w for p in base for w in p.get('name', '').split() if len(w) > 2})
+    products = []
+    for i in range(size):
+        source = base[i % len(base)]
+        extra = rng.sample(words, 2)
+        products.append({
+            "id": f"{source['id']}-{i}",
+            "name": f"{source.get('name', '')} {' '.join(extra)} #{i}",
+            "tags": source.get('tags', []) + [w.lower() for w in extra],
+        })
+    return products
+
+
+def _queries(products: list, count: int, rng: random.Random) -> dict:
+    names = [p['name'].split() for p in products]
+    typo = lambda w: w[:len(w) // 2] + w[len(w) // 2 + 1:] if len(w) > 4 else w
+    return {
+        "préfixe court": [rng.choice(rng.choice(names))[:2] for _ in range(count)],
+        "préfixe long": [rng.choice(rng.choice(names))[:6] for _ in range(count)],
+        "plusieurs mots": [" ".join(rng.choice(names)[:2]) for _ in range(count)],
+        "id exact": [rng.choice(products)['id'] for _ in range(count)],
+        "faute de frappe": [typo(max(rng.choice(names), key=len)) for _ in range(count)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with open(PRODUCTS_FILE, 'r', encoding='utf-8') as f:
+        products = _synthetic_catalogue(json.load(f), args.products, rng)
+
+    index = ProductSearchIndex()
+    start = time.perf_counter()
+    index.build(products)
+    print(f"Construction : {args.products} produits en {time.perf_counter() - start:.2f} s, {index.stats()}")
+
+    for label, queries in _queries(products, args.queries, rng).items():
+        latencies, empty = [], 0
+        for query in queries:
+            t0 = time.perf_counter()
+            results = index.search(query, limit=25)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            empty += not results
+        print(f"{label:>16} : p50 {statistics.median(latencies):.3f} ms, p99 {_percentile(latencies, 0.99):.3f} ms, "
+              f"max {max(latencies):.3f} ms, sans résultat {empty}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Mesure le débit de rendu des cartes de profil (cartes/seconde).
+
+    python -m benchmarks.bench_profile_card --cards 200 --workers 2
+"""
+import argparse
+import asyncio
+import io
+import json
+import statistics
+import time
+
+from utils.profile_card import IMAGING_AVAILABLE, ProfileCardRenderer, render_profile_card
+
+CONFIG_FILE = 'config.json'
+
+
+def _make_avatar(seed: int) -> bytes:
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (256, 256), ((seed * 37) % 256, (seed * 91) % 256, (seed * 53) % 256)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class _FakeAsset:
+    def __init__(self, key: str, data: bytes):
+        self.key = key
+        self._data = data
+
+    def replace(self, **kwargs):
+        return self
+
+    async def read(self) -> bytes:
+        return self._data
+
+
+class _FakeMember:
+    def __init__(self, user_id: int, avatar: bytes):
+        self.id = user_id
+        self.display_name = f"Membre {user_id}"
+        self.display_avatar = _FakeAsset(f"a_{user_id}", avatar)
+
+
+def _user_data(i: int) -> dict:
+    return {"level": 1 + i % 55, "xp": 1000 + i * 17, "store_credit": i * 0.5, "affiliate_earnings": i * 0.25}
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def bench_inline(renderer: ProfileCardRenderer, cards: int, distinct_users: int) -> dict:
+    avatars = [_make_avatar(i) for i in range(distinct_users)]
+    durations = []
+    start = time.perf_counter()
+    for i in range(cards):
+        uid = i % distinct_users
+        data = _user_data(uid)
+        _, seconds = render_profile_card({
+            "display_name": f"Membre {uid}", "level": data["level"], "xp": data["xp"], "xp_needed": 5000,
+            "store_credit": data["store_credit"], "affiliate_earnings": data["affiliate_earnings"],
+            "palette": renderer.palette_for_level(data["level"]),
+            "avatar_key": f"{uid}:a_{uid}", "avatar_bytes": avatars[uid],
+        })
+        durations.append(seconds * 1000)
+    elapsed = time.perf_counter() - start
+    return {"cards_per_second": cards / elapsed, "p50_ms": statistics.median(durations), "p95_ms": _percentile(durations, 0.95)}
+
+
+async def bench_pool(renderer: ProfileCardRenderer, cards: int, distinct_users: int) -> dict:
+    members = [_FakeMember(uid, _make_avatar(uid)) for uid in range(distinct_users)]
+    await renderer.render(members[0], _user_data(0), 5000)  # démarrage des workers hors mesure
+
+    latencies = []
+
+    async def one(i: int):
+        uid = i % distinct_users
+        t0 = time.perf_counter()
+        await renderer.render(members[uid], _user_data(uid), 5000)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(cards)))
+    elapsed = time.perf_counter() - start
+    return {"cards_per_second": cards / elapsed, "p50_ms": statistics.median(latencies), "p95_ms": _percentile(latencies, 0.95)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--users", type=int, default=50, help="Nombre d'utilisateurs distincts (réutilisation des caches).")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    if not IMAGING_AVAILABLE:
+        raise SystemExit("Pillow n'est pas installé.")
+
+    with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+        card_config = json.load(f).get("PROFILE_CARD_CONFIG", {})
+
+    renderer = ProfileCardRenderer(card_config, max_workers=args.workers)
+    try:
+        inline = bench_inline(renderer, args.cards, args.users)
+        print(f"Rendu direct (1 processus) : {inline['cards_per_second']:.1f} cartes/s, p50 {inline['p50_ms']:.1f} ms, p95 {inline['p95_ms']:.1f} ms")
+        pooled = asyncio.run(bench_pool(renderer, args.cards, args.users))
+        print(f"Pool ({args.workers} processus)   : {pooled['cards_per_second']:.1f} cartes/s, p50 {pooled['p50_ms']:.1f} ms, p95 {pooled['p95_ms']:.1f} ms")
+        print(f"Métriques du renderer : {renderer.stats()}")
+    finally:
+        renderer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Mesure l'empreinte mémoire et la latence de l'index de rang des classements.
+
+    python -m benchmarks.bench_rank_index --users 100000 --updates 20000
+"""
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+
+from utils.leaderboards import LEADERBOARD_KEYS, LeaderboardCache
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _user_rows(users: int, rng: random.Random):
+    base_id = 10 ** 17  # ordre de grandeur des identifiants Discord
+    for i in range(users):
+        yield base_id + i, {
+            "xp": rng.randint(1, 500000), "weekly_xp": rng.randint(0, 20000),
+            "store_credit": round(rng.uniform(0, 300), 2),
+            "weekly_affiliate_earnings": round(rng.uniform(0, 50), 2) if rng.random() < 0.2 else 0,
+            "affiliate_earnings": round(rng.uniform(0, 900), 2) if rng.random() < 0.3 else 0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    rows = list(_user_rows(args.users, rng))
+    cache = LeaderboardCache(LEADERBOARD_KEYS, max_users=max(args.users, 1))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    cache.begin_seed()
+    for uid, data in rows:
+        cache.add_seed_row(uid, data)
+    cache.finish_seed()
+    seed_seconds = time.perf_counter() - start
+    traced, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = cache.stats()
+    print(f"Reconstruction : {args.users} utilisateurs en {seed_seconds:.2f} s, tailles {stats['sizes']}")
+    print(f"Mémoire : ~{stats['memory_bytes'] / 1_048_576:.1f} Mo estimés, {traced / 1_048_576:.1f} Mo mesurés (tracemalloc)")
+
+    update_ms, rank_ms = [], []
+    for _ in range(args.updates):
+        uid, data = rows[rng.randrange(len(rows))]
+        data["xp"] += rng.randint(1, 50)
+        t0 = time.perf_counter()
+        cache.publish(uid, "xp", data["xp"])
+        update_ms.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        cache.rank_of("xp", uid)
+        rank_ms.append((time.perf_counter() - t0) * 1000)
+
+    print(f"Mise à jour : p50 {statistics.median(update_ms):.4f} ms, p99 {_percentile(update_ms, 0.99):.4f} ms")
+    print(f"Rang : p50 {statistics.median(rank_ms):.4f} ms, p99 {_percentile(rank_ms, 0.99):.4f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""
+Simulateur d'économie hors ligne : XP, niveaux, achats, parrainages, commissions et retraits d'une population
+de membres sur plusieurs semaines, avec les règles de GAMIFICATION_CONFIG appliquées colonne par colonne (NumPy).
+Sert à régler la configuration avant de la déployer (courbe de niveaux, paliers de commission, seuils de retrait).
+
+    python -m benchmarks.economy_simulator --users 100000 --weeks 10
+    python -m benchmarks.economy_simulator --population users.jsonl --weeks 52
+    python -m benchmarks.economy_simulator --set GAMIFICATION_CONFIG.XP_SYSTEM.LEVEL_UP_FORMULA_MULTIPLIER=1.5
+    python -m benchmarks.economy_simulator --event double_xp=2 --event commission_boost_10=4
+
+`--population` : export JSONL des documents `users` (avec leur `id`) ; l'activité de chaque membre est déduite
+de son historique (messages et achats par semaine d'ancienneté). Sinon la population est générée : activité
+log-normale, achats de Poisson sur le catalogue products.json, abonnements VIP hebdomadaires.
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from utils.commission import CommissionEngine, parse_expiry
+
+WEEK_SECONDS = 7 * 86400
+MAX_LEVEL = 200
+
+
+def apply_overrides(config: Dict[str, Any], assignments: List[str]) -> Dict[str, Any]:
+    """`CHEMIN.VERS.CLE=valeur` (valeur JSON, ou texte brut) appliqués à la configuration chargée."""
+    for assignment in assignments:
+        path, _, raw = assignment.partition("=")
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        *parents, key = path.split(".")
+        node = config
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = value
+    return config
+
+
+def tier_lookup(tiers: List[Dict[str, Any]], key: str, value: str, keys: np.ndarray, default: float) -> np.ndarray:
+    """Valeur du plus haut palier atteint par chaque clé (`default` sous le premier palier)."""
+    ordered = sorted(tiers, key=lambda tier: tier.get(key, 999))
+    thresholds = np.asarray([tier.get(key, 999) for tier in ordered], dtype=np.int64)
+    table = np.asarray([default] + [tier.get(value, 0) for tier in ordered], dtype=np.float64)
+    return table[np.searchsorted(thresholds, keys, side="right")]
+
+
+def build_catalog(products: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Optional[float]]:
+    """
+    (prix, coût déduit de la commission, probabilité de tirage, prix de l'abonnement VIP) : chaque produit a le même poids,
+    réparti entre ses options. Le coût n'est déduit que pour les produits à marge nette (comme commissionable_amount).
+    """
+    prices, costs, weights = [], [], []
+    subscription = None
+    for product in products:
+        if product.get("type") == "subscription":
+            subscription = product.get("price", 0)
+            continue
+        net = product.get("margin_type", "total") == "net"
+        entries = product.get("options") or [product]
+        for entry in entries:
+            price = entry.get("price", 0)
+            if price <= 0:
+                continue
+            prices.append(price)
+            costs.append(entry.get("purchase_cost", 0) if net else 0.0)
+            weights.append(1 / len(entries))
+    weights = np.asarray(weights)
+    return np.asarray(prices, dtype=np.float64), np.asarray(costs, dtype=np.float64), weights / weights.sum(), subscription
+
+
+class Population:
+    """Colonnes d'état des membres ; la capacité inclut les arrivées prévues, seuls les `size` premiers existent."""
+
+    def __init__(self, capacity: int):
+        self.size = 0
+        self.xp = np.zeros(capacity, dtype=np.int64)
+        self.level = np.ones(capacity, dtype=np.int64)
+        self.credit = np.zeros(capacity, dtype=np.float64)
+        self.earnings = np.zeros(capacity, dtype=np.float64)
+        self.referrer = np.full(capacity, -1, dtype=np.int64)
+        self.joined_week = np.zeros(capacity, dtype=np.int64)
+        self.vip_months = np.zeros(capacity, dtype=np.int64)  # consecutive_months : renouvellements consécutifs
+        self.vip_active = np.zeros(capacity, dtype=bool)
+        self.vip_ever = np.zeros(capacity, dtype=bool)         # document vip_premium présent, même expiré
+        self.loyalty = np.zeros(capacity, dtype=bool)
+        self.affiliate_booster = np.zeros(capacity, dtype=np.float64)
+        self.lvl5_rewarded = np.zeros(capacity, dtype=bool)
+        self.messages_rate = np.zeros(capacity, dtype=np.float64)
+        self.purchase_rate = np.zeros(capacity, dtype=np.float64)
+
+    def add(self, count: int, week: int, args: argparse.Namespace, rng: np.random.Generator) -> slice:
+        """Nouveaux membres : activité tirée au hasard, une part parrainée par un membre existant."""
+        start, existing = self.size, self.size
+        self.size += count
+        new = slice(start, self.size)
+        sigma = args.activity_sigma
+        self.messages_rate[new] = rng.lognormal(np.log(args.messages) - sigma ** 2 / 2, sigma, count)
+        self.purchase_rate[new] = rng.gamma(0.5, args.purchases / 0.5, count)
+        self.joined_week[new] = week
+        referred = rng.random(count) < args.referred
+        if existing:
+            self.referrer[new] = np.where(referred, rng.integers(0, existing, count), -1)
+        else:  # population initiale : parrain parmi les membres générés avant
+            positions = np.arange(count)
+            self.referrer[new] = np.where(referred & (positions > 0), (rng.random(count) * positions).astype(np.int64), -1)
+        return new
+
+    @classmethod
+    def generate(cls, users: int, capacity: int, args: argparse.Namespace, rng: np.random.Generator) -> 'Population':
+        population = cls(capacity)
+        new = population.add(users, 0, args, rng)
+        vip = rng.random(users) < args.vip_share
+        population.vip_active[new] = population.vip_ever[new] = vip
+        population.vip_months[new] = np.where(vip, rng.integers(1, 9, users), 0)
+        population.loyalty[new] = rng.random(users) < args.loyalty_share
+        return population
+
+    @classmethod
+    def load(cls, path: str, capacity_factor: float, now: float) -> 'Population':
+        with open(path, 'r', encoding='utf-8') as f:
+            docs = [json.loads(line) for line in f if line.strip()]
+        index = {str(doc.get("id")): position for position, doc in enumerate(docs)}
+        population = cls(int(len(docs) * capacity_factor) + 1)
+        population.size = len(docs)
+        for position, doc in enumerate(docs):
+            age_weeks = max(1.0, (now - doc.get("join_timestamp", now)) / WEEK_SECONDS)
+            vip = doc.get("vip_premium") or {}
+            population.xp[position] = doc.get("xp", 0)
+            population.level[position] = doc.get("level", 1)
+            population.credit[position] = doc.get("store_credit", 0.0)
+            population.earnings[position] = doc.get("affiliate_earnings", 0.0)
+            population.referrer[position] = index.get(str(doc.get("referrer")), -1)
+            population.joined_week[position] = -int(age_weeks)
+            population.vip_ever[position] = bool(vip)
+            population.vip_active[position] = parse_expiry(vip.get("expires_at")) > now
+            population.vip_months[position] = vip.get("consecutive_months", 0)
+            population.loyalty[position] = bool(doc.get("permanent_affiliate_bonus", False))
+            population.affiliate_booster[position] = doc.get("affiliate_booster", 0.0)
+            population.lvl5_rewarded[position] = bool(doc.get("lvl5_milestone_rewarded", False))
+            population.messages_rate[position] = doc.get("message_count", 0) / age_weeks
+            population.purchase_rate[position] = doc.get("purchase_count", 0) / age_weeks
+        return population
+
+
+class EconomySimulator:
+    """Une semaine = un pas vectorisé : messages, achats, commissions, arrivées, niveaux, paliers de parrainage, retraits."""
+
+    def __init__(self, config: Dict[str, Any], products: List[Dict[str, Any]], args: argparse.Namespace, rng: np.random.Generator):
+        self.config = config
+        self.args = args
+        self.rng = rng
+        gamification = config.get("GAMIFICATION_CONFIG", {})
+        self.xp_config = gamification.get("XP_SYSTEM", {})
+        self.cashout_config = gamification.get("CASHOUT_SYSTEM", {})
+        self.cashout_commission = gamification.get("AFFILIATE_SYSTEM", {}).get("CASHOUT_COMMISSION", {})
+        self.xp_boost_tiers = gamification.get("VIP_SYSTEM", {}).get("PREMIUM", {}).get("XP_BOOST_TIERS", [])
+        self.engine = CommissionEngine(config)
+        self.events = {event["id"]: event for event in config.get("EVENTS_CONFIG", {}).get("AVAILABLE_EVENTS", [])}
+        self.prices, self.costs, self.weights, self.subscription_price = build_catalog(products)
+
+        # Seuils cumulés de check_level_up : niveau = 1 + nombre de niveaux L >= 1 tels que xp >= xp_needed_for_level(L)
+        base = self.xp_config.get("LEVEL_UP_FORMULA_BASE_XP", 150)
+        multiplier = self.xp_config.get("LEVEL_UP_FORMULA_MULTIPLIER", 1.6)
+        self.level_thresholds = np.floor(base * multiplier ** np.arange(1, MAX_LEVEL + 1, dtype=np.float64))
+        low, high = self.xp_config.get("XP_PER_MESSAGE", [10, 20])
+        self.message_range = np.arange(low, high + 1)
+        self.max_messages = WEEK_SECONDS // max(1, self.xp_config.get("ANTI_FARM_COOLDOWN_SECONDS", 60))
+
+    def levels(self, xp: np.ndarray) -> np.ndarray:
+        return 1 + np.searchsorted(self.level_thresholds, xp, side="right")
+
+    def xp_multipliers(self, p: Population, n: int, event_multiplier: float) -> np.ndarray:
+        """Multiplicateur de grant_xp : bonus VIP actif selon consecutive_months, puis événement double XP."""
+        boost = np.where(p.vip_active[:n], tier_lookup(self.xp_boost_tiers, "consecutive_months", "boost", p.vip_months[:n], 0.0), 0.0)
+        return (1.0 + boost) * event_multiplier
+
+    @staticmethod
+    def granted(members: np.ndarray, amounts: np.ndarray, multipliers: np.ndarray, n: int) -> np.ndarray:
+        """XP reçue par membre pour des gains (members[i], amounts[i]) : int(xp * boost * événement) par gain, comme grant_xp."""
+        gains = np.floor(amounts * multipliers[members])
+        return np.bincount(members, gains, minlength=n).astype(np.int64)
+
+    def message_xp(self, messages: np.ndarray, multipliers: np.ndarray) -> np.ndarray:
+        """
+        XP de `messages` messages par membre : chaque message vaut int(randint(XP_PER_MESSAGE) * multiplicateur).
+        Somme tirée par approximation normale, avec la moyenne et la variance exactes d'un message.
+        """
+        distinct, inverse = np.unique(multipliers, return_inverse=True)
+        gains = np.floor(np.outer(distinct, self.message_range))
+        mean, std = gains.mean(axis=1)[inverse], gains.std(axis=1)[inverse]
+        noise = self.rng.standard_normal(len(messages)) * std * np.sqrt(messages)
+        return np.maximum(0, np.rint(messages * mean + noise)).astype(np.int64)
+
+    def active_events(self, week: int) -> Dict[str, Dict[str, Any]]:
+        return {event_id: self.events.get(event_id, {}) for event_id, weeks in self.args.event_weeks.items() if week + 1 in weeks}
+
+    def step(self, p: Population, week: int, now: float) -> Dict[str, float]:
+        rng, args = self.rng, self.args
+        events = self.active_events(week)
+        self.engine.set_events(events)
+        event_multiplier = events.get("double_xp", {}).get("multiplier", 1.0)
+
+        # Arrivées en début de semaine : invitation vérifiée créditée au parrain
+        existing = p.size
+        new = p.add(min(int(existing * args.growth), len(p.xp) - existing), week, args, rng)
+        n = p.size
+        multipliers = self.xp_multipliers(p, n, event_multiplier)
+        xp_per_invite = self.xp_config.get("XP_PER_VERIFIED_INVITE", 100)
+        inviters = p.referrer[new][p.referrer[new] >= 0]
+        xp_gain = self.granted(inviters, np.full(len(inviters), xp_per_invite), multipliers, n)
+        stats: Dict[str, float] = {"members": n, "joined": n - existing}
+
+        # Messages : au plus un message récompensé par fenêtre anti-farm
+        messages = np.minimum(rng.poisson(p.messages_rate[:n]), self.max_messages)
+        xp_gain += self.message_xp(messages, multipliers)
+        stats["messages"] = messages.sum()
+
+        # Achats du catalogue, puis abonnements VIP (un achat par semaine ; consecutive_months n'est jamais remis à zéro)
+        counts = rng.poisson(p.purchase_rate[:n])
+        buyers = np.repeat(np.arange(n), counts)
+        entries = rng.choice(len(self.prices), size=len(buyers), p=self.weights)
+        prices, costs = self.prices[entries], self.costs[entries]
+        if self.subscription_price:
+            draws = rng.random(n)
+            subscribers = np.flatnonzero(np.where(p.vip_active[:n], draws >= args.vip_churn, draws < args.vip_conversion))
+            p.vip_active[:n] = False
+            p.vip_active[subscribers] = p.vip_ever[subscribers] = True
+            p.vip_months[subscribers] += 1
+            buyers = np.concatenate([buyers, subscribers])
+            prices = np.concatenate([prices, np.full(len(subscribers), self.subscription_price)])
+            costs = np.concatenate([costs, np.zeros(len(subscribers))])
+            multipliers = self.xp_multipliers(p, n, event_multiplier)
+        stats["purchases"] = len(buyers)
+        stats["vip"] = p.vip_active[:n].sum()
+        purchase_xp = np.floor(prices * self.xp_config.get("XP_PER_EURO_SPENT", 20))
+        xp_gain += self.granted(buyers, purchase_xp, multipliers, n)
+
+        spent = np.bincount(buyers, prices, minlength=n)
+        credit_used = np.minimum(p.credit[:n], spent * args.credit_spend)
+        p.credit[:n] -= credit_used
+        stats["revenue"] = spent.sum() - credit_used.sum()
+        stats["credit_spent"] = credit_used.sum()
+
+        # Commissions d'achat : taux du parrain (niveau du début de semaine), évalué une fois par membre
+        rates = self.engine.array_rates(p.level[:n], p.vip_active[:n], p.vip_months[:n],
+                                        p.affiliate_booster[:n] + p.loyalty[:n] * self.engine.loyalty_rate, now=now)
+        referrers = p.referrer[buyers]
+        referred = referrers >= 0
+        amounts = prices[referred] - costs[referred]
+        commissions = np.where(amounts > 0, amounts * rates[referrers[referred]], 0.0)
+        earned = np.bincount(referrers[referred], commissions, minlength=n)
+        p.credit[:n] += earned
+        p.earnings[:n] += earned
+        stats["purchase_commissions"] = commissions.sum()
+
+        p.xp[:n] += xp_gain
+        p.level[:n] = np.maximum(p.level[:n], self.levels(p.xp[:n]))
+
+        # Filleul au niveau 5 dans le délai : bonus d'XP au parrain (une seule fois)
+        limit_days = self.xp_config.get("REFERRAL_LVL_5_DAYS_LIMIT", 7)
+        fast = ((week - p.joined_week[:n]) * 7 < limit_days) & (p.level[:n] >= 5) & (p.referrer[:n] >= 0) & ~p.lvl5_rewarded[:n]
+        p.lvl5_rewarded[:n] |= fast
+        mentors = p.referrer[:n][fast]
+        bonus = np.full(len(mentors), self.xp_config.get("XP_BONUS_REFERRAL_HITS_LVL_5", 2000))
+        p.xp[:n] += self.granted(mentors, bonus, multipliers, n)
+        p.level[:n] = np.maximum(p.level[:n], self.levels(p.xp[:n]))
+
+        stats.update(self.cashouts(p, week, rng))
+        stats["liability"] = p.credit[:n].sum() * self.cashout_config.get("CREDIT_TO_EUR_RATE", 1.0)
+        return stats
+
+    def withdrawal_threshold(self, levels: np.ndarray) -> np.ndarray:
+        return tier_lookup(self.cashout_config.get("WITHDRAWAL_THRESHOLDS", []), "level", "threshold", levels, 1000.0)
+
+    def cashouts(self, p: Population, week: int, rng: np.random.Generator) -> Dict[str, float]:
+        """Retrait de tout le crédit par une part des membres éligibles (niveau, ancienneté, seuil), commission au parrain."""
+        n = p.size
+        if not self.cashout_config.get("ENABLED", True):
+            return {"cashouts": 0, "paid_out": 0.0, "cashout_commissions": 0.0}
+        credit = p.credit[:n]
+        eligible = ((p.level[:n] >= self.cashout_config.get("MINIMUM_LEVEL", 999))
+                    & ((week + 1 - p.joined_week[:n]) * 7 >= self.cashout_config.get("MINIMUM_ACCOUNT_AGE_DAYS", 999))
+                    & (credit > 0) & (credit >= self.withdrawal_threshold(p.level[:n])))
+        cashers = np.flatnonzero(eligible & (rng.random(n) < self.args.cashout))
+        amounts = credit[cashers].copy()
+        credit[cashers] = 0.0
+
+        commissions = 0.0
+        if self.cashout_commission.get("ENABLED", True):
+            referrers = p.referrer[cashers]
+            referred = referrers >= 0
+            rates = np.where(p.vip_ever[referrers[referred]], self.cashout_commission.get("VIP_RATE", 0.05), self.cashout_commission.get("BASE_RATE", 0.05))
+            earned = np.bincount(referrers[referred], amounts[referred] * rates, minlength=n)
+            credit += earned
+            p.earnings[:n] += earned
+            commissions = earned.sum()
+        return {"cashouts": len(cashers), "paid_out": amounts.sum() * self.cashout_config.get("CREDIT_TO_EUR_RATE", 1.0),
+                "cashout_commissions": commissions}
+
+
+def report(simulator: EconomySimulator, p: Population, weekly: List[Dict[str, float]], seconds: float, user_weeks: int):
+    print(f"\n{user_weeks:,} semaines-membres simulées en {seconds:.2f} s ({user_weeks / seconds:,.0f}/s)\n")
+    print(f"{'sem.':>4} {'membres':>9} {'VIP':>7} {'messages':>11} {'achats':>8} {'CA (€)':>11} {'comm. achats':>13} "
+          f"{'retraits':>8} {'versé (€)':>11} {'comm. retraits':>14} {'crédits dus (€)':>16}")
+    for week, stats in enumerate(weekly, 1):
+        print(f"{week:>4} {stats['members']:>9,} {stats['vip']:>7,} {stats['messages']:>11,} {stats['purchases']:>8,} {stats['revenue']:>11,.0f} "
+              f"{stats['purchase_commissions']:>13,.0f} {stats['cashouts']:>8,} {stats['paid_out']:>11,.0f} "
+              f"{stats['cashout_commissions']:>14,.0f} {stats['liability']:>16,.0f}")
+
+    n = p.size
+    levels, counts = np.unique(p.level[:n], return_counts=True)
+    print("\nDistribution des niveaux")
+    for level, count in zip(levels, counts):
+        share = count / n
+        print(f"  niv. {level:>3} {count:>9,} {share:>7.2%} {'█' * max(1, int(share * 60)) if share >= 0.001 else ''}")
+    print(f"  médiane {np.median(p.level[:n]):.0f}, p90 {np.percentile(p.level[:n], 90):.0f}, max {levels.max()}")
+
+    totals = defaultdict(float)
+    for stats in weekly:
+        for key in ("revenue", "credit_spent", "purchase_commissions", "cashout_commissions", "paid_out"):
+            totals[key] += stats[key]
+    print("\nTotaux")
+    print(f"  Chiffre d'affaires encaissé : {totals['revenue']:,.2f} € (+ {totals['credit_spent']:,.2f} crédits dépensés)")
+    print(f"  Commissions d'achat         : {totals['purchase_commissions']:,.2f} ({totals['purchase_commissions'] / max(totals['revenue'], 1e-9):.1%} du CA)")
+    print(f"  Commissions de retrait      : {totals['cashout_commissions']:,.2f}")
+    print(f"  Retraits versés             : {totals['paid_out']:,.2f} €")
+
+    # Passif : crédits dus, dont ceux que leurs détenteurs peuvent déjà retirer
+    rate = simulator.cashout_config.get("CREDIT_TO_EUR_RATE", 1.0)
+    credit = p.credit[:n]
+    withdrawable = (p.level[:n] >= simulator.cashout_config.get("MINIMUM_LEVEL", 999)) & (credit >= simulator.withdrawal_threshold(p.level[:n]))
+    earners = np.sort(p.earnings[:n])[::-1]
+    top = earners[:max(1, n // 100)].sum() / max(earners.sum(), 1e-9)
+    print(f"  Crédits dus                 : {credit.sum() * rate:,.2f} €, dont {credit[withdrawable].sum() * rate:,.2f} € retirables immédiatement")
+    print(f"  Gains d'affiliation         : 1 % des parrains perçoit {top:.0%} du total")
+
+
+def _event_weeks(values: List[str]) -> Dict[str, set]:
+    weeks: Dict[str, set] = defaultdict(set)
+    for value in values:
+        event_id, _, numbers = value.partition("=")
+        weeks[event_id].update(int(number) for number in numbers.split(",") if number)
+    return weeks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100000, help="taille de la population générée")
+    parser.add_argument("--population", help="export JSONL des documents users à simuler à la place")
+    parser.add_argument("--weeks", type=int, default=10)
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--products", default="products.json")
+    parser.add_argument("--set", action="append", default=[], metavar="CHEMIN=VALEUR", help="surcharge de config.json (valeur JSON)")
+    parser.add_argument("--event", action="append", default=[], metavar="ID=SEMAINES", help="événement EVENTS_CONFIG actif ces semaines (ex: double_xp=2,3)")
+    parser.add_argument("--messages", type=float, default=40.0, help="messages par membre et par semaine (moyenne)")
+    parser.add_argument("--activity-sigma", type=float, default=1.2, help="dispersion log-normale de l'activité")
+    parser.add_argument("--purchases", type=float, default=0.05, help="achats par membre et par semaine (moyenne)")
+    parser.add_argument("--referred", type=float, default=0.4, help="part des membres arrivés par parrainage")
+    parser.add_argument("--growth", type=float, default=0.02, help="nouveaux membres par semaine (part de la population)")
+    parser.add_argument("--vip-share", type=float, default=0.01)
+    parser.add_argument("--vip-conversion", type=float, default=0.002, help="nouveaux abonnés VIP par semaine (part des non-VIP)")
+    parser.add_argument("--vip-churn", type=float, default=0.15, help="abonnés VIP non renouvelés par semaine")
+    parser.add_argument("--loyalty-share", type=float, default=0.02)
+    parser.add_argument("--credit-spend", type=float, default=0.3, help="part des achats réglée en crédits disponibles")
+    parser.add_argument("--cashout", type=float, default=0.3, help="probabilité de retrait par semaine d'un membre éligible")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    args.event_weeks = _event_weeks(args.event)
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = apply_overrides(json.load(f), args.set)
+    with open(args.products, 'r', encoding='utf-8') as f:
+        products = json.load(f)
+    rng = np.random.default_rng(args.seed)
+    now = datetime.now(timezone.utc).timestamp()
+
+    start = time.perf_counter()
+    if args.population:
+        population = Population.load(args.population, (1 + args.growth) ** args.weeks, now)
+    else:
+        population = Population.generate(args.users, int(args.users * (1 + args.growth) ** args.weeks) + 1, args, rng)
+    print(f"Population : {population.size:,} membres ({time.perf_counter() - start:.2f} s)")
+
+    simulator = EconomySimulator(config, products, args, rng)
+    weekly, user_weeks = [], 0
+    start = time.perf_counter()
+    for week in range(args.weeks):
+        user_weeks += population.size
+        weekly.append(simulator.step(population, week, now + week * WEEK_SECONDS))
+    report(simulator, population, weekly, time.perf_counter() - start, user_weeks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Rejoue des flux d'événements gateway (synthétiques ou enregistrés) contre le ManagerCog, branché sur la base
+en mémoire utils.fake_firestore, et mesure débit, latences p50/p95/p99 et opérations base par événement.
+Nécessite les dépendances du bot (discord.py, google-cloud-firestore) mais ni connexion ni identifiants.
+
+Arrivées et latences sont comptées sur l'horloge virtuelle de la base factice : à graine égale, latences,
+conflits et opérations par événement sont reproductibles. Seuls débit et durées mesurent le temps réel (CPU).
+
+    python -m benchmarks.gateway_replay --scenario message_storm --events 5000 --rate 500 --latency 0.01
+    python -m benchmarks.gateway_replay --scenario mixed --record flux.jsonl
+    python -m benchmarks.gateway_replay --replay flux.jsonl --compare
+
+Scénarios : message_storm, join_wave, flash_sale, cashout_burst, mixed. Chaque exécution est ajoutée à
+--results (JSON Lines, avec le commit git) ; --compare la confronte à la précédente du même scénario.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List
+
+from benchmarks.stubs import StubBot, StubGuild, StubMessage, StubInteraction, SENT
+from cogs.manager_cog import ManagerCog
+from utils.fake_firestore import FakeFirestoreClient
+
+RESULTS_FILE = os.path.join('benchmarks', 'results', 'gateway_replay.jsonl')
+SCENARIOS = ("message_storm", "join_wave", "flash_sale", "cashout_burst", "mixed")
+MIX = {"message": 0.85, "join": 0.05, "purchase": 0.07, "cashout": 0.03}
+_WORDS = ("salut", "quelqu'un", "a", "testé", "le", "nouveau", "pack", "netflix", "promo", "livraison", "rapide",
+          "merci", "pour", "les", "conseils", "vendeur", "fiable", "prix", "compte", "premium", "semaine", "stock")
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def synthetic_events(scenario: str, count: int, rate: float, users: int, product_ids: List[str], rng: random.Random) -> List[Dict[str, Any]]:
+    """Flux d'événements sérialisables ; `user` est un indice dans la population (>= users pour une arrivée)."""
+    events, at, next_new_user = [], 0.0, users
+    hot_users = max(1, users // 20)  # 5 % des membres produisent l'essentiel d'une tempête de messages
+    for index in range(count):
+        kind = scenario
+        if scenario == "mixed":
+            kind = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+        kind = {"message_storm": "message", "join_wave": "join", "flash_sale": "purchase", "cashout_burst": "cashout"}.get(kind, kind)
+        event: Dict[str, Any] = {"at": round(at, 6), "type": kind}
+        if kind == "message":
+            event["user"] = rng.randrange(hot_users) if rng.random() < 0.7 else rng.randrange(users)
+            # Quelques copier-coller pour exercer le filtre anti-farm
+            event["content"] = " ".join(rng.choices(_WORDS, k=rng.randint(3, 14))) if rng.random() > 0.1 else "go go go go go"
+        elif kind == "join":
+            event["user"] = next_new_user
+            next_new_user += 1
+        elif kind == "purchase":
+            event["user"] = rng.randrange(users)
+            event["product"] = rng.choice(product_ids)
+            event["credit"] = round(rng.choice((0, 0, 0, 1.5, 5)), 2)
+            event["code"] = f"BENCH-{index}"
+        elif kind == "cashout":
+            event["user"] = rng.randrange(users)
+            event["amount"] = round(rng.uniform(10, 60), 2)
+        events.append(event)
+        if rate > 0:
+            at += rng.expovariate(rate)  # arrivées poissonniennes
+    return events
+
+
+class ReplayEnvironment:
+    """Guilde, bot et ManagerCog factices, population d'utilisateurs pré-remplie dans la base en mémoire."""
+
+    def __init__(self, users: int, latency: float, jitter: float, seed: int):
+        self.db = FakeFirestoreClient(latency=latency, jitter=jitter, seed=seed)
+        with open(ManagerCog.CONFIG_FILE, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        role_names = [name for value in config.get("ROLES", {}).values() for name in (value if isinstance(value, list) else [value])]
+        self.guild = StubGuild(list(config.get("CHANNELS", {}).values()), sorted(set(role_names)))
+        self.bot = StubBot([self.guild])
+        self.manager = ManagerCog(self.bot, db=self.db)
+        self.bot.cogs["ManagerCog"] = self.manager
+        self.users = users
+        self.members: Dict[int, Any] = {}
+        self.rng = random.Random(seed)
+
+    async def start(self):
+        # Pas de cog_load : les tâches de fond (classement hebdomadaire...) fausseraient la mesure
+        await self.manager._load_static_data()
+        self.manager.onboarding.start()
+        now = datetime.now(timezone.utc)
+        writes = []
+        for index in range(self.users):
+            member = self.guild.add_member()
+            self.members[index] = member
+            data = self.manager._default_user_data()
+            data.update({"level": self.rng.randint(5, 30), "xp": self.rng.randint(0, 200000), "store_credit": round(self.rng.uniform(50, 500), 2),
+                         "join_timestamp": (now - timedelta(days=self.rng.randint(10, 400))).timestamp()})
+            if index and self.rng.random() < 0.3:
+                data["referrer"] = str(self.members[self.rng.randrange(index)].id)
+            writes.append(("set", f"users/{member.id}", data, False))
+        for offset in range(0, len(writes), 500):
+            self.db._commit(writes[offset:offset + 500])
+        self.db.counters.clear()
+        SENT.clear()
+
+    def member(self, index: int):
+        member = self.members.get(index)
+        if member is None:
+            member = self.members[index] = self.guild.add_member()
+        return member
+
+    async def handle(self, event: Dict[str, Any]):
+        kind = event["type"]
+        if kind == "message":
+            channel = self.guild.text_channels[0]
+            await self.manager.on_message(StubMessage(event["content"], self.member(event["user"]), channel))
+        elif kind == "join":
+            await self.manager.on_member_join(self.member(event["user"]))
+        elif kind == "purchase":
+            product = self.manager.get_product(event["product"])
+            await self.manager.record_purchase(self.member(event["user"]).id, product, None, event.get("credit", 0), self.guild.id, event["code"])
+        elif kind == "cashout":
+            interaction = StubInteraction(self.member(event["user"]), command_name="retrait")
+            await self.manager.handle_cashout_submission(interaction, str(event["amount"]), "bench@example.com")
+        else:
+            raise ValueError(f"Type d'événement inconnu : {kind}")
+
+    async def close(self):
+        self.manager.onboarding.close()
+
+
+async def replay(environment: ReplayEnvironment, events: List[Dict[str, Any]], speed: float) -> Dict[str, Any]:
+    """
+    Planifie chaque événement à son horodatage virtuel (une tâche par événement, comme le dispatch discord.py).
+    Latences en temps simulé, durées en temps réel.
+    """
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Counter = Counter()
+    clock = environment.db
+    loop = asyncio.get_running_loop()
+    start, wall_start = clock.time(), loop.time()
+
+    async def run(event, scheduled):
+        try:
+            await environment.handle(event)
+        except Exception as e:
+            errors[f"{event['type']}:{type(e).__name__}"] += 1
+        latencies[event["type"]].append(clock.time() - scheduled)  # attente de planification comprise
+
+    tasks = []
+    for event in events:
+        scheduled = start + event["at"] / speed
+        delay = scheduled - clock.time()
+        if delay > 0:
+            await clock.sleep(delay)
+        tasks.append(asyncio.create_task(run(event, scheduled)))
+    await asyncio.gather(*tasks)
+    # Effets différés par ManagerCog.spawn (succès après un achat...) : comptés avec l'événement qui les a lancés
+    background = list(environment.manager.background_tasks)
+    for task, result in zip(background, await asyncio.gather(*background, return_exceptions=True)):
+        if isinstance(result, BaseException):
+            errors[f"{task.get_name().split(':')[0]}:{type(result).__name__}"] += 1
+    handled = loop.time() - wall_start
+    await environment.manager.onboarding.queue.join()  # les arrivées se terminent dans le worker d'accueil
+    return {"latencies": latencies, "errors": errors, "wall_seconds": handled, "drain_seconds": loop.time() - wall_start - handled,
+            "simulated_seconds": clock.time() - start}
+
+
+def summarize(events: List[Dict[str, Any]], outcome: Dict[str, Any], db_counters: Counter) -> Dict[str, Any]:
+    total = len(events)
+    per_type = {}
+    for kind, values in sorted(outcome["latencies"].items()):
+        per_type[kind] = {
+            "events": len(values),
+            "p50_ms": round(statistics.median(values) * 1000, 3),
+            "p95_ms": round(_percentile(values, 0.95) * 1000, 3),
+            "p99_ms": round(_percentile(values, 0.99) * 1000, 3),
+        }
+    return {
+        "events": total,
+        "throughput_eps": round(total / outcome["wall_seconds"], 1) if outcome["wall_seconds"] else None,
+        "wall_seconds": round(outcome["wall_seconds"], 3),
+        "drain_seconds": round(outcome["drain_seconds"], 3),
+        "simulated_seconds": round(outcome["simulated_seconds"], 3),
+        "per_type": per_type,
+        "errors": dict(outcome["errors"]),
+        "db_per_event": {key: round(value / total, 3) for key, value in sorted(db_counters.items())},
+        "outbound": dict(SENT),
+    }
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "inconnu"
+
+
+def _previous_result(path: str, scenario: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    previous = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry.get("scenario") == scenario:
+                previous = entry
+    return previous
+
+
+def _print_comparison(current: Dict[str, Any], previous: Dict[str, Any]):
+    def delta(now, before):
+        return f"{now} (avant {before}, {((now - before) / before * 100):+.1f} %)" if before else f"{now}"
+    print(f"Comparaison avec {previous.get('revision')} du {previous.get('timestamp')} :")
+    print(f"  débit            : {delta(current['throughput_eps'], previous['results'].get('throughput_eps'))} év/s")
+    for kind, stats in current["per_type"].items():
+        before = previous["results"].get("per_type", {}).get(kind, {})
+        print(f"  {kind:<10} p95 : {delta(stats['p95_ms'], before.get('p95_ms'))} ms, p99 : {delta(stats['p99_ms'], before.get('p99_ms'))} ms")
+    for key, value in current["db_per_event"].items():
+        print(f"  {key + '/év':<16} : {delta(value, previous['results'].get('db_per_event', {}).get(key))}")
+
+
+async def _main(args):
+    random.seed(args.seed)  # grant_xp tire ses gains avec le module random
+    rng = random.Random(args.seed)
+    environment = ReplayEnvironment(args.users, args.latency, args.jitter, args.seed)
+    await environment.start()
+
+    if args.replay:
+        with open(args.replay, 'r', encoding='utf-8') as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        scenario = os.path.basename(args.replay)
+    else:
+        product_ids = [p['id'] for p in environment.manager.products if p.get('id') and p.get('type') != 'subscription']
+        events = synthetic_events(args.scenario, args.events, args.rate, args.users, product_ids, rng)
+        scenario = args.scenario
+    if args.record:
+        with open(args.record, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(event, ensure_ascii=False) + "\n" for event in events)
+        print(f"Flux enregistré : {len(events)} événements dans {args.record}")
+
+    output = io.StringIO() if args.quiet else None
+    with contextlib.redirect_stdout(output) if output is not None else contextlib.nullcontext():
+        outcome = await replay(environment, events, args.speed)
+    await environment.close()
+
+    results = summarize(events, outcome, environment.db.counters)
+    entry = {
+        "scenario": scenario, "revision": _git_revision(), "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "params": {k: getattr(args, k) for k in ("events", "rate", "users", "latency", "jitter", "speed", "seed")},
+        "results": results,
+    }
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.compare:
+        previous = _previous_result(args.results, scenario)
+        if previous:
+            _print_comparison(results, previous)
+        else:
+            print("Aucune exécution précédente pour ce scénario.")
+    if results["errors"]:
+        total = sum(results["errors"].values())
+        print(f"❌ {total} événement(s) sur {len(events)} en erreur : mesure invalide, non enregistrée.", file=sys.stderr)
+        sys.exit(1)
+    if args.results:
+        os.makedirs(os.path.dirname(args.results) or ".", exist_ok=True)
+        with open(args.results, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mixed")
+    parser.add_argument("--replay", help="Flux enregistré (JSON Lines) à rejouer au lieu d'un scénario synthétique.")
+    parser.add_argument("--record", help="Enregistre le flux synthétique généré dans ce fichier.")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--rate", type=float, default=500.0, help="Événements par seconde (0 : tous à t=0).")
+    parser.add_argument("--speed", type=float, default=1.0, help="Facteur d'accélération de la relecture.")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.005, help="Latence simulée par aller-retour base (s).")
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--results", default=RESULTS_FILE, help="Historique des exécutions ('' pour ne rien écrire).")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--verbose", dest="quiet", action="store_false", help="Affiche la sortie des cogs.")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
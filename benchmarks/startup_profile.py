@@ -0,0 +1,95 @@
+"""
+Profil du temps d'import au démarrage (python -X importtime) et contrôle de budget.
+
+    python -m benchmarks.startup_profile --top 15
+    python -m benchmarks.startup_profile --budget 2.5   # code de sortie 1 si dépassé
+
+Importe main et tous les cogs dans un interpréteur neuf (meilleur de --runs essais), ventile le temps par
+paquet et vérifie que les SDK chargés à la demande (--lazy) ne sont pas importés au démarrage.
+"""
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+LAZY_MODULES = ("google.generativeai", "PIL", "numpy")
+
+
+def _default_modules() -> List[str]:
+    cogs = sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join('cogs', '*_cog.py')))
+    return ["main"] + [f"cogs.{name}" for name in cogs]
+
+
+def profile_imports(modules: List[str]) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """(durée totale mesurée, [(module, µs propres, µs cumulés)]) pour un interpréteur neuf."""
+    code = "; ".join(f"import {module}" for module in modules)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Échec de l'import : {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else result.returncode}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return elapsed, rows
+
+
+def by_package(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Temps propre cumulé par paquet (deux niveaux pour les espaces de noms comme google.*)."""
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        parts = name.split(".")
+        package = ".".join(parts[:3] if parts[0] == "google" else parts[:1])
+        totals[package] += self_us
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="*", help="Modules à importer (défaut : main et tous les cogs).")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget", type=float, default=float(os.environ.get("STARTUP_IMPORT_BUDGET_SECONDS", 0) or 0),
+                        help="Budget (s) du temps d'import total ; 0 pour désactiver.")
+    parser.add_argument("--lazy", nargs="*", default=list(LAZY_MODULES), help="Modules qui ne doivent pas être importés au démarrage.")
+    args = parser.parse_args()
+
+    modules = args.modules or _default_modules()
+    runs = [profile_imports(modules) for _ in range(args.runs)]
+    elapsed, rows = min(runs, key=lambda run: run[0])  # le meilleur essai écarte le bruit (cache disque, CPU)
+    import_seconds = sum(self_us for _, self_us, _ in rows) / 1e6
+
+    print(f"Import de {len(modules)} module(s) : {import_seconds:.3f} s d'import, {elapsed:.3f} s de processus "
+          f"(meilleur de {args.runs}, {len(rows)} modules chargés)")
+    print("\nPaquets les plus coûteux (temps propre) :")
+    for package, self_us in sorted(by_package(rows).items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {package:<32} {self_us / 1000:>9.1f} ms  {self_us / 1e4 / import_seconds if import_seconds else 0:>5.1f} %")
+    print("\nModules du projet (temps cumulé) :")
+    project = [row for row in rows if row[0] in modules or row[0].startswith(("cogs.", "utils."))]
+    for name, _, cumulative_us in sorted(project, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"  {name:<32} {cumulative_us / 1000:>9.1f} ms")
+
+    failures = []
+    imported = {name for name, _, _ in rows}
+    eager = [module for module in args.lazy if module in imported]
+    if eager:
+        failures.append(f"importés au démarrage alors qu'ils devraient être paresseux : {', '.join(eager)}")
+    if args.budget and import_seconds > args.budget:
+        failures.append(f"temps d'import {import_seconds:.3f} s > budget {args.budget:.3f} s")
+    if failures:
+        for failure in failures:
+            print(f"\n❌ {failure}")
+        sys.exit(1)
+    if args.budget:
+        print(f"\n✅ Dans le budget ({import_seconds:.3f} s ≤ {args.budget:.3f} s)")
+
+
+if __name__ == "__main__":
+    main()
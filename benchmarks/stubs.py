@@ -0,0 +1,190 @@
+"""
+Objets Discord minimaux (membres, salons, messages, interactions, bot) pour exécuter les cogs hors connexion.
+Seuls les attributs et coroutines utilisés par les cogs sont fournis ; les envois sont comptés, jamais émis.
+"""
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+_ids = itertools.count(10 ** 18)
+SENT = Counter()  # appels sortants simulés (messages, rôles, DM), par type
+
+
+class _Asset:
+    url = "https://cdn.discordapp.com/embed/avatars/0.png"
+
+    async def read(self) -> bytes:
+        return b""
+
+
+class StubRole:
+    def __init__(self, name: str, position: int = 1):
+        self.id = next(_ids)
+        self.name = name
+        self.position = position
+        self.mention = f"<@&{self.id}>"
+
+
+class StubMessage:
+    def __init__(self, content: str = "", author: Optional['StubMember'] = None, channel: Optional['StubTextChannel'] = None):
+        self.id = next(_ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild if channel else None
+        self.embeds: List[Any] = []
+        self.created_at = datetime.now(timezone.utc)
+
+    async def edit(self, **kwargs):
+        SENT["message_edit"] += 1
+        return self
+
+    async def delete(self, **kwargs):
+        SENT["message_delete"] += 1
+
+    async def add_reaction(self, emoji):
+        SENT["reaction"] += 1
+
+
+class StubTextChannel:
+    def __init__(self, guild: 'StubGuild', name: str):
+        self.id = next(_ids)
+        self.guild = guild
+        self.name = name
+        self.mention = f"<#{self.id}>"
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> StubMessage:
+        SENT["channel_send"] += 1
+        return StubMessage(content or "", None, self)
+
+
+class _Permissions:
+    manage_guild = True
+    administrator = False
+
+
+class StubMember:
+    def __init__(self, guild: 'StubGuild', member_id: Optional[int] = None, name: Optional[str] = None, bot: bool = False):
+        self.id = member_id or next(_ids)
+        self.guild = guild
+        self.name = name or f"membre{self.id % 100000}"
+        self.display_name = self.name
+        self.global_name = self.name
+        self.mention = f"<@{self.id}>"
+        self.bot = bot
+        self.roles: List[StubRole] = []
+        self.display_avatar = _Asset()
+        self.guild_permissions = _Permissions()
+        self.joined_at = datetime.now(timezone.utc)
+        self.created_at = self.joined_at
+
+    async def add_roles(self, *roles, reason: Optional[str] = None):
+        SENT["add_roles"] += 1
+        self.roles.extend(roles)
+
+    async def remove_roles(self, *roles, reason: Optional[str] = None):
+        SENT["remove_roles"] += 1
+        self.roles = [role for role in self.roles if role not in roles]
+
+    async def send(self, content: Optional[str] = None, **kwargs) -> StubMessage:
+        SENT["dm"] += 1
+        return StubMessage(content or "")
+
+
+class StubGuild:
+    def __init__(self, channel_names: List[str], role_names: List[str], name: str = "Resellboost"):
+        self.id = next(_ids)
+        self.name = name
+        self.members: Dict[int, StubMember] = {}
+        self.roles = [StubRole(role_name, position) for position, role_name in enumerate(role_names, start=1)]
+        self.text_channels = [StubTextChannel(self, channel_name) for channel_name in channel_names]
+        self.me = StubMember(self, name="ResellBoost", bot=True)
+        self.member_count = 0
+
+    def add_member(self, member_id: Optional[int] = None) -> StubMember:
+        member = StubMember(self, member_id)
+        self.members[member.id] = member
+        self.member_count = len(self.members)
+        return member
+
+    def get_member(self, member_id: int) -> Optional[StubMember]:
+        return self.members.get(member_id)
+
+    def get_role(self, role_id: int) -> Optional[StubRole]:
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    def get_channel(self, channel_id: int) -> Optional[StubTextChannel]:
+        return next((channel for channel in self.text_channels if channel.id == channel_id), None)
+
+    async def invites(self) -> list:
+        SENT["invites_rest"] += 1
+        return []
+
+
+class StubResponse:
+    def __init__(self):
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def send_message(self, content: Optional[str] = None, **kwargs):
+        SENT["interaction_response"] += 1
+        self._done = True
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def edit_message(self, **kwargs):
+        SENT["interaction_response"] += 1
+        self._done = True
+
+
+class StubFollowup:
+    async def send(self, content: Optional[str] = None, **kwargs) -> StubMessage:
+        SENT["followup"] += 1
+        return StubMessage(content or "")
+
+
+class StubInteraction:
+    def __init__(self, user: StubMember, channel: Optional[StubTextChannel] = None, command_name: str = ""):
+        self.id = next(_ids)
+        self.user = user
+        self.guild = user.guild
+        self.channel = channel
+        self.response = StubResponse()
+        self.followup = StubFollowup()
+        self.created_at = datetime.now(timezone.utc)
+        self.command = type("StubCommand", (), {"qualified_name": command_name, "name": command_name})() if command_name else None
+
+
+class StubBot:
+    """Remplace commands.Bot auprès des cogs : guildes locales et registre de cogs, sans connexion."""
+
+    def __init__(self, guilds: List[StubGuild]):
+        self.guilds = guilds
+        self.user = guilds[0].me if guilds else None
+        self.cogs: Dict[str, Any] = {}
+        self.static_bundle = None
+
+    def get_guild(self, guild_id: int) -> Optional[StubGuild]:
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    def get_cog(self, name: str) -> Any:
+        return self.cogs.get(name)
+
+    async def wait_until_cog_ready(self, name: str, timeout: float = 0.0) -> Any:
+        return self.cogs.get(name)  # les cogs sont enregistrés par le banc d'essai avant usage
+
+    def get_user(self, user_id: int) -> Optional[StubMember]:
+        return next((guild.members[user_id] for guild in self.guilds if user_id in guild.members), None)
+
+    def is_ready(self) -> bool:
+        return True
+
+    async def wait_until_ready(self):
+        return None
+
+    def dispatch(self, event: str, *args, **kwargs):
+        SENT[f"dispatch:{event}"] += 1
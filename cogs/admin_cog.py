@@ -3,11 +3,10 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from typing import Optional, List, Dict
-import asyncio
 
 from .manager_cog import ManagerCog
 from google.cloud import firestore
-from google.cloud.firestore_v1 import transaction
+from google.cloud.firestore_v1.async_transaction import async_transactional
 
 # --- UI Classes moved from manager_cog.py to solve circular imports ---
 
@@ -48,10 +47,10 @@ class CashoutRequestView(discord.ui.View):
         new_embed = original_embed.copy()
 
         if approve:
-            @transaction.async_transactional
+            @async_transactional
             async def approve_tx(trans, ref):
                 await self.manager.add_transaction(trans, ref, "cashout_count", 1, "Approbation de retrait")
-            await self.manager.db.run_transaction(approve_tx, user_ref)
+            await self.manager.run_transaction(approve_tx, user_ref)
 
             if member:
                 await self.manager.check_achievements(member)
@@ -78,13 +77,13 @@ class CashoutRequestView(discord.ui.View):
             new_embed.set_footer(text=f"Approuvé par {interaction.user.display_name}")
             await interaction.followup.send("Demande approuvée.", ephemeral=True)
         else: # Deny
-            @transaction.async_transactional
+            @async_transactional
             async def deny_tx(trans, ref):
                 await self.manager.add_transaction(
                     trans, ref, "store_credit", cashout_dict['credit_to_deduct'],
                     "Remboursement suite au refus de retrait"
                 )
-            await self.manager.db.run_transaction(deny_tx, user_ref)
+            await self.manager.run_transaction(deny_tx, user_ref)
             
             if member:
                 try:
@@ -212,7 +211,7 @@ class MissionView(discord.ui.View):
     async def toggle_dms(self, interaction: discord.Interaction, button: discord.ui.Button):
         user_ref = self.manager.db.collection('users').document(str(interaction.user.id))
         
-        @transaction.async_transactional
+        @async_transactional
         async def toggle_opt_in(trans, ref):
             user_doc = await ref.get(transaction=trans)
             user_data = user_doc.to_dict() if user_doc.exists else {}
@@ -220,7 +219,7 @@ class MissionView(discord.ui.View):
             trans.set(ref, {"missions_opt_in": new_status}, merge=True)
             return new_status
 
-        new_status = await self.manager.db.run_transaction(toggle_opt_in, user_ref)
+        new_status = await self.manager.run_transaction(toggle_opt_in, user_ref)
         status_text = "activées" if new_status else "désactivées"
         await interaction.response.send_message(f"Vos notifications de mission par MP sont maintenant {status_text}.", ephemeral=True)
 
@@ -230,8 +229,7 @@ class AdminCog(commands.Cog):
         self.manager: Optional[ManagerCog] = None
 
     async def cog_load(self):
-        await asyncio.sleep(1) # Wait for ManagerCog
-        self.manager = self.bot.get_cog('ManagerCog')
+        self.manager = await self.bot.wait_until_cog_ready('ManagerCog')
         if not self.manager:
             return print("❌ ERREUR CRITIQUE: AdminCog n'a pas pu trouver le ManagerCog.")
         
@@ -259,11 +257,11 @@ class AdminCog(commands.Cog):
         if not self.manager or not self.manager.db: return await interaction.response.send_message("Erreur interne.", ephemeral=True)
         user_ref = self.manager.db.collection('users').document(str(membre.id))
         
-        @transaction.async_transactional
+        @async_transactional
         async def grant_credits_tx(trans, ref):
             await self.manager.add_transaction(trans, ref, "store_credit", montant, f"Octroi Admin : {raison}")
         
-        await self.manager.db.run_transaction(grant_credits_tx, user_ref)
+        await self.manager.run_transaction(grant_credits_tx, user_ref)
 
         user_data = (await user_ref.get()).to_dict()
         current_credits = user_data.get("store_credit", 0.0)
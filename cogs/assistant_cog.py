@@ -9,27 +9,21 @@ import re
 # Importation de ManagerCog pour l'autocomplétion
 from .manager_cog import ManagerCog
 
-# Importation de la librairie Gemini
-try:
-    import google.generativeai as genai
-    from google.generativeai.types import GenerationConfig
-    AI_AVAILABLE = True
-except ImportError:
-    AI_AVAILABLE = False
+from utils.gemini import build_generation_config
 
 class AssistantCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.manager: Optional[ManagerCog] = None
-        self.model: Optional[genai.GenerativeModel] = None
+        self.model: Optional[Any] = None
 
     async def cog_load(self):
         # Cette méthode est appelée lors du chargement du cog.
-        self.manager = self.bot.get_cog('ManagerCog')
+        self.manager = await self.bot.wait_until_cog_ready('ManagerCog')
         if not self.manager:
             return print("ERREUR CRITIQUE: AssistantCog n'a pas pu trouver le ManagerCog.")
         
-        if AI_AVAILABLE and self.manager.model:
+        if self.manager.ai.available:
             self.model = self.manager.model
             print("✅ Assistant Cog: Modèle Gemini partagé par ManagerCog chargé.")
         else:
@@ -68,11 +62,12 @@ class AssistantCog(commands.Cog):
         }}
         """
         try:
-            generation_config = GenerationConfig(
+            generation_config = build_generation_config(
                 response_mime_type="application/json"
             )
-            response = await self.model.generate_content_async(
-                contents=prompt,
+            response = await self.manager.generate_ai_content(
+                prompt,
+                feature="assistant",
                 generation_config=generation_config
             )
             return await self.manager._parse_gemini_json_response(response.text)
@@ -6,9 +6,8 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime, timezone
 import uuid
 import re
-import asyncio
 
-from .manager_cog import ManagerCog
+from .manager_cog import ManagerCog, PURCHASE_ALREADY_RECORDED
 from .admin_cog import TicketCloseView # Import from where it's defined now
 
 # --- UI Classes for Catalogue Interactions ---
@@ -74,10 +73,12 @@ class PaymentVerificationView(discord.ui.View):
             purchase_successful, message = await self.manager.record_purchase(
                 user_id=transaction_data['user_id'], product=product_to_record, option=option_to_record,
                 credit_used=transaction_data.get('credit_used', 0), guild_id=interaction.guild_id,
-                transaction_code=transaction_data.get('transaction_code', 'N/A')
+                transaction_code=transaction_data.get('transaction_code') or transaction_id
             )
 
             if not purchase_successful: return await interaction.followup.send(f"❌ Erreur: {message}", ephemeral=True)
+            if message == PURCHASE_ALREADY_RECORDED:
+                return await interaction.followup.send("ℹ️ Ce paiement a déjà été validé.", ephemeral=True)
 
             new_embed.title = "✅ Commande Validée"
             new_embed.color = discord.Color.green()
@@ -113,89 +114,215 @@ class ProductActionView(discord.ui.View):
     # This class seems to have been replaced by the Select menus logic
     pass
 
+SELECT_LIMIT = 25  # Limite Discord d'options par menu déroulant
+
+
+def _paginate(options: List[discord.SelectOption]) -> List[List[discord.SelectOption]]:
+    return [options[i:i + SELECT_LIMIT] for i in range(0, len(options), SELECT_LIMIT)] or [[]]
+
+
+class CatalogueCache:
+    """
+    Embeds et SelectOption du catalogue, construits une fois par version du catalogue
+    (ManagerCog.catalogue_version, incrémentée à chaque rechargement) puis réutilisés à chaque clic.
+    Les embeds mis en cache sont partagés : ne jamais les modifier, les copier si besoin.
+    """
+
+    def __init__(self, cog: 'CatalogueCog'):
+        self.cog = cog
+        self.version = -1
+        self.categories: List[str] = []
+        self.category_pages: List[List[discord.SelectOption]] = [[]]
+        self.products_by_category: Dict[str, List[Dict[str, Any]]] = {}
+        self.product_pages: Dict[str, List[List[discord.SelectOption]]] = {}
+        self.category_embeds: Dict[str, discord.Embed] = {}
+        self.product_embeds: Dict[str, discord.Embed] = {}
+        self.option_pages: Dict[str, List[List[discord.SelectOption]]] = {}
+        self.welcome_embed: Optional[discord.Embed] = None
+
+    def ensure_fresh(self):
+        manager = self.cog.manager
+        if self.version == manager.catalogue_version:
+            return
+        self.products_by_category = {}
+        for product in manager.products:
+            if product.get('category') and product.get('id'):
+                self.products_by_category.setdefault(product['category'], []).append(product)
+        self.categories = sorted(self.products_by_category)
+        self.category_pages = _paginate([discord.SelectOption(label=cat[:100], value=cat[:100]) for cat in self.categories])
+        self.product_pages = {
+            cat: _paginate([discord.SelectOption(label=p['name'][:100], value=p['id']) for p in products])
+            for cat, products in self.products_by_category.items()
+        }
+        # Les embeds sont construits à la première consultation puis conservés jusqu'au prochain rechargement
+        self.category_embeds, self.product_embeds, self.option_pages = {}, {}, {}
+        self.welcome_embed = discord.Embed(title="Bienvenue au Catalogue", description="Choisissez une catégorie.", color=discord.Color.purple())
+        self.version = manager.catalogue_version
+
+    def category_for_value(self, value: str) -> Optional[str]:
+        return next((cat for cat in self.categories if cat[:100] == value), None)
+
+    def category_embed(self, category: str) -> discord.Embed:
+        embed = self.category_embeds.get(category)
+        if embed is None:
+            count = len(self.products_by_category.get(category, []))
+            embed = self.category_embeds[category] = discord.Embed(
+                title=f"Catalogue - {category}", description=f"{count} produit(s). Sélectionnez un produit ci-dessous.", color=discord.Color.blurple())
+        return embed
+
+    def product_embed(self, product: Dict[str, Any]) -> discord.Embed:
+        embed = self.product_embeds.get(product['id'])
+        if embed is None:
+            embed = self.product_embeds[product['id']] = self.cog.create_product_embed(product)
+        return embed
+
+    def product_option_pages(self, product: Dict[str, Any]) -> List[List[discord.SelectOption]]:
+        pages = self.option_pages.get(product['id'])
+        if pages is None:
+            currency = product.get("currency", "EUR")
+            pages = self.option_pages[product['id']] = _paginate([
+                discord.SelectOption(label=f"{opt['name']} ({opt['price']:.2f} {currency})"[:100], value=opt['name'][:100])
+                for opt in product.get('options', [])
+            ])
+        return pages
+
+
 class OptionSelect(discord.ui.Select):
-    def __init__(self, product: Dict, manager: 'ManagerCog', cog: 'CatalogueCog'):
+    def __init__(self, product: Dict, manager: 'ManagerCog', cog: 'CatalogueCog', options: List[discord.SelectOption],
+                 page: int = 0, pages: int = 1, row: Optional[int] = None):
         self.product = product
         self.manager = manager
         self.cog = cog
-        currency = product.get("currency", "EUR")
-        options = [discord.SelectOption(label=f"{opt['name']} ({opt['price']:.2f} {currency})", value=opt['name']) for opt in product.get('options', [])]
-        super().__init__(placeholder="Choisissez une option...", options=options, custom_id=f"option_select:{product['id']}")
+        placeholder = "Choisissez une option..." + (f" (page {page + 1}/{pages})" if pages > 1 else "")
+        super().__init__(placeholder=placeholder, options=list(options), custom_id=f"option_select:{product['id']}", row=row)
 
     async def callback(self, interaction: discord.Interaction):
-        await interaction.response.defer(ephemeral=True, thinking=False)
         selected_option_name = self.values[0]
-        selected_option = next((opt for opt in self.product['options'] if opt['name'] == selected_option_name), None)
-        if not selected_option: return await interaction.followup.send("Option invalide.", ephemeral=True)
+        selected_option = next((opt for opt in self.product['options'] if opt['name'][:100] == selected_option_name), None)
+        if not selected_option: return await interaction.response.send_message("Option invalide.", ephemeral=True)
         await self.cog.create_purchase_ticket(interaction, self.product, selected_option)
 
+class CategorySelect(discord.ui.Select):
+    def __init__(self, options: List[discord.SelectOption], page: int, pages: int):
+        placeholder = "Choisissez une catégorie..." + (f" (page {page + 1}/{pages})" if pages > 1 else "")
+        super().__init__(placeholder=placeholder, options=list(options), row=0)
+
+    async def callback(self, interaction: discord.Interaction):
+        await self.view.select_category(interaction, self.values[0])
+
 class ProductSelect(discord.ui.Select):
-    def __init__(self, cog: 'CatalogueCog', products: List[Dict]):
-        self.cog = cog
-        self.products = products
-        options = [discord.SelectOption(label=p['name'][:100], value=p['id']) for p in products]
-        super().__init__(placeholder="Choisissez un produit pour voir les détails...", options=options, custom_id="product_select_menu")
+    def __init__(self, options: List[discord.SelectOption], page: int, pages: int):
+        placeholder = "Choisissez un produit pour voir les détails..." + (f" (page {page + 1}/{pages})" if pages > 1 else "")
+        super().__init__(placeholder=placeholder, options=list(options), row=1)
 
     async def callback(self, interaction: discord.Interaction):
-        await interaction.response.defer()
-        product_id = self.values[0]
-        product = self.cog.manager.get_product(product_id)
-        if not product: return await interaction.edit_original_response(content="Ce produit n'existe plus.", view=None, embed=None)
+        await self.view.select_product(interaction, self.values[0])
 
-        embed = self.cog.create_product_embed(product)
-        
-        # Recreate parent view to add more items
-        original_view = self.view
-        new_view = CatalogueBrowseView(self.cog, [opt.label for opt in original_view.children[0].options])
-        new_view.add_item(self) # Add self back
+class PageButton(discord.ui.Button):
+    def __init__(self, label: str, target: str, delta: int, disabled: bool, row: int = 3):
+        super().__init__(label=label, style=discord.ButtonStyle.secondary, disabled=disabled, row=row)
+        self.target = target
+        self.delta = delta
 
-        if product.get("options"):
-            new_view.add_item(OptionSelect(product, self.cog.manager, self.cog))
-        else:
-            buy_button = discord.ui.Button(label="🛒 Acheter ce produit", style=discord.ButtonStyle.success)
-            async def buy_callback(inter: discord.Interaction):
-                await self.cog.create_purchase_ticket(inter, product)
-            buy_button.callback = buy_callback
-            new_view.add_item(buy_button)
-            
-        await interaction.edit_original_response(embed=embed, view=new_view)
+    async def callback(self, interaction: discord.Interaction):
+        await self.view.turn_page(interaction, self.target, self.delta)
+
+class BuyButton(discord.ui.Button):
+    def __init__(self, cog: 'CatalogueCog', product: Dict[str, Any]):
+        super().__init__(label="🛒 Acheter ce produit", style=discord.ButtonStyle.success, row=3)
+        self.cog = cog
+        self.product = product
+
+    async def callback(self, interaction: discord.Interaction):
+        await self.cog.create_purchase_ticket(interaction, self.product)
 
 class CatalogueBrowseView(discord.ui.View):
-    def __init__(self, cog: 'CatalogueCog', categories: List[str]):
+    """Navigation paginée : catégories, produits d'une catégorie, puis options ou achat. Composants issus du cache."""
+
+    def __init__(self, cog: 'CatalogueCog'):
         super().__init__(timeout=300)
         self.cog = cog
-        
-        self.add_item(discord.ui.Select(
-            placeholder="Choisissez une catégorie...",
-            options=[discord.SelectOption(label=cat) for cat in categories],
-            custom_id="category_select_menu"
-        ))
-        
-    @discord.ui.select(custom_id="category_select_menu")
-    async def on_category_select(self, interaction: discord.Interaction, select: discord.ui.Select):
-        await interaction.response.defer()
-        category = select.values[0]
-        products_in_category = [p for p in self.cog.manager.products if p.get('category') == category]
-
-        new_view = self # Re-use self, just replace items
-        # Remove old product select if it exists
-        for item in self.children[:]:
-            if isinstance(item, ProductSelect) or isinstance(item, OptionSelect) or isinstance(item, discord.ui.Button):
-                self.remove_item(item)
-        
-        new_view.add_item(ProductSelect(self.cog, products_in_category))
-        
-        embed = discord.Embed(title=f"Catalogue - {category}", description="Sélectionnez un produit ci-dessous.", color=discord.Color.blurple())
-        await interaction.edit_original_response(embed=embed, view=new_view)
+        self.cache = cog.catalogue_cache
+        self.version = self.cache.version
+        self.category_page = 0
+        self.category: Optional[str] = None
+        self.product_page = 0
+        self.product: Optional[Dict[str, Any]] = None
+        self.option_page = 0
+        self.render()
+
+    def render(self):
+        self.clear_items()
+        cache = self.cache
+        self.add_item(CategorySelect(cache.category_pages[self.category_page], self.category_page, len(cache.category_pages)))
+        if len(cache.category_pages) > 1:
+            self.add_item(PageButton("◀ Catégories", "category", -1, self.category_page == 0))
+            self.add_item(PageButton("Catégories ▶", "category", 1, self.category_page >= len(cache.category_pages) - 1))
+        if self.category:
+            pages = cache.product_pages.get(self.category, [[]])
+            self.add_item(ProductSelect(pages[self.product_page], self.product_page, len(pages)))
+            if len(pages) > 1:
+                self.add_item(PageButton("◀ Produits", "product", -1, self.product_page == 0))
+                self.add_item(PageButton("Produits ▶", "product", 1, self.product_page >= len(pages) - 1))
+        if self.product:
+            if self.product.get("options"):
+                pages = cache.product_option_pages(self.product)
+                self.add_item(OptionSelect(self.product, self.cog.manager, self.cog, pages[self.option_page], self.option_page, len(pages), row=2))
+                if len(pages) > 1:
+                    # Rangée à part : la rangée 3 peut déjà porter les boutons des catégories et des produits
+                    self.add_item(PageButton("◀ Options", "option", -1, self.option_page == 0, row=4))
+                    self.add_item(PageButton("Options ▶", "option", 1, self.option_page >= len(pages) - 1, row=4))
+            else:
+                self.add_item(BuyButton(self.cog, self.product))
+
+    def current_embed(self) -> discord.Embed:
+        if self.product:
+            return self.cache.product_embed(self.product)
+        if self.category:
+            return self.cache.category_embed(self.category)
+        return self.cache.welcome_embed
+
+    async def _refresh(self, interaction: discord.Interaction):
+        self.cache.ensure_fresh()
+        if self.version != self.cache.version:
+            # Catalogue rechargé depuis l'ouverture de la vue : on repart de l'accueil
+            self.version = self.cache.version
+            self.category_page, self.category, self.product_page, self.product, self.option_page = 0, None, 0, None, 0
+        self.render()
+        await interaction.response.edit_message(embed=self.current_embed(), view=self)
+
+    async def select_category(self, interaction: discord.Interaction, value: str):
+        self.category = self.cache.category_for_value(value)
+        self.product_page, self.product, self.option_page = 0, None, 0
+        await self._refresh(interaction)
+
+    async def select_product(self, interaction: discord.Interaction, product_id: str):
+        product = self.cog.manager.get_product(product_id)
+        if not product:
+            return await interaction.response.edit_message(content="Ce produit n'existe plus.", view=None, embed=None)
+        self.product, self.option_page = product, 0
+        await self._refresh(interaction)
+
+    async def turn_page(self, interaction: discord.Interaction, target: str, delta: int):
+        if target == "category":
+            self.category_page = max(0, min(self.category_page + delta, len(self.cache.category_pages) - 1))
+        elif target == "option" and self.product:
+            pages = self.cache.product_option_pages(self.product)
+            self.option_page = max(0, min(self.option_page + delta, len(pages) - 1))
+        else:
+            pages = self.cache.product_pages.get(self.category, [[]])
+            self.product_page = max(0, min(self.product_page + delta, len(pages) - 1))
+            self.product = None
+        await self._refresh(interaction)
 
 class CatalogueCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.manager: Optional[ManagerCog] = None
+        self.catalogue_cache = CatalogueCache(self)
 
     async def cog_load(self):
-        await asyncio.sleep(1) # Wait for ManagerCog
-        self.manager = self.bot.get_cog('ManagerCog')
+        self.manager = await self.bot.wait_until_cog_ready('ManagerCog')
         if not self.manager:
             return print("❌ ERREUR CRITIQUE: CatalogueCog n'a pas pu trouver le ManagerCog.")
         
@@ -227,24 +354,28 @@ class CatalogueCog(commands.Cog):
     @app_commands.command(name="catalogue", description="Affiche les produits disponibles de manière interactive.")
     async def catalogue(self, interaction: discord.Interaction):
         if not self.manager: return await interaction.response.send_message("Erreur interne.", ephemeral=True)
-        categories = sorted(list(set(p['category'] for p in self.manager.products if p.get('category'))))
-        
-        # FIX: Prevent API error for >25 options in select menu
-        if len(categories) > 25:
-            categories = categories[:25]
-            await interaction.followup.send("Attention: Trop de catégories, affichage des 25 premières.", ephemeral=True)
-
-        view = CatalogueBrowseView(self, categories)
-        embed = discord.Embed(title="Bienvenue au Catalogue", description="Choisissez une catégorie.", color=discord.Color.purple())
-        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+        self.catalogue_cache.ensure_fresh()
+        if not self.catalogue_cache.categories:
+            return await interaction.response.send_message("Le catalogue est vide pour le moment.", ephemeral=True)
+        view = CatalogueBrowseView(self)
+        await interaction.response.send_message(embed=view.current_embed(), view=view, ephemeral=True)
+
+    async def product_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        if not self.manager: return []
+        return [
+            app_commands.Choice(name=f"{p.get('name', p['id'])} ({p['id']})"[:100], value=p['id'][:100])
+            for p in self.manager.product_search.search(current, limit=25)
+        ]
 
     @app_commands.command(name="produit", description="Affiche les détails d'un produit par son ID.")
-    @app_commands.describe(id="L'ID unique du produit (ex: vbucks)")
+    @app_commands.describe(id="L'ID unique du produit (ex: vbucks), ou une partie de son nom")
+    @app_commands.autocomplete(id=product_autocomplete)
     async def produit(self, interaction: discord.Interaction, id: str):
         if not self.manager: return await interaction.response.send_message("Erreur interne.", ephemeral=True)
-        product = self.manager.get_product(id)
+        product = self.manager.get_product(id) or self.manager.product_search.best_match(id)
         if not product: return await interaction.response.send_message("Produit introuvable.", ephemeral=True)
-        embed = self.create_product_embed(product)
+        self.catalogue_cache.ensure_fresh()
+        embed = self.catalogue_cache.product_embed(product)
         # ... view creation logic ...
         view = discord.ui.View() # Placeholder
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
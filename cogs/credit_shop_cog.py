@@ -7,7 +7,7 @@ import json
 import asyncio
 from datetime import datetime, timedelta, timezone
 from google.cloud import firestore
-from google.cloud.firestore_v1 import transaction
+from google.cloud.firestore_v1.async_transaction import async_transactional
 
 from .manager_cog import ManagerCog
 from .lottery_cog import LotteryCog
@@ -57,7 +57,7 @@ class CreditShopView(discord.ui.View):
     async def handle_booster_purchase(self, interaction: discord.Interaction, item: Dict[str, Any]):
         user_ref = self.manager.db.collection('users').document(str(interaction.user.id))
         
-        @transaction.async_transactional
+        @async_transactional
         async def purchase_booster_tx(trans, ref, item_data):
             user_data = await self.manager.get_or_create_user_data(ref, trans)
             cost = item_data['cost']
@@ -77,7 +77,7 @@ class CreditShopView(discord.ui.View):
             trans.update(ref, {'active_boosters': active_boosters})
             return {"success": True}
         
-        result = await self.manager.db.run_transaction(purchase_booster_tx, user_ref, item)
+        result = await self.manager.run_transaction(purchase_booster_tx, user_ref, item)
         
         if result['success']:
             await interaction.response.send_message(f"✅ Achat réussi ! Vous avez activé **{item['name']}**.", ephemeral=True)
@@ -92,9 +92,8 @@ class CreditShopCog(commands.Cog):
         self.shop_items: List[Dict[str, Any]] = []
 
     async def cog_load(self):
-        await asyncio.sleep(1) 
-        self.manager = self.bot.get_cog('ManagerCog')
-        self.lottery_cog = self.bot.get_cog('LotteryCog')
+        self.manager = await self.bot.wait_until_cog_ready('ManagerCog')
+        self.lottery_cog = await self.bot.wait_until_cog_ready('LotteryCog')
         if not self.manager or not self.lottery_cog:
             return print("❌ ERREUR CRITIQUE: CreditShopCog: Dépendances (Manager, Lottery) introuvables.")
         
@@ -103,7 +102,7 @@ class CreditShopCog(commands.Cog):
 
     async def _load_items(self):
         try:
-            with open(CREDIT_SHOP_ITEMS_FILE, 'r', encoding='utf-8') as f: self.shop_items = json.load(f)
+            self.shop_items = await asyncio.to_thread(ManagerCog._read_json, CREDIT_SHOP_ITEMS_FILE)
         except (FileNotFoundError, json.JSONDecodeError):
             print(f"ATTENTION: {CREDIT_SHOP_ITEMS_FILE} introuvable ou mal formaté.")
             self.shop_items = []
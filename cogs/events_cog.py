@@ -9,6 +9,7 @@ from typing import Optional
 from google.cloud import firestore
 
 from .manager_cog import ManagerCog
+from utils.metrics import timed_task
 
 def parse_duration(duration_str: str) -> Optional[timedelta]:
     """Parses a duration string like '1d3h30m' into a timedelta object."""
@@ -31,7 +32,7 @@ class EventsCog(commands.Cog):
         self.manager: Optional[ManagerCog] = None
 
     async def cog_load(self):
-        self.manager = self.bot.get_cog('ManagerCog')
+        self.manager = await self.bot.wait_until_cog_ready('ManagerCog')
         if not self.manager or not self.manager.db:
             return print("ERREUR CRITIQUE: EventsCog n'a pas pu trouver le ManagerCog ou la BDD.")
         
@@ -82,6 +83,7 @@ class EventsCog(commands.Cog):
         
         # Update in-memory cache and Firestore
         self.manager.active_events[type.value] = event_data
+        self.manager.commission_engine.set_events(self.manager.active_events)
         await self.manager.db.collection('system').document('events').set({'active': self.manager.active_events}, merge=True)
         
         announce_channel_name = self.manager.config["CHANNELS"].get("ANNOUNCEMENTS")
@@ -108,6 +110,7 @@ class EventsCog(commands.Cog):
         
         event_name = self.manager.active_events[type.value]['name']
         del self.manager.active_events[type.value]
+        self.manager.commission_engine.set_events(self.manager.active_events)
         await self.manager.db.collection('system').document('events').set({'active': self.manager.active_events})
             
         await interaction.response.send_message(f"✅ L'événement `{event_name}` a été arrêté manuellement.", ephemeral=True)
@@ -127,6 +130,7 @@ class EventsCog(commands.Cog):
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
     @tasks.loop(minutes=1)
+    @timed_task()
     async def check_expired_events(self):
         if not self.manager: return
         now = datetime.now(timezone.utc)
@@ -141,6 +145,7 @@ class EventsCog(commands.Cog):
         
         if expired_events_detected:
             print(f"Événements expirés détectés et retirés de la mémoire.")
+            self.manager.commission_engine.set_events(self.manager.active_events)
             await self.manager.db.collection('system').document('events').set({'active': self.manager.active_events})
     
     @check_expired_events.before_loop
@@ -5,13 +5,16 @@ from discord import app_commands
 import json
 from datetime import datetime, timedelta, timezone
 import random
-from typing import Optional
+from typing import Optional, List, Dict, Set
 import os
 import asyncio
 import re
+from google.cloud import firestore
 
 # Importation de ManagerCog pour l'autocomplétion
 from .manager_cog import ManagerCog
+from utils.giveaways import GiveawayEntrants, GIVEAWAY_EMOJI, DEFAULT_SHARDS
+from utils.metrics import timed_task
 
 def parse_duration(duration_str: str) -> Optional[timedelta]:
     """Parses a duration string like '1d3h30m' into a timedelta object."""
@@ -32,19 +35,108 @@ class GiveawayCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.manager: Optional[ManagerCog] = None
+        self.entrants: Optional[GiveawayEntrants] = None
+        # Autres bots ayant réagi 🎉, par giveaway : comptés par reaction.count mais jamais participants
+        self.bot_reactions: Dict[int, Set[int]] = {}
 
     async def cog_load(self):
-        self.manager = self.bot.get_cog('ManagerCog')
+        self.manager = await self.bot.wait_until_cog_ready('ManagerCog')
         if not self.manager or not self.manager.db:
             return print("ERREUR CRITIQUE: GiveawayCog n'a pas pu trouver le ManagerCog ou la BDD.")
         
+        self.entrants = GiveawayEntrants(self.manager.db)
+        self.flush_entrants_task.change_interval(seconds=self.giveaway_config.get("FLUSH_INTERVAL_SECONDS", 5))
+        self.flush_entrants_task.start()
         self.check_giveaways.start()
         print("✅ GiveawayCog chargé et tâche de vérification démarrée.")
 
     def cog_unload(self):
         self.check_giveaways.cancel()
+        self.flush_entrants_task.cancel()
+        if self.entrants and self.entrants.pending:
+            asyncio.create_task(self.entrants.flush())
         print("GiveawayCog déchargé.")
 
+    @property
+    def giveaway_config(self) -> dict:
+        return self.manager.config.get("GIVEAWAY_CONFIG", {})
+
+    # --- Suivi des participants en direct ---
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        if not self.entrants or str(payload.emoji) != GIVEAWAY_EMOJI or not self.entrants.is_tracked(payload.message_id):
+            return
+        if payload.user_id == self.bot.user.id:
+            return
+        if payload.member and payload.member.bot:
+            self.bot_reactions.setdefault(payload.message_id, set()).add(payload.user_id)
+            return
+        self.entrants.add(payload.message_id, payload.user_id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        if not self.entrants or str(payload.emoji) != GIVEAWAY_EMOJI or not self.entrants.is_tracked(payload.message_id):
+            return
+        bots = self.bot_reactions.get(payload.message_id)
+        if bots and payload.user_id in bots:
+            bots.discard(payload.user_id)
+            return
+        self.entrants.remove(payload.message_id, payload.user_id)
+
+    @tasks.loop(seconds=5)
+    @timed_task()
+    async def flush_entrants_task(self):
+        await self.entrants.flush()
+
+    async def reconcile_entrants(self, giveaway_msg: discord.Message) -> bool:
+        """
+        Compare le compteur de réactions (hors bots connus) aux participants locaux et ne pagine reaction.users()
+        qu'en cas d'écart (réactions manquées pendant une coupure). Renvoie True si une resynchronisation a eu lieu.
+        """
+        reaction = discord.utils.get(giveaway_msg.reactions, emoji=GIVEAWAY_EMOJI)
+        bots = self.bot_reactions.get(giveaway_msg.id, set())
+        expected = (reaction.count - (1 if reaction.me else 0) - len(bots)) if reaction else 0
+        if expected == len(self.entrants.entrants.get(giveaway_msg.id, ())):
+            return False
+        users, bots = [], set()
+        if reaction:
+            async for user in reaction.users():
+                if not user.bot:
+                    users.append(user.id)
+                elif user.id != self.bot.user.id:
+                    bots.add(user.id)
+        self.bot_reactions[giveaway_msg.id] = bots  # les réconciliations suivantes les déduisent du compteur
+        await self.entrants.replace(giveaway_msg.id, users)
+        print(f"Participants du giveaway {giveaway_msg.id} resynchronisés : {len(users)} (attendu ~{expected}).")
+        return True
+
+    async def _fetch_giveaway_message(self, data: dict, msg_id: int) -> Optional[discord.Message]:
+        guild = self.bot.get_guild(data["guild_id"])
+        channel = guild.get_channel(data["channel_id"]) if guild else None
+        if not channel:
+            return None
+        try:
+            return await channel.fetch_message(msg_id)
+        except (discord.NotFound, discord.Forbidden):
+            return None
+
+    async def load_active_giveaways(self):
+        """Recharge les participants des giveaways en cours, puis les réconcilie si configuré."""
+        reconcile = self.giveaway_config.get("RECONCILE_ON_STARTUP", True)
+        async for giveaway_doc in self.manager.db.collection('giveaways').where(field_path='end_time', op_string='>', value='').stream():
+            data = giveaway_doc.to_dict()
+            msg_id = int(giveaway_doc.id)
+            await self.entrants.load(msg_id, data.get("entrant_shards", DEFAULT_SHARDS))
+            if reconcile:
+                giveaway_msg = await self._fetch_giveaway_message(data, msg_id)
+                try:
+                    if giveaway_msg:
+                        await self.reconcile_entrants(giveaway_msg)
+                except Exception as e:
+                    print(f"Erreur de réconciliation du giveaway {msg_id}: {e}")
+        print(f"Participants des giveaways en cours chargés : {self.entrants.stats()}")
+
     @app_commands.command(name="giveaway_start", description="[Admin] Lance un nouveau giveaway.")
     @app_commands.describe(duree="Durée du giveaway (ex: 7d, 12h, 30m).", gagnants="Nombre de gagnants.", prix="Le prix à gagner.")
     @app_commands.default_permissions(administrator=True)
@@ -82,13 +174,16 @@ class GiveawayCog(commands.Cog):
         except discord.Forbidden:
             return await interaction.response.send_message(f"Je n'ai pas la permission d'envoyer des messages ou d'ajouter des réactions dans {channel.mention}.", ephemeral=True)
         
+        shards = self.giveaway_config.get("ENTRANT_SHARDS", DEFAULT_SHARDS)
         giveaway_data = {
             "end_time": end_time.isoformat(),
             "winner_count": gagnants,
             "prize": prix,
             "channel_id": channel.id,
-            "guild_id": interaction.guild.id
+            "guild_id": interaction.guild.id,
+            "entrant_shards": shards
         }
+        self.entrants.track(giveaway_msg.id, shards)
         await self.manager.db.collection('giveaways').document(str(giveaway_msg.id)).set(giveaway_data)
         
         await interaction.response.send_message(f"Giveaway lancé dans {channel.mention} !", ephemeral=True)
@@ -101,15 +196,37 @@ class GiveawayCog(commands.Cog):
 
         try:
             msg_id_int = int(message_id)
+        except ValueError:
+            return await interaction.followup.send("ID de message invalide.", ephemeral=True)
+
+        giveaway_ref = self.manager.db.collection('giveaways').document(message_id)
+        giveaway_doc = await giveaway_ref.get()
+        data = giveaway_doc.to_dict() if giveaway_doc.exists else None
+        if data and "winners" in data:
+            # Giveaway suivi : tirage sur les participants persistés, sans paginer les réactions
+            if not self.entrants.is_tracked(msg_id_int):
+                await self.entrants.load(msg_id_int, data.get("entrant_shards", DEFAULT_SHARDS))
+            drawn = self.entrants.draw(msg_id_int, 1, exclude=data.get("winners", []))
+            self.entrants.forget(msg_id_int)
+            if not drawn:
+                return await interaction.followup.send("Aucun autre participant à tirer au sort.", ephemeral=True)
+            await giveaway_ref.update({"winners": firestore.ArrayUnion(drawn)})
+            guild = self.bot.get_guild(data["guild_id"])
+            channel = guild.get_channel(data["channel_id"]) if guild else interaction.channel
+            await channel.send(f"🎉 Nouveau tirage ! Le nouveau gagnant est <@{drawn[0]}> ! Félicitations !")
+            return await interaction.followup.send("Le nouveau gagnant a été tiré au sort.", ephemeral=True)
+
+        # Giveaways antérieurs au suivi des participants : lecture des réactions
+        try:
             channel = interaction.channel 
             giveaway_msg = await channel.fetch_message(msg_id_int)
-        except (ValueError, discord.NotFound, discord.Forbidden):
+        except (discord.NotFound, discord.Forbidden):
             return await interaction.followup.send("Impossible de trouver le message du giveaway. Assurez-vous d'utiliser la commande dans le bon canal avec un ID de message valide.", ephemeral=True)
 
         if not giveaway_msg.embeds:
             return await interaction.followup.send("Ce message n'est pas un message de giveaway.", ephemeral=True)
 
-        reaction = discord.utils.get(giveaway_msg.reactions, emoji="🎉")
+        reaction = discord.utils.get(giveaway_msg.reactions, emoji=GIVEAWAY_EMOJI)
         if not reaction:
             return await interaction.followup.send("Aucune réaction de participation trouvée.", ephemeral=True)
 
@@ -123,6 +240,7 @@ class GiveawayCog(commands.Cog):
         await interaction.followup.send("Le nouveau gagnant a été tiré au sort.", ephemeral=True)
 
     @tasks.loop(seconds=15)
+    @timed_task()
     async def check_giveaways(self):
         now_iso = datetime.now(timezone.utc).isoformat()
         
@@ -130,31 +248,38 @@ class GiveawayCog(commands.Cog):
         ended_giveaways_stream = ended_giveaways_query.stream()
 
         async for giveaway_doc in ended_giveaways_stream:
-            await self.end_giveaway(giveaway_doc.id, giveaway_doc.to_dict())
-            await giveaway_doc.reference.delete()
+            winners = await self.end_giveaway(int(giveaway_doc.id), giveaway_doc.to_dict())
+            # Le document et ses shards de participants sont conservés pour /giveaway_reroll ;
+            # sans end_time, il ne correspond plus à la requête des giveaways à clôturer.
+            await giveaway_doc.reference.update({
+                "end_time": firestore.DELETE_FIELD,
+                "ended_at": now_iso,
+                "winners": winners,
+            })
 
-    async def end_giveaway(self, msg_id: str, data: dict):
-        guild = self.bot.get_guild(data["guild_id"])
-        if not guild: return
-        
-        channel = guild.get_channel(data["channel_id"])
-        if not channel: return
+    async def end_giveaway(self, msg_id: int, data: dict) -> List[int]:
+        giveaway_msg = await self._fetch_giveaway_message(data, msg_id)
+        if not giveaway_msg:
+            self.entrants.forget(msg_id)
+            self.bot_reactions.pop(msg_id, None)
+            return []
+        channel = giveaway_msg.channel
 
-        try:
-            giveaway_msg = await channel.fetch_message(int(msg_id))
-        except (discord.NotFound, discord.Forbidden):
-            return
+        if not self.entrants.is_tracked(msg_id):
+            await self.entrants.load(msg_id, data.get("entrant_shards", DEFAULT_SHARDS))
+        if self.giveaway_config.get("RECONCILE_AT_DRAW", True):
+            await self.reconcile_entrants(giveaway_msg)
+        await self.entrants.flush(msg_id)
 
-        reaction = discord.utils.get(giveaway_msg.reactions, emoji="🎉")
-        users = [user async for user in reaction.users() if not user.bot] if reaction else []
+        winners = self.entrants.draw(msg_id, data["winner_count"])
+        self.entrants.forget(msg_id)
+        self.bot_reactions.pop(msg_id, None)
 
-        if not users:
+        if not winners:
             winners_text = "Personne n'a participé... 😢"
             await channel.send(f"Le giveaway pour **{data['prize']}** est terminé. {winners_text}")
         else:
-            winner_count = min(data["winner_count"], len(users))
-            winners = random.sample(users, winner_count)
-            winners_mention = ", ".join([w.mention for w in winners])
+            winners_mention = ", ".join(f"<@{w}>" for w in winners)
             winners_text = f"Félicitations à {winners_mention} ! Vous avez gagné **{data['prize']}** !"
             await channel.send(winners_text)
 
@@ -162,20 +287,23 @@ class GiveawayCog(commands.Cog):
         new_embed.title = "🎉 GIVEAWAY TERMINÉ 🎉"
         new_embed.description = f"**Prix :** {data['prize']}"
         new_embed.color = discord.Color.dark_grey()
-        if users and 'winners' in locals():
-            new_embed.add_field(name="Gagnant(s)", value=", ".join([w.display_name for w in winners]), inline=False)
+        new_embed.clear_fields()
+        if winners:
+            names = []
+            for w in winners:
+                member = giveaway_msg.guild.get_member(w)
+                names.append(member.display_name if member else f"<@{w}>")
+            new_embed.add_field(name="Gagnant(s)", value=", ".join(names), inline=False)
         else:
             new_embed.add_field(name="Gagnant(s)", value="Aucun participant.", inline=False)
         
-        # Clean up fields
-        new_embed.clear_fields()
-        new_embed.add_field(name="Gagnant(s)", value=new_embed.fields[0].value if new_embed.fields else "Aucun participant.", inline=False)
-        
         await giveaway_msg.edit(embed=new_embed, view=None)
+        return winners
 
     @check_giveaways.before_loop
     async def before_check_giveaways(self):
         await self.bot.wait_until_ready()
+        await self.load_active_giveaways()
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(GiveawayCog(bot))
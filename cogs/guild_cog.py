@@ -6,11 +6,10 @@ from typing import Optional, List, Dict
 from datetime import datetime, timezone
 import re
 import uuid
-import asyncio
 
 from .manager_cog import ManagerCog
 from google.cloud import firestore
-from google.cloud.firestore_v1 import transaction
+from google.cloud.firestore_v1.async_transaction import async_transactional
 
 def is_hex_color(s: str) -> bool:
     if not s: return False
@@ -92,8 +91,7 @@ class GuildCog(commands.Cog):
         self.manager: Optional[ManagerCog] = None
 
     async def cog_load(self):
-        await asyncio.sleep(1) # Wait for ManagerCog
-        self.manager = self.bot.get_cog('ManagerCog')
+        self.manager = await self.bot.wait_until_cog_ready('ManagerCog')
         if not self.manager or not self.manager.db:
             return print("❌ ERREUR CRITIQUE: GuildCog n'a pas pu trouver le ManagerCog ou la BDD.")
         print("✅ GuildCog chargé.")
@@ -134,14 +132,14 @@ class GuildCog(commands.Cog):
             text_channel = await interaction.guild.create_text_channel(f"💬│{nom.lower().replace(' ', '-')}", category=category, overwrites=overwrites)
             voice_channel = await interaction.guild.create_voice_channel(f"🔊│{nom}", category=category, overwrites=overwrites)
 
-            @transaction.async_transactional
+            @async_transactional
             async def create_guild_transaction(trans, u_ref, g_ref):
                 await self.manager.add_transaction(trans, u_ref, "store_credit", -cost, f"Création de la guilde '{nom}'")
                 guild_db_data = { "name": nom, "name_lower": nom.lower(), "owner_id": str(interaction.user.id), "members": [str(interaction.user.id)], "created_at": datetime.now(timezone.utc).isoformat(), "color": final_color, "weekly_xp": 0, "role_id": guild_role.id, "text_channel_id": text_channel.id, "voice_channel_id": voice_channel.id }
                 trans.set(g_ref, guild_db_data)
                 trans.update(u_ref, {"guild_id": guild_id})
             
-            await self.manager.db.run_transaction(create_guild_transaction, user_ref, guild_ref)
+            await self.manager.run_transaction(create_guild_transaction, user_ref, guild_ref)
             await interaction.user.add_roles(guild_role)
 
         except Exception as e:
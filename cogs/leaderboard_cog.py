@@ -1,11 +1,13 @@
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from typing import Optional, List, Dict, Any
 from google.cloud import firestore
 
 from .manager_cog import ManagerCog
+from utils.leaderboards import LEADERBOARD_KEYS
+from utils.metrics import timed_task
 
 class LeaderboardCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -13,12 +15,18 @@ class LeaderboardCog(commands.Cog):
         self.manager: Optional[ManagerCog] = None
 
     async def cog_load(self):
-        self.manager = self.bot.get_cog('ManagerCog')
+        self.manager = await self.bot.wait_until_cog_ready('ManagerCog')
         if not self.manager or not self.manager.db:
             return print("ERREUR CRITIQUE: LeaderboardCog n'a pas pu trouver le ManagerCog ou la BDD.")
+        interval = self.manager.config.get("LEADERBOARD_CONFIG", {}).get("RECONCILE_INTERVAL_MINUTES", 360)
+        self.reconcile_leaderboards_task.change_interval(minutes=interval)
+        self.reconcile_leaderboards_task.start()  # La première itération sert d'initialisation
         print("✅ LeaderboardCog chargé.")
 
-    async def get_leaderboard_data(self, key: str, top_n: int = 10) -> List[Dict[str, Any]]:
+    def cog_unload(self):
+        self.reconcile_leaderboards_task.cancel()
+
+    async def query_leaderboard(self, key: str, top_n: int) -> List[Dict[str, Any]]:
         """Gets sorted leaderboard data from Firestore."""
         query = self.manager.db.collection('users').where(field_path=key, op_string='>', value=0).order_by(key, direction=firestore.Query.DESCENDING).limit(top_n)
         docs = query.stream()
@@ -26,10 +34,37 @@ class LeaderboardCog(commands.Cog):
         sorted_users = [{"id": doc.id, "value": doc.to_dict().get(key, 0)} async for doc in docs]
         return sorted_users
 
-    async def create_leaderboard_embed(self, interaction: discord.Interaction, leaderboard_type: str, data_key: str, unit: str = "") -> discord.Embed:
-        """Creates a standardized embed for a leaderboard."""
-        leaderboard_data = await self.get_leaderboard_data(data_key)
-        
+    async def get_leaderboard_data(self, key: str, top_n: int = 10, offset: int = 0) -> Optional[List[Dict[str, Any]]]:
+        """
+        Gets a page of sorted leaderboard data, from the in-memory index when it is trustworthy.
+        Firestore only backs the first page (top_n reads): a later page would cost offset + top_n reads, so None.
+        """
+        cached = self.manager.leaderboards.top(key, top_n, offset)
+        if cached is not None:
+            return cached
+        if offset:
+            return None
+        entries = await self.query_leaderboard(key, top_n)
+        return [{**entry, "rank": i + 1} for i, entry in enumerate(entries)]
+
+    @tasks.loop(minutes=360)
+    @timed_task()
+    async def reconcile_leaderboards_task(self):
+        """Reconstruit les index de classement depuis Firestore (écritures externes, transactions annulées)."""
+        leaderboards = self.manager.leaderboards
+        leaderboards.begin_seed()
+        try:
+            async for doc in self.manager.db.collection('users').select(list(LEADERBOARD_KEYS)).stream():
+                leaderboards.add_seed_row(doc.id, doc.to_dict())
+        except Exception as e:
+            leaderboards.abort_seed()
+            return print(f"Erreur de reconstruction des classements: {e}")
+        leaderboards.finish_seed()
+        stats = leaderboards.stats()
+        print(f"Classements reconstruits: {stats['sizes']} (~{stats['memory_bytes'] / 1_048_576:.1f} Mo).")
+
+    def create_leaderboard_embed(self, interaction: discord.Interaction, leaderboard_type: str, leaderboard_data: List[Dict[str, Any]], unit: str = "", highlight_id: Optional[str] = None) -> discord.Embed:
+        """Creates a standardized embed for a page of a leaderboard."""
         embed = discord.Embed(
             title=f"🏆 Classement - {leaderboard_type} 🏆",
             description=f"Voici le top 10 des membres pour la catégorie '{leaderboard_type}'.",
@@ -41,8 +76,9 @@ class LeaderboardCog(commands.Cog):
             return embed
 
         leaderboard_text = ""
-        for i, user_entry in enumerate(leaderboard_data):
-            rank_emoji = {0: "🥇", 1: "🥈", 2: "🥉"}.get(i, f"**#{i+1}**")
+        for user_entry in leaderboard_data:
+            rank = user_entry['rank']
+            rank_emoji = {1: "🥇", 2: "🥈", 3: "🥉"}.get(rank, f"**#{rank}**")
             try:
                 member = interaction.guild.get_member(int(user_entry['id']))
                 member_name = member.display_name if member else f"Utilisateur Inconnu ({user_entry['id']})"
@@ -52,38 +88,60 @@ class LeaderboardCog(commands.Cog):
             value = user_entry['value']
             value_str = f"{value:,.0f}".replace(",", " ") if isinstance(value, (int, float)) and value == int(value) else f"{value:,.2f}".replace(",", " ")
 
-            leaderboard_text += f"{rank_emoji} **{member_name}** - `{value_str}{unit}`\n"
+            marker = "➡️ " if user_entry['id'] == highlight_id else ""
+            leaderboard_text += f"{marker}{rank_emoji} **{member_name}** - `{value_str}{unit}`\n"
         
-        if leaderboard_text:
-            embed.add_field(name="Top 10", value=leaderboard_text, inline=False)
+        first_rank, last_rank = leaderboard_data[0]['rank'], leaderboard_data[-1]['rank']
+        if first_rank == 1:
+            embed.add_field(name=f"Top {last_rank}", value=leaderboard_text, inline=False)
         else:
-            embed.description = "Le classement est actuellement vide."
+            embed.description = f"Classement '{leaderboard_type}', rangs {first_rank} à {last_rank}."
+            embed.add_field(name=f"#{first_rank} - #{last_rank}", value=leaderboard_text, inline=False)
             
         embed.set_footer(text=f"Classement mis à jour le {discord.utils.format_dt(interaction.created_at, style='f')}")
         
         return embed
 
     @app_commands.command(name="classement", description="Affiche les différents classements du serveur.")
-    @app_commands.describe(categorie="La catégorie de classement à afficher.")
+    @app_commands.describe(categorie="La catégorie de classement à afficher.", vue="Le haut du classement ou votre propre position.", page="La page à afficher (10 membres par page).")
     @app_commands.choices(categorie=[
         app_commands.Choice(name="XP Total", value="xp"),
         app_commands.Choice(name="XP Hebdomadaire", value="weekly_xp"),
         app_commands.Choice(name="Crédits Boutique", value="store_credit"),
         app_commands.Choice(name="Gains d'Affiliation (Hebdo)", value="weekly_affiliate_earnings"),
         app_commands.Choice(name="Gains d'Affiliation (Total)", value="affiliate_earnings"),
+    ], vue=[
+        app_commands.Choice(name="Top du classement", value="top"),
+        app_commands.Choice(name="Ma position", value="moi"),
     ])
-    async def leaderboard(self, interaction: discord.Interaction, categorie: app_commands.Choice[str]):
+    async def leaderboard(self, interaction: discord.Interaction, categorie: app_commands.Choice[str], vue: Optional[app_commands.Choice[str]] = None, page: Optional[app_commands.Range[int, 1, 10000]] = None):
         if not self.manager:
             return await interaction.response.send_message("Erreur interne.", ephemeral=True)
 
         await interaction.response.defer()
-        
-        embed = await self.create_leaderboard_embed(
-            interaction=interaction,
-            leaderboard_type=categorie.name,
-            data_key=categorie.value,
-            unit=" XP" if "xp" in categorie.value else " ©"
-        )
+        page_size = self.manager.config.get("LEADERBOARD_CONFIG", {}).get("PAGE_SIZE", 10)
+        unit = " XP" if "xp" in categorie.value else " ©"
+
+        rank_info = None
+        if vue and vue.value == "moi":
+            rank_info = self.manager.leaderboards.rank_of(categorie.value, interaction.user.id)
+            if not rank_info:
+                message = "Vous n'êtes pas encore classé dans cette catégorie." if self.manager.leaderboards.seeded else "Le classement détaillé est en cours de calcul, réessayez dans quelques instants."
+                return await interaction.followup.send(message, ephemeral=True)
+            page = page or (rank_info["rank"] - 1) // page_size + 1
+
+        offset = ((page or 1) - 1) * page_size
+        leaderboard_data = await self.get_leaderboard_data(categorie.value, page_size, offset)
+        if leaderboard_data is None:
+            message = ("Cette page dépasse la partie du classement tenue à jour, essayez une page précédente."
+                       if self.manager.leaderboards.seeded else
+                       "Le classement détaillé est en cours de calcul : seule la première page est disponible, réessayez dans quelques instants.")
+            return await interaction.followup.send(message, ephemeral=True)
+        embed = self.create_leaderboard_embed(interaction, categorie.name, leaderboard_data, unit, highlight_id=str(interaction.user.id) if rank_info else None)
+
+        if rank_info:
+            top_percent = 100.0 * rank_info["rank"] / rank_info["total"]
+            embed.add_field(name="Votre position", value=f"**#{rank_info['rank']}** sur {rank_info['total']} (top {top_percent:.1f} %)", inline=False)
 
         await interaction.followup.send(embed=embed)
 
@@ -4,9 +4,8 @@ from discord.ext import commands
 from discord import app_commands
 from typing import Optional
 import random
-import asyncio
 from google.cloud import firestore
-from google.cloud.firestore_v1 import transaction
+from google.cloud.firestore_v1.async_transaction import async_transactional
 
 from .manager_cog import ManagerCog
 
@@ -17,45 +16,110 @@ class LotteryCog(commands.Cog):
         self.lottery_ref: Optional[firestore.AsyncDocumentReference] = None
 
     async def cog_load(self):
-        await asyncio.sleep(1) # Wait for ManagerCog
-        self.manager = self.bot.get_cog('ManagerCog')
+        self.manager = await self.bot.wait_until_cog_ready('ManagerCog')
         if not self.manager or not self.manager.db:
             return print("❌ ERREUR CRITIQUE: LotteryCog n'a pas pu trouver le ManagerCog ou la BDD.")
         self.lottery_ref = self.manager.db.collection('system').document('lottery')
+        await self._migrate_legacy_pot()
         print("✅ LotteryCog chargé.")
 
+    # --- Modèle : system/lottery ne contient que le numéro de manche ; chaque participation est un document
+    # lottery_rounds/{manche}/entries/{user_id} et la taille du pot un compteur réparti sur plusieurs shards. ---
+
+    def _round_ref(self, round_number: int) -> firestore.AsyncDocumentReference:
+        return self.manager.db.collection('lottery_rounds').document(str(round_number))
+
+    @property
+    def counter_shards(self) -> int:
+        return self.manager.config.get("LOTTERY_CONFIG", {}).get("COUNTER_SHARDS", 5)
+
+    async def _migrate_legacy_pot(self):
+        """Reprend le pot de l'ancien format (tableau 'pot' dans system/lottery) dans la manche courante."""
+        lottery_doc = await self.lottery_ref.get()
+        data = lottery_doc.to_dict() if lottery_doc.exists else {}
+        legacy_pot = data.get('pot') or []
+        if 'round' in data and not legacy_pot:
+            return
+        round_number = data.get('round', 0)
+        batch = self.manager.db.batch()
+        round_ref = self._round_ref(round_number)
+        for p in legacy_pot:
+            batch.set(round_ref.collection('entries').document(p['id']), {"name": p.get('name', ''), "joined_at": firestore.SERVER_TIMESTAMP})
+        if legacy_pot:
+            batch.set(round_ref.collection('counters').document('0'), {"count": firestore.Increment(len(legacy_pot))}, merge=True)
+        batch.set(self.lottery_ref, {'round': round_number, 'pot': firestore.DELETE_FIELD}, merge=True)
+        await batch.commit()
+        if legacy_pot:
+            print(f"Loterie : {len(legacy_pot)} participation(s) migrée(s) vers la manche {round_number}.")
+
     async def _join_lottery_transaction(self, user_id_str: str, display_name: str, cost: float):
         """Transactional logic for joining the lottery."""
-        @transaction.async_transactional
+        @async_transactional
         async def tx_logic(trans, u_ref):
-            user_data = await self.manager.get_or_create_user_data(u_ref, trans)
-            if user_data.get("store_credit", 0.0) < cost: return {"success": False, "reason": "crédits insuffisants"}
-                
+            # Le numéro de manche n'est écrit qu'au tirage : le lire ne crée pas de contention entre participants,
+            # mais une participation concurrente au tirage est rejouée sur la manche suivante.
             lottery_doc = await self.lottery_ref.get(transaction=trans)
-            lottery_pot = lottery_doc.to_dict().get('pot', []) if lottery_doc.exists else []
+            round_number = lottery_doc.to_dict().get('round', 0) if lottery_doc.exists else 0
+            round_ref = self._round_ref(round_number)
+            entry_ref = round_ref.collection('entries').document(user_id_str)
+
+            entry_doc = await entry_ref.get(transaction=trans)
+            if entry_doc.exists: return {"success": False, "reason": "déjà participant"}
 
-            if any(p['id'] == user_id_str for p in lottery_pot): return {"success": False, "reason": "déjà participant"}
+            user_data = await self.manager.get_or_create_user_data(u_ref, trans)
+            if user_data.get("store_credit", 0.0) < cost: return {"success": False, "reason": "crédits insuffisants"}
 
-            lottery_pot.append({"id": user_id_str, "name": display_name})
-            trans.set(self.lottery_ref, {'pot': lottery_pot}, merge=True)
+            shard_ref = round_ref.collection('counters').document(str(random.randrange(self.counter_shards)))
             await self.manager.add_transaction(trans, u_ref, "store_credit", -cost, "Participation à la loterie")
-            return {"success": True, "new_pot": lottery_pot}
+            trans.set(entry_ref, {"name": display_name, "joined_at": firestore.SERVER_TIMESTAMP})
+            trans.set(shard_ref, {"count": firestore.Increment(1)}, merge=True)
+            return {"success": True, "round": round_number}
 
         user_ref = self.manager.db.collection('users').document(user_id_str)
-        return await self.manager.db.run_transaction(tx_logic, user_ref)
-
-    async def _trigger_draw(self, interaction_or_channel: any, lottery_pot: list, config: dict):
-        """Triggers the draw, announces winner, and resets the pot."""
+        return await self.manager.run_transaction(tx_logic, user_ref)
+
+    async def _pot_size(self, round_number: int) -> int:
+        counters = self._round_ref(round_number).collection('counters')
+        refs = [counters.document(str(i)) for i in range(self.counter_shards)]
+        return sum((doc.to_dict() or {}).get("count", 0) async for doc in self.manager.db.get_all(refs) if doc.exists)
+
+    async def _close_round(self, round_number: int) -> bool:
+        """Clôt la manche si elle est toujours ouverte. Une seule des transactions concurrentes peut réussir."""
+        @async_transactional
+        async def close_tx(trans, ref):
+            lottery_doc = await ref.get(transaction=trans)
+            current = lottery_doc.to_dict().get('round', 0) if lottery_doc.exists else 0
+            if current != round_number:
+                return False
+            trans.set(ref, {'round': round_number + 1}, merge=True)
+            trans.set(self._round_ref(round_number), {'closed_at': firestore.SERVER_TIMESTAMP}, merge=True)
+            return True
+        return await self.manager.run_transaction(close_tx, self.lottery_ref)
+
+    async def _trigger_draw(self, interaction_or_channel: any, round_number: int, config: dict) -> bool:
+        """Triggers the draw for a round, announces winner. Returns False if another join already drew this round."""
+        if not await self._close_round(round_number):
+            return False
+
+        # La manche est close : plus aucune participation ne peut s'y ajouter
+        lottery_pot = [{"id": doc.id, **doc.to_dict()} async for doc in self._round_ref(round_number).collection('entries').stream()]
+        if not lottery_pot:
+            return True
         winner_data = random.choice(lottery_pot)
         winner_id = winner_data['id']
         prize = config.get("WINNER_PRIZE", 0.70)
         
         winner_ref = self.manager.db.collection('users').document(winner_id)
+        round_ref = self._round_ref(round_number)
 
-        @transaction.async_transactional
+        @async_transactional
         async def give_prize_tx(trans, ref):
+            round_doc = await round_ref.get(transaction=trans)
+            if round_doc.exists and round_doc.to_dict().get('winner'):
+                return
             await self.manager.add_transaction(trans, ref, "store_credit", prize, "Gagnant de la loterie")
-        await self.manager.db.run_transaction(give_prize_tx, winner_ref)
+            trans.set(round_ref, {'winner': winner_id, 'participants': len(lottery_pot)}, merge=True)
+        await self.manager.run_transaction(give_prize_tx, winner_ref)
 
         lottery_channel_name = self.manager.config["CHANNELS"].get("LOTTERY")
         channel = discord.utils.get(interaction_or_channel.guild.text_channels, name=lottery_channel_name)
@@ -65,8 +129,7 @@ class LotteryCog(commands.Cog):
             embed = discord.Embed(title="🎉 Tirage de la Loterie ! 🎉", description=f"Tirage parmi : {', '.join(participant_mentions)}", color=discord.Color.gold())
             embed.add_field(name="🏆 Gagnant 🏆", value=f"<@{winner_id}> remporte **{prize:.2f} crédits** !", inline=False)
             await channel.send(embed=embed)
-        
-        await self.lottery_ref.set({'pot': []})
+        return True
 
     async def handle_lottery_join(self, interaction: discord.Interaction, cost: float):
         """Reusable logic for joining the lottery, callable from commands or views."""
@@ -81,17 +144,17 @@ class LotteryCog(commands.Cog):
             else: await interaction.response.send_message(message, ephemeral=True)
             return
 
-        lottery_pot = result["new_pot"]
         config = self.manager.config.get("LOTTERY_CONFIG", {})
         required_size = config.get("PLAYERS_PER_ROUND", 3)
+        pot_size = await self._pot_size(result["round"])
         
-        if len(lottery_pot) < required_size:
-            message = f"Vous avez rejoint la loterie ! Il manque **{required_size - len(lottery_pot)}** joueur(s)."
+        if pot_size < required_size:
+            message = f"Vous avez rejoint la loterie ! Il manque **{required_size - pot_size}** joueur(s)."
             if interaction.response.is_done(): await interaction.followup.send(message, ephemeral=True)
             else: await interaction.response.send_message(message, ephemeral=True)
         else:
             if not interaction.response.is_done(): await interaction.response.defer(ephemeral=True)
-            await self._trigger_draw(interaction, lottery_pot, config)
+            await self._trigger_draw(interaction, result["round"], config)
             await interaction.followup.send("Le tirage a eu lieu ! Consultez le salon dédié.", ephemeral=True)
 
     @app_commands.command(name="loterie", description="Participe à la loterie pour tenter de gagner des crédits.")
@@ -5,40 +5,47 @@ from discord import app_commands
 import json
 import os
 import asyncio
+import copy
 from datetime import datetime, timedelta, timezone
 import random
 import math
 import uuid
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import traceback
 import re
+import hashlib
+import weakref
+from collections import OrderedDict
 
-# Dépendance pour la génération d'image
-try:
-    from PIL import Image, ImageDraw, ImageFont, ImageOps
-    import io
-    IMAGING_AVAILABLE = True
-except ImportError:
-    IMAGING_AVAILABLE = False
-
-
-# --- Configuration de l'IA Gemini ---
-try:
-    import google.generativeai as genai
-    from google.generativeai.types import GenerationConfig
-    AI_AVAILABLE = True
-except ImportError:
-    AI_AVAILABLE = False
+# --- IA Gemini et génération d'image : SDK importés au premier usage (démarrage à froid) ---
+from utils.gemini import AI_AVAILABLE, LazyGenerativeModel, build_generation_config
+from utils.profile_card import IMAGING_AVAILABLE
 
 # --- Configuration de Firestore ---
 try:
     from google.cloud import firestore
-    # FIX: Importation correcte pour le décorateur et les transactions
-    from google.cloud.firestore_v1 import transaction
+    # Décorateur asynchrone : firestore_v1.transaction ne fournit que la version synchrone
+    from google.cloud.firestore_v1.async_transaction import async_transactional
     FIRESTORE_AVAILABLE = True
 except ImportError:
     FIRESTORE_AVAILABLE = False
 
+from utils.admission import MessageAdmissionFilter, ADMIT, COOLDOWN
+from utils.profile_card import ProfileCardRenderer
+from utils.leaderboards import LeaderboardCache, WEEKLY_KEYS
+from utils.invites import InviteTracker
+from utils.onboarding import OnboardingQueue
+from utils.product_search import ProductSearchIndex
+from utils.metrics import REGISTRY, COMPONENT_GAUGE, timed_task, record_cache
+from utils.ai_client import AIClient, INTERACTIVE, BATCH
+from utils.ai_accounting import AI_ACCOUNTING
+from utils.commission import CommissionEngine, parse_expiry
+from utils.firestore_metrics import InstrumentedFirestore, unwrap
+from utils.firestore_accounting import ACCOUNTING
+
+# Message de record_purchase quand l'achat a déjà été enregistré (confirmation répétée)
+PURCHASE_ALREADY_RECORDED = "Achat déjà enregistré."
+
 # --- IMPORTANT: Ce fichier n'importe plus aucun autre cog ---
 # --- Les classes de Vues et Modals ont été déplacées dans les cogs qui les utilisent ---
 
@@ -48,36 +55,68 @@ class ManagerCog(commands.Cog):
     PRODUCTS_FILE = 'products.json'
     ACHIEVEMENTS_FILE = 'achievements_config.json'
     KNOWLEDGE_BASE_FILE = 'knowledge_base.json'
+    MISSION_FIELDS = ("current_daily_mission", "current_weekly_mission")
+    MISSION_CACHE_SIZE = 20000
 
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: commands.Bot, db: Any = None, model: Any = None):
         self.bot = bot
         self.db = None
-        if FIRESTORE_AVAILABLE:
-            self.db = firestore.AsyncClient()
+        if db is not None:
+            # Client injecté (ex: utils.fake_firestore pour les bancs d'essai hors ligne)
+            self.db = InstrumentedFirestore(db)
+        elif FIRESTORE_AVAILABLE:
+            # Toutes les opérations (y compris celles des autres cogs via manager.db) sont mesurées pour /metrics
+            self.db = InstrumentedFirestore(firestore.AsyncClient())
         else:
             print("ERREUR CRITIQUE: google-cloud-firestore non installé. Le bot ne peut pas fonctionner.")
 
         self.config = {}
         self.products = []
+        self.products_by_id: Dict[str, Dict[str, Any]] = {}
+        # Incrémenté à chaque rechargement : invalide les caches dérivés du catalogue (vues, embeds)
+        self.catalogue_version = 0
+        self.product_search = ProductSearchIndex()
         self.achievements = []
         self.knowledge_base = {}
-        self.invites_cache = {}
+        # Instantanés des invitations par guilde ; un seul appel REST par rafale d'arrivées
+        self.invite_tracker = InviteTracker()
+        # Les arrivées sont traitées par lots hors du gestionnaire d'événement
+        self.onboarding = OnboardingQueue(self.db, self._default_user_data, self.invite_tracker.attribute, self._credit_referrals)
+        # Effets différés (succès, annonces...) lancés par spawn() : références fortes jusqu'à la fin de chaque tâche
+        self.background_tasks: set = set()
         self.active_events = {}
+        # Taux de commission précompilés ; recompilés avec la configuration, mis à jour avec les événements actifs
+        self.commission_engine = CommissionEngine()
+        self.xp_admission = MessageAdmissionFilter()
+        # user_id -> {mission_type: mission}, LRU ; évite une lecture Firestore par message
+        self.mission_cache: OrderedDict[int, Dict[str, Optional[dict]]] = OrderedDict()
+        self.mission_cache_hits = 0
+        self.mission_cache_misses = 0
+        # Classements matérialisés, alimentés par add_transaction et lus par LeaderboardCog
+        self.leaderboards = LeaderboardCache()
+        # transaction -> (id de l'essai, {chemin: données}, valeurs à publier aux classements) : un seul get par document
+        # et par transaction (aucune lecture après écriture) ; publication seulement après le commit (run_transaction)
+        self._transaction_documents: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
         
+        self.profile_cards: Optional[ProfileCardRenderer] = None
         if not IMAGING_AVAILABLE:
             print("⚠️ ATTENTION: La librairie 'Pillow' est manquante. La commande /profil utilisera un embed standard.")
+        else:
+            self.profile_cards = ProfileCardRenderer({})
 
-        self.model = None
-        if not AI_AVAILABLE:
+        self.model = model  # modèle injecté (ex: utils.fake_gemini pour les bancs d'essai hors ligne)
+        if self.model is None and not AI_AVAILABLE:
             print("ATTENTION: Le package google-generativeai n'est pas installé. Les fonctionnalités d'IA seront désactivées.")
-        else:
+        elif self.model is None:
             gemini_key = os.environ.get("GEMINI_API_KEY")
             if gemini_key:
-                genai.configure(api_key=gemini_key)
-                self.model = genai.GenerativeModel('gemini-2.5-flash')
-                print("✅ Modèle Gemini initialisé avec succès.")
+                self.model = LazyGenerativeModel('gemini-2.5-flash', gemini_key)
+                print("✅ Modèle Gemini configuré (SDK chargé au premier appel).")
             else:
                 print("⚠️ ATTENTION: La clé API Gemini (GEMINI_API_KEY) est manquante dans l'environnement. L'IA est désactivée.")
+        # Tous les appels IA des cogs passent par ce client (délais, concurrence, disjoncteur, replis)
+        self.ai = AIClient(self.model)
+        self._reported_ai_days = set()
 
     async def cog_load(self):
         print("Chargement des données du ManagerCog...")
@@ -89,12 +128,26 @@ class ManagerCog(commands.Cog):
         self.mission_assignment_task.start()
         self.check_vip_status_task.start()
         self.weekly_coaching_report_task.start()
+        self.xp_admission_cleanup_task.start()
+        report_interval = self.config.get("FIRESTORE_ACCOUNTING_CONFIG", {}).get("REPORT_INTERVAL_MINUTES", 60)
+        self.firestore_cost_report_task.change_interval(minutes=report_interval)
+        self.firestore_cost_report_task.start()
+        self.ai_usage_rollup_task.start()
+        self.onboarding.start()
+        REGISTRY.register_collector("manager", self._collect_metrics)
 
     def cog_unload(self):
         self.weekly_leaderboard_task.cancel()
         self.mission_assignment_task.cancel()
         self.check_vip_status_task.cancel()
         self.weekly_coaching_report_task.cancel()
+        self.xp_admission_cleanup_task.cancel()
+        self.firestore_cost_report_task.cancel()
+        self.ai_usage_rollup_task.cancel()
+        self.onboarding.close()
+        REGISTRY.unregister_collector("manager")
+        if self.profile_cards:
+            self.profile_cards.close()
         print("ManagerCog déchargé.")
 
     @commands.Cog.listener()
@@ -115,10 +168,15 @@ class ManagerCog(commands.Cog):
 
         print("Tâches de fond démarrées via cog_load.")
 
+    @staticmethod
+    def _read_json(file_path: str) -> any:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
     async def _load_static_json(self, file_path: str) -> any:
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            # Lecture et décodage dans un thread : la boucle (et les battements de la gateway) n'attend pas le disque
+            return await asyncio.to_thread(self._read_json, file_path)
         except (FileNotFoundError, json.JSONDecodeError) as e:
             print(f"Erreur chargement fichier statique {file_path}: {e}")
             return {} if 'knowledge_base' in file_path else []
@@ -126,8 +184,24 @@ class ManagerCog(commands.Cog):
     async def _load_static_data(self):
         self.config = await self._load_static_json(self.CONFIG_FILE)
         self.products = await self._load_static_json(self.PRODUCTS_FILE)
+        self.products_by_id = {p['id']: p for p in reversed(self.products) if p.get('id')}  # le premier doublon l'emporte, comme avant
+        self.catalogue_version += 1
+        self.product_search.build(self.products)
         self.achievements = await self._load_static_json(self.ACHIEVEMENTS_FILE)
         self.knowledge_base = await self._load_static_json(self.KNOWLEDGE_BASE_FILE)
+        self.xp_admission.configure(self.config.get("GAMIFICATION_CONFIG", {}).get("XP_SYSTEM", {}))
+        self.commission_engine.compile(self.config)
+        if self.profile_cards:
+            self.profile_cards.configure(self.config.get("PROFILE_CARD_CONFIG", {}))
+        self.leaderboards.configure(self.config.get("LEADERBOARD_CONFIG", {}).get("MAX_INDEXED_USERS", 200000))
+        self.invite_tracker.configure(self.config.get("INVITE_TRACKING_CONFIG", {}))
+        static_bundle = getattr(self.bot, "static_bundle", None)
+        if static_bundle:
+            await asyncio.to_thread(static_bundle.rebuild)
+        self.onboarding.configure(self.config.get("ONBOARDING_CONFIG", {}))
+        ACCOUNTING.configure(self.config.get("FIRESTORE_ACCOUNTING_CONFIG", {}))
+        self.ai.configure(self.config.get("AI_CLIENT_CONFIG", {}))
+        AI_ACCOUNTING.configure(self.config.get("AI_ACCOUNTING_CONFIG", {}))
         print("Données de configuration statiques chargées.")
     
     async def _load_active_events(self):
@@ -141,9 +215,34 @@ class ManagerCog(commands.Cog):
         except Exception as e:
             print(f"Erreur au chargement des événements actifs: {e}")
             self.active_events = {}
+        self.commission_engine.set_events(self.active_events)
     
     def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
-        return next((p for p in self.products if p.get('id') == product_id), None)
+        return self.products_by_id.get(product_id)
+
+    async def generate_ai_content(self, prompt: Any, feature: str = "default", priority: str = INTERACTIVE, **kwargs) -> Any:
+        """Appel Gemini via le client partagé ; point de passage commun à tous les cogs (voir utils.ai_client.AIClient.generate)."""
+        return await self.ai.generate(prompt, feature=feature, priority=priority, **kwargs)
+
+    def _collect_metrics(self):
+        """Publie l'état des caches et files du ManagerCog avant chaque rendu de /metrics."""
+        record_cache("missions", self.mission_cache_hits, self.mission_cache_misses)
+        record_cache("leaderboards", self.leaderboards.hits, self.leaderboards.misses)
+        if self.profile_cards:
+            card_stats = self.profile_cards.stats()
+            record_cache("profile_avatars", card_stats["avatar_cache_hits"], card_stats["avatar_cache_misses"])
+        admission = self.xp_admission.stats()
+        record_cache("xp_admission", admission["dropped"], admission["admitted"] + admission["cooldown"])
+        invites = self.invite_tracker.stats()
+        record_cache("invites_rest", invites.get("rest_calls_saved", 0), invites.get("rest_calls", 0))
+        static_bundle = getattr(self.bot, "static_bundle", None)
+        if static_bundle:
+            record_cache("static_bundle_304", static_bundle.counters["not_modified"], static_bundle.counters["requests"] - static_bundle.counters["not_modified"])
+        COMPONENT_GAUGE.set(self.onboarding.queue.qsize(), component="onboarding", stat="queue_depth")
+        COMPONENT_GAUGE.set(len(self.mission_cache), component="missions", stat="cached_users")
+        COMPONENT_GAUGE.set(admission["tracked_users"], component="xp_admission", stat="tracked_users")
+        COMPONENT_GAUGE.set(self.leaderboards.stats()["memory_bytes"], component="leaderboards", stat="memory_bytes")
+        self.ai.collect_metrics()
 
     async def _parse_gemini_json_response(self, text: str) -> Optional[Dict[str, Any]]:
         """Analyse de manière robuste une réponse JSON potentiellement mal formatée de l'IA."""
@@ -169,8 +268,8 @@ class ManagerCog(commands.Cog):
         )
         
         try:
-            generation_config = GenerationConfig(response_mime_type="application/json")
-            response = await self.model.generate_content_async(contents=prompt, generation_config=generation_config)
+            generation_config = build_generation_config(response_mime_type="application/json")
+            response = await self.generate_ai_content(prompt, feature="promo", generation_config=generation_config)
             parsed_json = await self._parse_gemini_json_response(response.text)
             return parsed_json.get("generated_description") if parsed_json else short_description
         except Exception as e:
@@ -182,11 +281,13 @@ class ManagerCog(commands.Cog):
         if message.author.bot or not message.guild or not self.db:
             return
         
-        xp_config = self.config.get("GAMIFICATION_CONFIG", {}).get("XP_SYSTEM", {})
-        if len(message.content.split()) < xp_config.get("ANTI_FARM_MIN_WORDS", 0):
+        # Filtre en mémoire : le spam est écarté avant toute lecture Firestore
+        verdict = self.xp_admission.check(message.author.id, message.content)
+        if verdict not in (ADMIT, COOLDOWN):
             return
 
-        if xp_config.get("ENABLED", False):
+        xp_config = self.config.get("GAMIFICATION_CONFIG", {}).get("XP_SYSTEM", {})
+        if verdict == ADMIT and xp_config.get("ENABLED", False):
             await self.grant_xp(message.author, "message", f"Message dans #{message.channel.name}")
         
         await self.update_mission_progress(message.author, "send_message", 1)
@@ -196,60 +297,33 @@ class ManagerCog(commands.Cog):
         if member.bot or not self.db: return
         
         unverified_role_name = self.config.get("ROLES", {}).get("UNVERIFIED")
-        if unverified_role_name:
-            role = discord.utils.get(member.guild.roles, name=unverified_role_name)
-            if role:
-                try:
-                    await member.add_roles(role, reason="Nouveau membre")
-                except discord.Forbidden:
-                    print(f"Permissions manquantes pour assigner le rôle '{unverified_role_name}' à {member.name}")
-
-        user_ref = self.db.collection('users').document(str(member.id))
-        await self.get_or_create_user_data(user_ref)
-
-        old_invites = self.invites_cache.get(member.guild.id, {})
-        new_invites = await member.guild.invites()
-        inviter = None
-        for invite in new_invites:
-            if invite.code in old_invites and invite.uses > old_invites[invite.code].uses:
-                inviter = invite.inviter
-                break
-        
-        if inviter and inviter.id != member.id:
-            await user_ref.set({"referrer": str(inviter.id)}, merge=True)
-            
-            inviter_ref = self.db.collection('users').document(str(inviter.id))
-            
-            @transaction.async_transactional
-            async def add_referral_tx(trans, ref):
-                await self.add_transaction(trans, ref, "referral_count", 1, f"Parrainage de {member.name}")
-            await self.db.run_transaction(add_referral_tx, inviter_ref)
-            
-            print(f"{member.name} a été invité par {inviter.name}")
-        
-        await self._update_invite_cache(member.guild)
+        role = discord.utils.get(member.guild.roles, name=unverified_role_name) if unverified_role_name else None
+        self.onboarding.enqueue(member, role)
+
+    async def _credit_referrals(self, inviter: discord.abc.User, members: List[discord.Member]):
+        """Crédite en une transaction tous les membres d'un lot d'arrivées amenés par le même parrain."""
+        inviter_ref = self.db.collection('users').document(str(inviter.id))
+        names = ", ".join(m.name for m in members)
+
+        @async_transactional
+        async def add_referral_tx(trans, ref):
+            await self.add_transaction(trans, ref, "referral_count", len(members), f"Parrainage de {names}")
+        await self.run_transaction(add_referral_tx, inviter_ref)
     
     async def _update_invite_cache(self, guild: discord.Guild):
-        try:
-            self.invites_cache[guild.id] = {invite.code: invite for invite in await guild.invites()}
-        except discord.Forbidden:
-            print(f"Permissions manquantes pour récupérer les invitations de la guilde {guild.name}")
+        await self.invite_tracker.refresh(guild)
 
     @commands.Cog.listener()
     async def on_invite_create(self, invite: discord.Invite):
-        await self._update_invite_cache(invite.guild)
+        self.invite_tracker.on_create(invite)
 
     @commands.Cog.listener()
     async def on_invite_delete(self, invite: discord.Invite):
-        await self._update_invite_cache(invite.guild)
+        self.invite_tracker.on_delete(invite)
     
-    async def get_or_create_user_data(self, user_ref: firestore.AsyncDocumentReference, trans: Optional[firestore.AsyncTransaction] = None) -> Dict[str, Any]:
-        """Gets user data, creating it if it doesn't exist. Can run inside or outside a transaction."""
-        doc = await user_ref.get(transaction=trans)
-        if doc.exists:
-            return doc.to_dict()
-        
-        default_data = {
+    def _default_user_data(self) -> Dict[str, Any]:
+        """Document initial d'un nouvel utilisateur."""
+        return {
             "xp": 0, "level": 1, "weekly_xp": 0, "last_message_timestamp": 0,
             "message_count": 0, "purchase_count": 0, "purchase_total_value": 0.0,
             "achievements": [], "store_credit": 0.0, "warnings": 0,
@@ -264,6 +338,14 @@ class ManagerCog(commands.Cog):
             "current_daily_mission": None, "current_weekly_mission": None,
             "guild_id": None, "guild_bonus": {}
         }
+
+    async def get_or_create_user_data(self, user_ref: firestore.AsyncDocumentReference, trans: Optional[firestore.AsyncTransaction] = None) -> Dict[str, Any]:
+        """Gets user data, creating it if it doesn't exist. Can run inside or outside a transaction."""
+        doc = await user_ref.get(transaction=trans)
+        if doc.exists:
+            return doc.to_dict()
+        
+        default_data = self._default_user_data()
         
         if trans:
             trans.set(user_ref, default_data)
@@ -273,9 +355,61 @@ class ManagerCog(commands.Cog):
         print(f"Nouvel utilisateur initialisé dans Firestore : {user_ref.id}")
         return default_data
 
+    def spawn(self, coro, name: str) -> asyncio.Task:
+        """Lance `coro` en tâche de fond sans retarder l'appelant ; une erreur est journalisée, pas propagée."""
+        task = asyncio.create_task(coro, name=name)
+        self.background_tasks.add(task)
+        task.add_done_callback(self._background_task_done)
+        return task
+
+    def _background_task_done(self, task: asyncio.Task):
+        self.background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            error = task.exception()
+            print(f"Erreur dans la tâche de fond {task.get_name()} :")
+            traceback.print_exception(type(error), error, error.__traceback__)
+
+    def _transaction_state(self, trans: firestore.AsyncTransaction) -> Tuple[Dict[str, Dict[str, Any]], List[tuple]]:
+        """État de l'essai en cours de `trans` : documents déjà lus ({chemin: données}) et (user_id, champ, valeur) écrits."""
+        native_trans = unwrap(trans)
+        attempt_id, documents, published = self._transaction_documents.get(native_trans, (None, None, None))
+        if documents is None or attempt_id != getattr(native_trans, "id", None):
+            # Le SDK réutilise l'objet transaction d'un essai à l'autre : l'identifiant change à chaque essai
+            documents, published = {}, []
+            self._transaction_documents[native_trans] = (getattr(native_trans, "id", None), documents, published)
+        return documents, published
+
+    def _transaction_cache(self, trans: firestore.AsyncTransaction) -> Dict[str, Dict[str, Any]]:
+        """Documents déjà lus par l'essai en cours de `trans` ({chemin: données}), partagés avec add_transaction."""
+        return self._transaction_state(trans)[0]
+
+    async def run_transaction(self, transactional: Any, *args, **kwargs) -> Any:
+        """
+        Exécute une fonction décorée par async_transactional dans une nouvelle transaction (le client asynchrone
+        n'a pas de run_transaction), puis publie aux classements les valeurs écrites par add_transaction dans
+        l'essai validé : un essai annulé ou en erreur ne publie rien.
+        """
+        committed: List[tuple] = []
+        to_wrap = transactional.to_wrap
+
+        async def attempt(trans, *a, **kw):
+            result = await to_wrap(trans, *a, **kw)
+            committed[:] = self._transaction_state(trans)[1]  # le dernier essai exécuté est celui qui est validé
+            return result
+
+        transactional = copy.copy(transactional)
+        transactional.to_wrap = attempt
+        result = await transactional(self.db.transaction(), *args, **kwargs)
+        for user_id, field, value in committed:
+            self.leaderboards.publish(user_id, field, value)
+        return result
+
     async def add_transaction(self, trans: firestore.AsyncTransaction, user_ref: firestore.AsyncDocumentReference, field: str, amount: any, description: str):
         """Helper to add a transaction entry and update a user field. MUST be called from within a transaction."""
-        user_data = await self.get_or_create_user_data(user_ref, trans=trans)
+        documents, published = self._transaction_state(trans)
+        user_data = documents.get(user_ref.path)
+        if user_data is None:
+            user_data = documents[user_ref.path] = await self.get_or_create_user_data(user_ref, trans=trans)
         
         current_val = user_data.get(field, 0)
         new_value = (current_val if isinstance(current_val, (int, float)) else 0) + (amount if isinstance(amount, (int, float)) else 0)
@@ -290,12 +424,17 @@ class ManagerCog(commands.Cog):
         max_log_size = self.config.get("TRANSACTION_LOG_CONFIG", {}).get("MAX_USER_LOG_SIZE", 50)
         if len(transaction_log) > max_log_size:
             transaction_log = transaction_log[:max_log_size]
+        # Les appels suivants de la même transaction repartent de cet état
+        user_data[field] = new_value
+        user_data["transaction_log"] = transaction_log
             
         update_payload = {
             field: new_value,
             "transaction_log": transaction_log
         }
         trans.update(user_ref, update_payload)
+        # Valeur absolue, publiée par run_transaction une fois l'essai validé
+        published.append((user_ref.id, field, new_value))
 
     async def grant_xp(self, user: discord.Member, source: any, reason: str, _is_achievement_reward: bool = False):
         user_ref = self.db.collection('users').document(str(user.id))
@@ -322,38 +461,24 @@ class ManagerCog(commands.Cog):
         
         if xp_to_add == 0: return
 
-        # --- Calculate Boosts ---
-        total_boost = 1.0
-        vip_data = user_data.get("vip_premium")
-        if vip_data and datetime.fromisoformat(vip_data.get("expires_at", "1970-01-01T00:00:00+00:00").split('.')[0]) > now:
-            vip_config = self.config.get("GAMIFICATION_CONFIG", {}).get("VIP_SYSTEM", {}).get("PREMIUM", {})
-            sorted_tiers = sorted(vip_config.get("XP_BOOST_TIERS", []), key=lambda x: x.get("consecutive_months", 0), reverse=True)
-            for tier in sorted_tiers:
-                if vip_data.get("consecutive_months", 0) >= tier.get("consecutive_months", 999):
-                    total_boost += tier.get("boost", 0)
-                    break
+        final_xp = int(xp_to_add * self.xp_multiplier(user_data, now))
         
-        active_boosters = user_data.get("active_boosters", {})
-        for booster_id, booster_data in active_boosters.items():
-            if 'xp_booster' in booster_id and datetime.fromisoformat(booster_data.get('expires_at', "1970-01-01T00:00:00+00:00")) > now:
-                total_boost += booster_data.get('multiplier', 1.0) - 1.0
-        
-        event_multiplier = self.active_events.get("double_xp", {}).get("multiplier", 1.0)
-        final_xp = int(xp_to_add * total_boost * event_multiplier)
-        
-        @transaction.async_transactional
+        @async_transactional
         async def _update_xp_and_guild(trans, u_ref, guild_id, xp, rsn, is_msg):
+            # Toutes les lectures avant la première écriture
             guild_ref = self.db.collection('guilds').document(guild_id) if guild_id else None
+            guild_exists = bool(guild_ref) and (await guild_ref.get(transaction=trans)).exists
             if is_msg:
-                trans.update(u_ref, {"last_message_timestamp": now.timestamp()})
                 await self.add_transaction(trans, u_ref, "message_count", 1, rsn)
 
             await self.add_transaction(trans, u_ref, "xp", xp, rsn)
             await self.add_transaction(trans, u_ref, "weekly_xp", xp, f"Gain hebdomadaire: {rsn}")
-            if guild_ref and (await guild_ref.get(transaction=trans)).exists:
+            if is_msg:
+                trans.update(u_ref, {"last_message_timestamp": now.timestamp()})
+            if guild_exists:
                 trans.update(guild_ref, {"weekly_xp": firestore.Increment(xp)})
 
-        await self.db.run_transaction(_update_xp_and_guild, user_ref, user_data.get("guild_id"), final_xp, reason, is_message_source)
+        await self.run_transaction(_update_xp_and_guild, user_ref, user_data.get("guild_id"), final_xp, reason, is_message_source)
 
         leveled_up, new_level = await self.check_level_up(user)
         
@@ -387,40 +512,88 @@ class ManagerCog(commands.Cog):
                     await referrer.send(f"🚀 Votre filleul {user.mention} a atteint le niveau 5 rapidement ! Vous gagnez **{xp_gain} XP** bonus !")
                 except discord.Forbidden: pass
 
+    def xp_multiplier(self, user_data: dict, now: datetime) -> float:
+        """Bonus VIP Premium actif, boosters d'XP et événement double XP appliqués à chaque gain."""
+        total_boost = 1.0
+        vip_data = user_data.get("vip_premium")
+        if vip_data and parse_expiry(vip_data.get("expires_at")) > now.timestamp():
+            vip_config = self.config.get("GAMIFICATION_CONFIG", {}).get("VIP_SYSTEM", {}).get("PREMIUM", {})
+            sorted_tiers = sorted(vip_config.get("XP_BOOST_TIERS", []), key=lambda x: x.get("consecutive_months", 0), reverse=True)
+            for tier in sorted_tiers:
+                if vip_data.get("consecutive_months", 0) >= tier.get("consecutive_months", 999):
+                    total_boost += tier.get("boost", 0)
+                    break
+        
+        active_boosters = user_data.get("active_boosters", {})
+        for booster_id, booster_data in active_boosters.items():
+            if 'xp_booster' in booster_id and datetime.fromisoformat(booster_data.get('expires_at', "1970-01-01T00:00:00+00:00")) > now:
+                total_boost += booster_data.get('multiplier', 1.0) - 1.0
+        
+        return total_boost * self.active_events.get("double_xp", {}).get("multiplier", 1.0)
+
+    def level_for_xp(self, level: int, xp: int) -> int:
+        while xp >= self.xp_needed_for_level(level):
+            level += 1
+        return level
+
+    def xp_needed_for_level(self, level: int) -> int:
+        xp_config = self.config.get("GAMIFICATION_CONFIG", {}).get("XP_SYSTEM", {})
+        return int(xp_config.get("LEVEL_UP_FORMULA_BASE_XP", 150) * (xp_config.get("LEVEL_UP_FORMULA_MULTIPLIER", 1.6) ** level))
+
+    @app_commands.command(name="profil", description="Affiche votre carte de profil (niveau, XP, gains).")
+    @app_commands.describe(membre="Le membre dont afficher le profil (vous par défaut).")
+    async def profil(self, interaction: discord.Interaction, membre: Optional[discord.Member] = None):
+        if not self.db: return await interaction.response.send_message("Erreur interne.", ephemeral=True)
+        member = membre or interaction.user
+        await interaction.response.defer()
+
+        user_data = await self.get_or_create_user_data(self.db.collection('users').document(str(member.id)))
+        xp_needed = self.xp_needed_for_level(user_data.get("level", 1))
+
+        if self.profile_cards:
+            try:
+                card = await self.profile_cards.render(member, user_data, xp_needed)
+                return await interaction.followup.send(file=discord.File(card, filename="profil.png"))
+            except Exception as e:
+                print(f"Erreur rendu carte de profil ({member.id}): {e}")
+
+        embed = discord.Embed(title=f"Profil de {member.display_name}", color=discord.Color.blue())
+        embed.set_thumbnail(url=member.display_avatar.url)
+        embed.add_field(name="Niveau", value=str(user_data.get("level", 1)), inline=True)
+        embed.add_field(name="XP", value=f"{user_data.get('xp', 0)} / {xp_needed}", inline=True)
+        embed.add_field(name="Crédits", value=f"{user_data.get('store_credit', 0.0):.2f}", inline=True)
+        embed.add_field(name="Gains d'affiliation", value=f"{user_data.get('affiliate_earnings', 0.0):.2f} €", inline=True)
+        await interaction.followup.send(embed=embed)
+
     async def check_level_up(self, user: discord.Member) -> tuple[bool, int]:
         user_ref = self.db.collection('users').document(str(user.id))
         user_data = await self.get_or_create_user_data(user_ref)
 
         if user_data.get("xp_gated", False): return False, user_data.get("level", 1)
         
-        xp_config = self.config.get("GAMIFICATION_CONFIG", {}).get("XP_SYSTEM", {})
-        base_xp = xp_config.get("LEVEL_UP_FORMULA_BASE_XP", 150)
-        multiplier = xp_config.get("LEVEL_UP_FORMULA_MULTIPLIER", 1.6)
         old_level = user_data.get("level", 1)
-        xp_needed = int(base_xp * (multiplier ** old_level))
+        xp_needed = self.xp_needed_for_level(old_level)
         
         if user_data.get("xp", 0) < xp_needed:
             return False, old_level
             
-        new_level = old_level
-        current_xp = user_data.get("xp", 0)
-        while current_xp >= int(base_xp * (multiplier ** new_level)):
-            new_level += 1
-        
+        new_level = self.level_for_xp(old_level, user_data.get("xp", 0))
         if new_level == old_level: return False, old_level
 
-        @transaction.async_transactional
+        @async_transactional
         async def level_up_tx(trans, ref):
             await self.add_transaction(trans, ref, "level", new_level - old_level, "Montée de niveau")
-        await self.db.run_transaction(level_up_tx, user_ref)
+        await self.run_transaction(level_up_tx, user_ref)
 
         await self.check_referral_milestones(user, user_data)
         return True, new_level
 
-    async def check_achievements(self, user: discord.Member):
+    async def check_achievements(self, user: discord.Member, user_stats: Optional[dict] = None):
+        """`user_stats` : état déjà connu (ex: résultat d'une transaction), évite une relecture."""
         if not user: return
-        user_ref = self.db.collection('users').document(str(user.id))
-        user_stats = await self.get_or_create_user_data(user_ref)
+        if user_stats is None:
+            user_ref = self.db.collection('users').document(str(user.id))
+            user_stats = await self.get_or_create_user_data(user_ref)
 
         for achievement in self.achievements:
             if achievement.get("id") in user_stats.get("achievements", []): continue
@@ -441,108 +614,126 @@ class ManagerCog(commands.Cog):
             if channel:
                 await channel.send(f"🏆 Succès Déverrouillé ! Bravo {user.mention} pour avoir obtenu **{achievement.get('name')}** !")
 
+    @staticmethod
+    def purchase_key(user_id: int, transaction_code: str) -> str:
+        """Clé d'idempotence d'un achat : un même code de transaction n'est enregistré qu'une fois par acheteur."""
+        return hashlib.sha256(f"{user_id}:{transaction_code}".encode()).hexdigest()[:40]
+
     async def record_purchase(self, user_id: int, product: dict, option: Optional[dict], credit_used: float, guild_id: int, transaction_code: str) -> tuple[bool, str]:
+        """
+        Enregistre un achat en une seule transaction : statistiques et crédit de l'acheteur, abonnement VIP, XP et niveau,
+        commission du parrain, et `processed_purchases/{clé}`. Une confirmation répétée (double clic, nouvel essai)
+        trouve ce document et ne modifie rien : elle renvoie PURCHASE_ALREADY_RECORDED.
+        """
         guild = self.bot.get_guild(guild_id)
         if not guild: return False, "Guilde non trouvée."
         member = guild.get_member(user_id)
         if not member: return False, "Membre non trouvé."
         
-        buyer_ref = self.db.collection('users').document(str(user_id))
+        users = self.db.collection('users')
+        buyer_ref = users.document(str(user_id))
+        receipt_ref = self.db.collection('processed_purchases').document(self.purchase_key(user_id, transaction_code))
         price = option.get('price') if option else product.get('price', 0)
-        
-        if product.get("type") == "subscription":
-             buyer_data = await self.get_or_create_user_data(buyer_ref)
-             vip_data = buyer_data.get("vip_premium")
-             now = datetime.now(timezone.utc)
-             duration = self.config.get("GAMIFICATION_CONFIG", {}).get("VIP_SYSTEM", {}).get("PREMIUM", {}).get("DURATION_DAYS", 7)
-             new_expiry = now + timedelta(days=duration)
-             
-             new_vip_data = {
-                 "starts_at": now.isoformat(),
-                 "expires_at": new_expiry.isoformat(),
-                 "consecutive_months": vip_data.get("consecutive_months", 0) + 1 if vip_data else 1
-             }
-             await buyer_ref.update({"vip_premium": new_vip_data})
-             
-             vip_role_name = self.config.get("ROLES", {}).get("VIP_PREMIUM")
-             if vip_role_name:
-                 role = discord.utils.get(guild.roles, name=vip_role_name)
-                 if role: await member.add_roles(role)
-
-        @transaction.async_transactional
-        async def purchase_transaction(trans, b_ref, p, c_used):
-            await self.add_transaction(trans, b_ref, "purchase_count", 1, "Achat")
-            await self.add_transaction(trans, b_ref, "purchase_total_value", p, "Achat")
-            if c_used > 0:
-                await self.add_transaction(trans, b_ref, "store_credit", -c_used, "Achat avec crédit")
-        
-        await self.db.run_transaction(purchase_transaction, buyer_ref, price, credit_used)
-
         xp_per_euro = self.config.get("GAMIFICATION_CONFIG", {}).get("XP_SYSTEM", {}).get("XP_PER_EURO_SPENT", 20)
-        xp_gain = int(price * xp_per_euro)
-        await self.grant_xp(member, xp_gain, "Achat")
-        await self.check_achievements(member)
-        
-        buyer_data = (await buyer_ref.get()).to_dict()
-        referrer_id_str = buyer_data.get("referrer")
-        if referrer_id_str:
-            referrer = guild.get_member(int(referrer_id_str))
-            if referrer:
-                referrer_ref = self.db.collection('users').document(referrer_id_str)
-                referrer_data = await self.get_or_create_user_data(referrer_ref)
-                commission_earned = self.calculate_commission(referrer_data, price, product, option)
-                if commission_earned > 0:
-                    @transaction.async_transactional
-                    async def commission_tx(trans, ref):
-                        await self.add_transaction(trans, ref, "store_credit", commission_earned, f"Commission sur achat de {member.display_name}")
-                        await self.add_transaction(trans, ref, "affiliate_earnings", commission_earned, "Gain d'affiliation")
-                        await self.add_transaction(trans, ref, "weekly_affiliate_earnings", commission_earned, "Gain d'affiliation hebdo")
-                    await self.db.run_transaction(commission_tx, referrer_ref)
-                    await self.check_achievements(referrer)
-        
+        duration = self.config.get("GAMIFICATION_CONFIG", {}).get("VIP_SYSTEM", {}).get("PREMIUM", {}).get("DURATION_DAYS", 7)
+
+        @async_transactional
+        async def purchase_transaction(trans, b_ref, r_ref):
+            # Toutes les lectures avant la première écriture : reçu et acheteur en un aller-retour, puis guilde et parrain
+            snapshots = {snapshot.reference.path: snapshot async for snapshot in self.db.get_all([r_ref, b_ref], transaction=trans)}
+            if snapshots[r_ref.path].exists:
+                return None
+            documents = self._transaction_cache(trans)
+            buyer_doc = snapshots[b_ref.path]
+            buyer_data = documents[b_ref.path] = buyer_doc.to_dict() if buyer_doc.exists else self._default_user_data()
+            guild_ref = self.db.collection('guilds').document(buyer_data["guild_id"]) if buyer_data.get("guild_id") else None
+            guild_exists = bool(guild_ref) and (await guild_ref.get(transaction=trans)).exists
+            referrer_id_str = buyer_data.get("referrer")
+            referrer_ref, referrer_data = None, None
+            if referrer_id_str and referrer_id_str != str(user_id) and guild.get_member(int(referrer_id_str)):
+                referrer_ref = users.document(referrer_id_str)
+                referrer_doc = await referrer_ref.get(transaction=trans)
+                referrer_data = documents[referrer_ref.path] = referrer_doc.to_dict() if referrer_doc.exists else self._default_user_data()
+
+            if not buyer_doc.exists:
+                trans.set(b_ref, buyer_data)
+            if referrer_ref and not referrer_doc.exists:
+                trans.set(referrer_ref, referrer_data)
+
+            now = datetime.now(timezone.utc)
+            await self.add_transaction(trans, b_ref, "purchase_count", 1, "Achat")
+            await self.add_transaction(trans, b_ref, "purchase_total_value", price, "Achat")
+            if credit_used > 0:
+                await self.add_transaction(trans, b_ref, "store_credit", -credit_used, "Achat avec crédit")
+            if product.get("type") == "subscription":
+                vip_data = buyer_data.get("vip_premium")
+                buyer_data["vip_premium"] = {
+                    "starts_at": now.isoformat(),
+                    "expires_at": (now + timedelta(days=duration)).isoformat(),
+                    "consecutive_months": vip_data.get("consecutive_months", 0) + 1 if vip_data else 1
+                }
+                trans.update(b_ref, {"vip_premium": buyer_data["vip_premium"]})
+
+            # XP de l'achat (bonus VIP compris, abonnement inclus) et montée de niveau, comme grant_xp puis check_level_up
+            xp_gain = int(int(price * xp_per_euro) * self.xp_multiplier(buyer_data, now))
+            old_level = buyer_data.get("level", 1)
+            new_level = old_level
+            if xp_gain:
+                await self.add_transaction(trans, b_ref, "xp", xp_gain, "Achat")
+                await self.add_transaction(trans, b_ref, "weekly_xp", xp_gain, "Gain hebdomadaire: Achat")
+                if guild_exists:
+                    trans.update(guild_ref, {"weekly_xp": firestore.Increment(xp_gain)})
+                if not buyer_data.get("xp_gated", False):
+                    new_level = self.level_for_xp(old_level, buyer_data["xp"])
+                    if new_level != old_level:
+                        await self.add_transaction(trans, b_ref, "level", new_level - old_level, "Montée de niveau")
+
+            commission_earned = self.calculate_commission(referrer_data, price, product, option) if referrer_data else 0.0
+            if commission_earned > 0:
+                await self.add_transaction(trans, referrer_ref, "store_credit", commission_earned, f"Commission sur achat de {member.display_name}")
+                await self.add_transaction(trans, referrer_ref, "affiliate_earnings", commission_earned, "Gain d'affiliation")
+                await self.add_transaction(trans, referrer_ref, "weekly_affiliate_earnings", commission_earned, "Gain d'affiliation hebdo")
+
+            trans.set(r_ref, {
+                "user_id": user_id, "transaction_code": transaction_code,
+                "product_id": product.get("id"), "option_name": option.get("name") if option else None,
+                "price": price, "credit_used": credit_used, "xp_gained": xp_gain,
+                "referrer_id": referrer_id_str if commission_earned > 0 else None, "commission": commission_earned,
+                "processed_at": now.isoformat(),
+            })
+            return {"buyer": buyer_data, "old_level": old_level, "new_level": new_level,
+                    "referrer": referrer_data if commission_earned > 0 else None, "referrer_id": referrer_id_str}
+
+        result = await self.run_transaction(purchase_transaction, buyer_ref, receipt_ref)
+        if result is None:
+            print(f"Achat {transaction_code} de {user_id} déjà enregistré : confirmation ignorée.")
+            return True, PURCHASE_ALREADY_RECORDED
+
+        # La confirmation ne dépend que du commit : rôle, annonces et succès (qui écrivent à leur tour) suivent en tâche de fond
+        self.spawn(self._after_purchase(guild, member, product, result), name=f"purchase-effects:{transaction_code}")
         return True, "Achat enregistré."
     
-    def calculate_commission(self, referrer_data: dict, price: float, product: dict, option: Optional[dict]) -> float:
-        """Calculates affiliate commission based on comprehensive rules."""
-        aff_config = self.config.get("GAMIFICATION_CONFIG", {}).get("AFFILIATE_SYSTEM", {})
-        vip_config = self.config.get("GAMIFICATION_CONFIG", {}).get("VIP_SYSTEM", {}).get("PREMIUM", {})
-        guild_config = self.config.get("GUILD_SYSTEM", {})
-        now = datetime.now(timezone.utc)
-        
-        margin_type = product.get("margin_type", "total")
-        commissionable_amount = price - (option.get("purchase_cost", 0) if option else product.get("purchase_cost", 0)) if margin_type == "net" else price
-        if commissionable_amount <= 0: return 0.0
+    async def _after_purchase(self, guild: discord.Guild, member: discord.Member, product: dict, result: Dict[str, Any]):
+        """Effets d'un achat validé, hors Firestore ou conditionnels, à partir de l'état écrit par la transaction (aucune relecture)."""
+        if product.get("type") == "subscription":
+            vip_role_name = self.config.get("ROLES", {}).get("VIP_PREMIUM")
+            role = discord.utils.get(guild.roles, name=vip_role_name) if vip_role_name else None
+            if role: await member.add_roles(role)
 
-        guild_bonus = referrer_data.get("guild_bonus", {})
-        if guild_bonus.get("type") == 'top1':
-            return commissionable_amount * guild_config.get("WEEKLY_REWARDS", {}).get("TOP_1", {}).get("commission_rate", 0.90)
+        if result["new_level"] != result["old_level"]:
+            await self.check_referral_milestones(member, result["buyer"])
+            channel_name = self.config.get("CHANNELS", {}).get("LEVEL_UP_ANNOUNCEMENTS")
+            channel = discord.utils.get(guild.text_channels, name=channel_name) if channel_name else None
+            if channel:
+                await channel.send(f"🎉 Bravo {member.mention}, tu as atteint le niveau **{result['new_level']}** !")
 
-        base_rate = next((t.get('rate', 0) for t in sorted(aff_config.get("COMMISSION_TIERS", []), key=lambda x: x.get('level', 0), reverse=True) if referrer_data.get("level", 1) >= t.get('level', 999)), 0)
-        
-        total_boost = 0.0
-        vip_data = referrer_data.get("vip_premium")
-        if vip_data and datetime.fromisoformat(vip_data.get("expires_at", "1970-01-01T00:00:00+00:00").split('.')[0]) > now:
-            total_boost += next((t.get('bonus', 0) for t in sorted(vip_config.get("COMMISSION_BONUS_TIERS", []), key=lambda x: x.get('consecutive_months', 0), reverse=True) if vip_data.get("consecutive_months", 0) >= t.get('consecutive_months', 999)), 0)
-            
-        if referrer_data.get("permanent_affiliate_bonus", False):
-            total_boost += aff_config.get("PERMANENT_LOYALTY_BONUS", {}).get("RATE", 0)
-            
-        active_boosters = referrer_data.get("active_boosters", {})
-        for booster_id, booster_data in active_boosters.items():
-            if 'commission_booster' in booster_id and datetime.fromisoformat(booster_data.get('expires_at', "1970-01-01T00:00:00+00:00")) > now:
-                total_boost += booster_data.get('bonus', 0.0)
-                
-        total_boost += referrer_data.get("affiliate_booster", 0.0)
-        
-        if guild_bonus.get("type") in ['top2', 'top3']:
-            total_boost += guild_bonus.get("commission_boost", 0.0)
-        
-        commission_rate = base_rate + total_boost
-        
-        cap = guild_bonus.get("max_commission_rate", 1.0) if guild_bonus.get("type") in ['top2', 'top3'] else 1.0
-        
-        final_rate = min(commission_rate, cap)
-        return commissionable_amount * final_rate
+        await self.check_achievements(member, result["buyer"])
+        if result["referrer"]:
+            await self.check_achievements(guild.get_member(int(result["referrer_id"])), result["referrer"])
+
+    def calculate_commission(self, referrer_data: dict, price: float, product: dict, option: Optional[dict]) -> float:
+        """Commission d'affiliation d'un achat (règles compilées dans self.commission_engine)."""
+        return self.commission_engine.commission(referrer_data, price, product, option)
 
     async def grant_cashout_commission(self, referrer_id_str: str, amount_cashed_out: float, referral_member: discord.Member, guild: discord.Guild):
         """Grants commission to a referrer when their referral cashes out."""
@@ -565,12 +756,12 @@ class ManagerCog(commands.Cog):
 
         commission_earned = amount_cashed_out * rate
         if commission_earned > 0:
-            @transaction.async_transactional
+            @async_transactional
             async def cashout_commission_tx(trans, ref):
                 await self.add_transaction(trans, ref, "store_credit", commission_earned, f"Commission sur cashout de {referral_member.display_name}")
                 await self.add_transaction(trans, ref, "affiliate_earnings", commission_earned, "Gain d'affiliation (cashout)")
                 await self.add_transaction(trans, ref, "weekly_affiliate_earnings", commission_earned, "Gain d'affiliation hebdo (cashout)")
-            await self.db.run_transaction(cashout_commission_tx, referrer_ref)
+            await self.run_transaction(cashout_commission_tx, referrer_ref)
             
             try:
                 await referrer.send(f"💸 Votre filleul {referral_member.display_name} a retiré de l'argent ! Vous gagnez une commission de **{commission_earned:.2f} crédits**.")
@@ -580,7 +771,7 @@ class ManagerCog(commands.Cog):
         user_ref = self.db.collection('users').document(str(interaction.user.id))
         xp_config = self.config.get("GAMIFICATION_CONFIG", {}).get("XP_SYSTEM", {}).get("XP_PURCHASE", {})
         
-        @transaction.async_transactional
+        @async_transactional
         async def purchase_xp_tx(trans, u_ref, credits):
             user_data = await self.get_or_create_user_data(u_ref, trans)
             if user_data.get("store_credit", 0) < credits:
@@ -594,7 +785,7 @@ class ManagerCog(commands.Cog):
             
             return {"success": True, "xp_gained": xp_gained}
 
-        result = await self.db.run_transaction(purchase_xp_tx, user_ref, credits_to_spend)
+        result = await self.run_transaction(purchase_xp_tx, user_ref, credits_to_spend)
 
         if result["success"]:
             await self.check_level_up(interaction.user)
@@ -632,25 +823,25 @@ class ManagerCog(commands.Cog):
         
         euros_to_send = amount * cashout_config.get("CREDIT_TO_EUR_RATE", 1.0)
         
-        @transaction.async_transactional
+        @async_transactional
         async def cashout_request_tx(trans, ref):
             await self.add_transaction(trans, ref, "store_credit", -amount, f"Demande de retrait de {amount:.2f} crédits")
-        await self.db.run_transaction(cashout_request_tx, user_ref)
+        await self.run_transaction(cashout_request_tx, user_ref)
         
         requests_channel_name = self.config.get("CHANNELS", {}).get("CASHOUT_REQUESTS")
         if not requests_channel_name:
-            @transaction.async_transactional
+            @async_transactional
             async def refund_tx(trans, ref):
                 await self.add_transaction(trans, ref, "store_credit", amount, "Remboursement - Erreur canal de retrait")
-            await self.db.run_transaction(refund_tx, user_ref)
+            await self.run_transaction(refund_tx, user_ref)
             return await interaction.followup.send("❌ Erreur critique : le salon des demandes de retrait n'est pas configuré. Votre demande a été annulée et vos crédits restaurés.", ephemeral=True)
 
         channel = discord.utils.get(interaction.guild.text_channels, name=requests_channel_name)
         if not channel:
-            @transaction.async_transactional
+            @async_transactional
             async def refund_tx_2(trans, ref):
                 await self.add_transaction(trans, ref, "store_credit", amount, "Remboursement - Erreur canal de retrait")
-            await self.db.run_transaction(refund_tx_2, user_ref)
+            await self.run_transaction(refund_tx_2, user_ref)
             return await interaction.followup.send("❌ Erreur critique : le salon des demandes de retrait est introuvable. Votre demande a été annulée et vos crédits restaurés.", ephemeral=True)
 
         from .admin_cog import CashoutRequestView # Local import
@@ -690,25 +881,81 @@ class ManagerCog(commands.Cog):
         await channel.send(embed=embed)
         await interaction.followup.send("✅ Votre défi a été soumis au staff pour validation !", ephemeral=True)
 
-    async def update_mission_progress(self, user: discord.Member, mission_id: str, progress_amount: int):
-        user_ref = self.db.collection('users').document(str(user.id))
-        user_data = await self.get_or_create_user_data(user_ref)
+    def _cache_missions(self, user_id: int, missions: Dict[str, Optional[dict]]) -> Dict[str, Optional[dict]]:
+        cached = self.mission_cache.setdefault(user_id, missions)
+        self.mission_cache.move_to_end(user_id)
+        while len(self.mission_cache) > self.MISSION_CACHE_SIZE:
+            self.mission_cache.popitem(last=False)
+        return cached
+
+    async def _get_cached_missions(self, user_id: int) -> Dict[str, Optional[dict]]:
+        missions = self.mission_cache.get(user_id)
+        if missions is not None:
+            self.mission_cache_hits += 1
+            self.mission_cache.move_to_end(user_id)
+            return missions
+        self.mission_cache_misses += 1
+        user_data = await self.get_or_create_user_data(self.db.collection('users').document(str(user_id)))
+        return self._cache_missions(user_id, {f: user_data.get(f) for f in self.MISSION_FIELDS})
 
-        for mission_type in ["current_daily_mission", "current_weekly_mission"]:
-            mission = user_data.get(mission_type)
-            if mission and mission.get('id') == mission_id and not mission.get('completed', False):
-                mission['progress'] += progress_amount
-                if mission.get('progress', 0) >= mission.get('target', 999999):
-                    mission['completed'] = True
-                    await self.grant_xp(user, mission.get('reward_xp', 0), f"Mission complétée: {mission.get('description')}")
-                    if user_data.get('missions_opt_in', True):
-                        try:
-                            await user.send(f"🎉 **Mission accomplie !**\n> {mission.get('description')}\n**Récompense :** +{mission.get('reward_xp', 0)} XP")
-                        except discord.Forbidden: pass
-                await user_ref.update({mission_type: mission})
+    async def update_mission_progress(self, user: discord.Member, mission_id: str, progress_amount: int):
+        """
+        Fait progresser la mission active correspondante via un Increment Firestore.
+        Les missions actives sont gardées en cache : un événement qui ne correspond à aucune mission ne coûte rien.
+        """
+        missions = await self._get_cached_missions(user.id)
+
+        for mission_type in self.MISSION_FIELDS:
+            mission = missions.get(mission_type)
+            if not mission or mission.get('id') != mission_id or mission.get('completed', False):
+                continue
+
+            # Mise à jour synchrone du cache avant tout await : une seule coroutine franchit l'objectif
+            mission['progress'] = mission.get('progress', 0) + progress_amount
+            user_ref = self.db.collection('users').document(str(user.id))
+            if mission['progress'] < mission.get('target', 999999):
+                try:
+                    await user_ref.update({f"{mission_type}.progress": firestore.Increment(progress_amount)})
+                except Exception:
+                    mission['progress'] -= progress_amount  # l'incrément n'a pas été écrit
+                    raise
                 break
 
+            mission['completed'] = True
+            try:
+                await self._complete_mission(user, user_ref, mission_type, mission, progress_amount)
+            except Exception:
+                # Firestore n'a peut-être rien enregistré : rechargement au prochain événement, la transaction
+                # vérifiant `completed`, la récompense ne peut pas être versée deux fois
+                self.mission_cache.pop(user.id, None)
+                raise
+            break
+
+    async def _complete_mission(self, user: discord.Member, user_ref: firestore.AsyncDocumentReference, mission_type: str, mission: dict, progress_amount: int):
+        """Marque la mission complétée dans une transaction, puis récompense une seule fois."""
+        @async_transactional
+        async def complete_mission_tx(trans, ref):
+            doc = await ref.get(transaction=trans)
+            stored = (doc.to_dict() or {}).get(mission_type) if doc.exists else None
+            if not stored or stored.get('completed', False) or stored.get('id') != mission.get('id') or stored.get('assigned_at') != mission.get('assigned_at'):
+                return None
+            trans.update(ref, {f"{mission_type}.progress": firestore.Increment(progress_amount), f"{mission_type}.completed": True})
+            return doc.to_dict().get('missions_opt_in', True)
+
+        missions_opt_in = await self.run_transaction(complete_mission_tx, user_ref)
+        if missions_opt_in is None:
+            # Cache désynchronisé (mission réassignée ou déjà récompensée ailleurs) : rechargement au prochain événement
+            self.mission_cache.pop(user.id, None)
+            return
+
+        await self.grant_xp(user, mission.get('reward_xp', 0), f"Mission complétée: {mission.get('description')}")
+        if missions_opt_in:
+            try:
+                await user.send(f"🎉 **Mission accomplie !**\n> {mission.get('description')}\n**Récompense :** +{mission.get('reward_xp', 0)} XP")
+            except discord.Forbidden: pass
+
     @tasks.loop(hours=24)
+    @timed_task()
     async def mission_assignment_task(self):
         mission_config = self.config.get("MISSION_SYSTEM", {})
         if not mission_config.get("ENABLED", False): return
@@ -716,6 +963,7 @@ class ManagerCog(commands.Cog):
         daily_templates = [t for t in mission_config.get("TEMPLATES", []) if t.get("type") == "daily"]
         weekly_templates = [t for t in mission_config.get("TEMPLATES", []) if t.get("type") == "weekly"]
         is_new_week = datetime.now(timezone.utc).weekday() == 0
+        assigned_at = datetime.now(timezone.utc).isoformat()
 
         users_stream = self.db.collection('users').stream()
         async for user_doc in users_stream:
@@ -726,7 +974,8 @@ class ManagerCog(commands.Cog):
             update_data = {
                 "current_daily_mission": {
                     "id": new_daily.get("id"), "description": new_daily.get("description", "Faire {target} choses.").format(target=target),
-                    "target": target, "progress": 0, "reward_xp": reward, "completed": False
+                    "target": target, "progress": 0, "reward_xp": reward, "completed": False,
+                    "assigned_at": assigned_at
                 }
             }
 
@@ -736,13 +985,19 @@ class ManagerCog(commands.Cog):
                 reward_w = random.randint(*new_weekly.get("reward_xp_range", [300,500]))
                 update_data["current_weekly_mission"] = {
                     "id": new_weekly.get("id"), "description": new_weekly.get("description", "Faire {target} choses.").format(target=target_w),
-                    "target": target_w, "progress": 0, "reward_xp": reward_w, "completed": False
+                    "target": target_w, "progress": 0, "reward_xp": reward_w, "completed": False,
+                    "assigned_at": assigned_at
                 }
             
             await user_doc.reference.update(update_data)
+            # Seules les entrées déjà en cache sont rafraîchies, les autres seront chargées à la demande
+            cached = self.mission_cache.get(int(user_doc.id))
+            if cached is not None:
+                cached.update({k: dict(v) for k, v in update_data.items()})
 
 
     @tasks.loop(hours=1)
+    @timed_task()
     async def check_vip_status_task(self):
         vip_config = self.config.get("GAMIFICATION_CONFIG", {}).get("VIP_SYSTEM", {}).get("PREMIUM", {})
         if not vip_config: return
@@ -769,6 +1024,7 @@ class ManagerCog(commands.Cog):
 
 
     @tasks.loop(hours=168) # Weekly
+    @timed_task()
     async def weekly_coaching_report_task(self):
         if not self.model: return
         
@@ -788,12 +1044,13 @@ class ManagerCog(commands.Cog):
                     weekly_affiliate_earnings=user_data.get('weekly_affiliate_earnings', 0.0)
                 )
                 try:
-                    response = await self.model.generate_content_async(prompt)
+                    response = await self.generate_ai_content(prompt, feature="coaching", priority=BATCH)
                     await user.send(response.text)
                 except Exception as e:
                     print(f"Erreur envoi coaching DM à {user_id}: {e}")
 
     @tasks.loop(hours=168) # 7 days * 24 hours
+    @timed_task()
     async def weekly_leaderboard_task(self):
         print("Lancement de la tâche de classement hebdomadaire...")
         guild_id_str = self.config.get("GUILD_ID")
@@ -867,6 +1124,7 @@ class ManagerCog(commands.Cog):
         async for user_doc in all_users_reset_stream:
             reset_batch.update(user_doc.reference, {"weekly_xp": 0, "weekly_affiliate_earnings": 0, "affiliate_booster": 0.0})
         await reset_batch.commit()
+        self.leaderboards.reset(WEEKLY_KEYS)
             
         guild_reset_batch = self.db.batch()
         all_guilds_reset_stream = self.db.collection('guilds').stream()
@@ -876,6 +1134,39 @@ class ManagerCog(commands.Cog):
             
         print("Tâche de classement hebdomadaire terminée.")
 
+    @tasks.loop(minutes=5)
+    @timed_task()
+    async def xp_admission_cleanup_task(self):
+        purged = self.xp_admission.purge()
+        stats = self.xp_admission.stats()
+        if purged:
+            print(f"Filtre anti-farm: {purged} état(s) expiré(s) purgé(s). Admis: {stats['admitted']}, en cooldown: {stats['cooldown']}, écartés: {stats['dropped']}, suivis: {stats['tracked_users']}.")
+
+    @tasks.loop(minutes=60)
+    async def firestore_cost_report_task(self):
+        if self.firestore_cost_report_task.current_loop == 0:
+            return  # la première itération est immédiate : fenêtre encore vide
+        print(ACCOUNTING.report())
+
+    @tasks.loop(hours=1)
+    @timed_task()
+    async def ai_usage_rollup_task(self):
+        """Verse l'usage Gemini de l'heure écoulée dans ai_usage_daily/{jour} ; rapport de la veille au changement de jour."""
+        pending = AI_ACCOUNTING.take_pending()
+        try:
+            for day, features in pending.items():
+                await self.db.collection('ai_usage_daily').document(day).set(AI_ACCOUNTING.rollup_document(features, firestore.Increment), merge=True)
+        except Exception as e:
+            AI_ACCOUNTING.restore_pending(pending)  # republié à la prochaine itération
+            print(f"Erreur de publication de l'usage Gemini : {e}")
+            return
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        for day in sorted(AI_ACCOUNTING.days):
+            if day < today and day not in self._reported_ai_days:
+                print(AI_ACCOUNTING.report(day))
+                self._reported_ai_days.add(day)
+        AI_ACCOUNTING.prune()
+
     @weekly_leaderboard_task.before_loop
     @mission_assignment_task.before_loop
     @check_vip_status_task.before_loop
@@ -8,33 +8,25 @@ from typing import Dict, Any, Optional
 import os
 import re
 import uuid
-import asyncio
 
 from .manager_cog import ManagerCog
 from .catalogue_cog import PurchasePromoView # FIX: Import from the correct cog
 from google.cloud import firestore
-from google.cloud.firestore_v1 import transaction
+from google.cloud.firestore_v1.async_transaction import async_transactional
 
-try:
-    import google.generativeai as genai
-    from google.generativeai.types import GenerationConfig
-    AI_AVAILABLE = True
-except ImportError:
-    AI_AVAILABLE = False
 
 class ModeratorCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.manager: Optional[ManagerCog] = None
-        self.model: Optional[genai.GenerativeModel] = None
+        self.model: Optional[Any] = None
 
     async def cog_load(self):
-        await asyncio.sleep(1) # Wait for ManagerCog
-        self.manager = self.bot.get_cog('ManagerCog')
+        self.manager = await self.bot.wait_until_cog_ready('ManagerCog')
         if not self.manager:
             return print("ERREUR CRITIQUE: ModeratorCog n'a pas pu trouver le ManagerCog.")
         
-        if AI_AVAILABLE and self.manager.model:
+        if self.manager.ai.available:
             self.model = self.manager.model
             print("✅ Moderator Cog: Modèle Gemini partagé.")
         else:
@@ -66,14 +58,14 @@ class ModeratorCog(commands.Cog):
     async def apply_warning(self, member: discord.Member, reason: str, jump_url: str, is_dm: bool = True):
         user_ref = self.manager.db.collection('users').document(str(member.id))
         
-        @transaction.async_transactional
+        @async_transactional
         async def increment_warning(trans, ref):
             # This is now a self-contained transaction function
             await self.manager.add_transaction(trans, ref, 'warnings', 1, f"Avertissement: {reason}")
             user_data = await self.manager.get_or_create_user_data(ref, trans)
             return user_data.get('warnings', 0)
 
-        warning_count = await self.manager.db.run_transaction(increment_warning, user_ref)
+        warning_count = await self.manager.run_transaction(increment_warning, user_ref)
         
         threshold = self.manager.config.get("MODERATION_CONFIG", {}).get("WARNING_THRESHOLD", 3)
         if is_dm:
@@ -95,7 +87,7 @@ class ModeratorCog(commands.Cog):
     @promo.command(name="creer", description="Crée une promotion flash avec une description améliorée par IA.")
     @app_commands.describe(nom="Nom du produit.", description_courte="Description brève pour l'IA.", prix="Prix de vente.", prix_achat="Coût d'achat (marge).")
     async def promo_creer(self, interaction: discord.Interaction, nom: str, description_courte: str, prix: float, prix_achat: float):
-        if not self.manager or not self.manager.model: return await interaction.response.send_message("Module IA non dispo.", ephemeral=True)
+        if not self.manager or not self.manager.ai.available: return await interaction.response.send_message("Module IA non dispo.", ephemeral=True)
         await interaction.response.defer(ephemeral=True)
         generated_desc = await self.manager.query_gemini_for_promo(nom, description_courte)
         promo_id = str(uuid.uuid4())
@@ -392,23 +392,34 @@ const App = () => {
         setIsLoading(true);
         setError(null);
         try {
-            const [configRes, productsRes, achievementsRes, creditShopRes] = await Promise.all([
-                fetch('/config.json'),
-                fetch('/products.json'),
-                fetch('/achievements_config.json'),
-                fetch('/credit_shop_items.json')
-            ]);
-            
-            if (!configRes.ok || !productsRes.ok || !achievementsRes.ok || !creditShopRes.ok) {
-                throw new Error(`Un ou plusieurs fichiers n'ont pas pu être chargés (status: ${configRes.status}, ${productsRes.status}, etc.)`);
-            }
+            // Un seul appel (compressé, avec ETag) quand le bot sert le paquet ; sinon les quatre fichiers séparément
+            const bundleRes = await fetch('/bundle.json').catch(() => null);
+            let configData, productsData, achievementsData, creditShopData;
+            if (bundleRes && bundleRes.ok) {
+                const bundle = await bundleRes.json();
+                configData = bundle.config;
+                productsData = bundle.products;
+                achievementsData = bundle.achievements_config;
+                creditShopData = bundle.credit_shop_items;
+            } else {
+                const [configRes, productsRes, achievementsRes, creditShopRes] = await Promise.all([
+                    fetch('/config.json'),
+                    fetch('/products.json'),
+                    fetch('/achievements_config.json'),
+                    fetch('/credit_shop_items.json')
+                ]);
+                
+                if (!configRes.ok || !productsRes.ok || !achievementsRes.ok || !creditShopRes.ok) {
+                    throw new Error(`Un ou plusieurs fichiers n'ont pas pu être chargés (status: ${configRes.status}, ${productsRes.status}, etc.)`);
+                }
 
-            const [configData, productsData, achievementsData, creditShopData] = await Promise.all([
-                configRes.json(),
-                productsRes.json(),
-                achievementsRes.json(),
-                creditShopRes.json()
-            ]);
+                [configData, productsData, achievementsData, creditShopData] = await Promise.all([
+                    configRes.json(),
+                    productsRes.json(),
+                    achievementsRes.json(),
+                    creditShopRes.json()
+                ]);
+            }
 
             setConfig(configData);
             setProducts(productsData);
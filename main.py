@@ -1,26 +1,59 @@
+import time
+_PROCESS_START = time.perf_counter()  # avant les imports lourds : origine du temps de démarrage mesuré
 import os
 import asyncio
 import discord
 from discord.ext import commands
 import json
 import traceback
+from typing import Dict, Optional
 from aiohttp import web # Librairie pour le serveur web asynchrone
 
+from utils.static_bundle import StaticDataBundle
+from utils.cog_loader import CogLoader
+from utils.loop_monitor import LoopLagMonitor, BLOCKING_CALLS
+from utils.health import HealthMonitor
+from utils.firestore_accounting import ACCOUNTING, set_origin, current_trace
+from utils.metrics import REGISTRY, EVENT_DURATION, EVENT_ERRORS, COMMAND_LATENCY, COMMAND_ERRORS, COMPONENT_GAUGE
+
 # --- Configuration Globale ---
-# Assurez-vous que cette liste correspond bien à tous vos fichiers de cogs
-COGS_TO_LOAD = [
-    'cogs.manager_cog',
-    'cogs.catalogue_cog',
-    'cogs.assistant_cog',
-    'cogs.moderator_cog',
-    'cogs.giveaway_cog',
-    'cogs.guild_cog',
-    'cogs.credit_shop_cog',
-    'cogs.admin_cog',
-    'cogs.lottery_cog',
-    'cogs.events_cog',
-    'cogs.leaderboard_cog'
-]
+# Extensions (cogs) et leurs dépendances : chaque cog démarre dès que les siens sont prêts, les autres en parallèle
+COGS_TO_LOAD = {
+    'cogs.manager_cog': (),
+    'cogs.catalogue_cog': ('cogs.manager_cog',),
+    'cogs.assistant_cog': ('cogs.manager_cog',),
+    'cogs.moderator_cog': ('cogs.manager_cog',),
+    'cogs.giveaway_cog': ('cogs.manager_cog',),
+    'cogs.guild_cog': ('cogs.manager_cog',),
+    'cogs.credit_shop_cog': ('cogs.manager_cog', 'cogs.lottery_cog'),
+    'cogs.admin_cog': ('cogs.manager_cog',),
+    'cogs.lottery_cog': ('cogs.manager_cog',),
+    'cogs.events_cog': ('cogs.manager_cog',),
+    'cogs.leaderboard_cog': ('cogs.manager_cog',),
+}
+
+# Délai maximal d'attente d'un cog dont un autre dépend (wait_until_cog_ready)
+COG_READY_TIMEOUT = 60.0
+
+# Budget (s) entre le lancement du processus et la connexion à la gateway ; 0 pour ne pas le contrôler
+STARTUP_BUDGET_SECONDS = float(os.environ.get("STARTUP_BUDGET_SECONDS", 0) or 0)
+
+# Surveillance de la boucle asyncio : seuil (s) au-delà duquel la pile du code bloquant est journalisée,
+# et mode de débogage signalant les appels fichier/réseau bloquants faits depuis une coroutine
+LOOP_LAG_THRESHOLD_SECONDS = float(os.environ.get("LOOP_LAG_THRESHOLD_SECONDS", 0.25))
+LOOP_BLOCKING_DEBUG = os.environ.get("LOOP_BLOCKING_DEBUG", "").lower() in ("1", "true", "yes")
+
+# /healthz échoue au-delà de ce retard de boucle ; /readyz sonde Firestore au plus une fois par FIRESTORE_PROBE_TTL_SECONDS
+HEALTH_MAX_LOOP_LAG_SECONDS = float(os.environ.get("HEALTH_MAX_LOOP_LAG_SECONDS", 2.0))
+FIRESTORE_PROBE_TTL_SECONDS = float(os.environ.get("FIRESTORE_PROBE_TTL_SECONDS", 15.0))
+
+# Fichiers servis au tableau de bord (index.tsx), individuellement et regroupés dans /bundle.json
+STATIC_DATA_FILES = {
+    'config': 'config.json',
+    'products': 'products.json',
+    'achievements_config': 'achievements_config.json',
+    'credit_shop_items': 'credit_shop_items.json',
+}
 
 # Le token est lu depuis les variables d'environnement, ce qui est sécurisé.
 BOT_TOKEN = os.environ.get("DISCORD_TOKEN")
@@ -31,6 +64,73 @@ async def health_check(request):
     return web.Response(text="Le bot est en ligne et fonctionnel.")
 
 
+async def static_data(request):
+    """Sert un fichier de données (ou le paquet complet) pré-compressé, avec ETag et réponses 304."""
+    bundle: StaticDataBundle = request.app['static_bundle']
+    result = bundle.respond(request.match_info['name'], request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding'))
+    if result is None:
+        raise web.HTTPNotFound()
+    status, headers, body = result
+    return web.Response(status=status, headers=headers, body=body)
+
+
+async def metrics(request):
+    """Expose les métriques au format texte Prometheus."""
+    return web.Response(text=REGISTRY.render(), content_type="text/plain", charset="utf-8", headers={"X-Content-Type-Options": "nosniff"})
+
+
+async def healthz(request):
+    """Vivacité : le processus répond et sa boucle asyncio n'est pas bloquée."""
+    ok, detail = request.app['health'].liveness()
+    return web.json_response({"status": "ok" if ok else "ko", **detail}, status=200 if ok else 503)
+
+
+async def readyz(request):
+    """Disponibilité : gateway connectée, cogs chargés, Firestore joignable, tâches de fond actives."""
+    ok, detail = await request.app['health'].readiness()
+    return web.json_response({"status": "ok" if ok else "ko", **detail}, status=200 if ok else 503)
+
+
+async def loop_status(request):
+    """Retard de la boucle asyncio (percentiles) et, en mode débogage, les appels bloquants relevés."""
+    return web.json_response(request.app['loop_monitor'].snapshot())
+
+
+def _command_label(command) -> str:
+    return getattr(command, "qualified_name", None) or "inconnue"
+
+
+def _interaction_age(interaction: discord.Interaction) -> float:
+    """Secondes écoulées depuis la création de l'interaction (horodatage de son snowflake)."""
+    return max(0.0, (discord.utils.utcnow() - interaction.created_at).total_seconds())
+
+
+def _finish_trace():
+    trace = current_trace()
+    if trace is not None:
+        ACCOUNTING.finish_trace(trace)
+
+
+class InstrumentedCommandTree(discord.app_commands.CommandTree):
+    """CommandTree qui compte les commandes slash en erreur avant le traitement d'erreur habituel."""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Appelé dans la tâche de l'interaction, juste avant le callback : les accès Firestore qui suivent lui sont imputés
+        label = _command_label(interaction.command)
+        if interaction.type is discord.InteractionType.autocomplete:
+            set_origin(f"autocomplete:/{label}")
+        else:
+            set_origin(f"command:/{label}", trace=ACCOUNTING.should_trace(label))
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
+        label = _command_label(interaction.command)
+        COMMAND_ERRORS.inc(command=label)
+        COMMAND_LATENCY.observe(_interaction_age(interaction), command=label)
+        _finish_trace()
+        await super().on_error(interaction, error)
+
+
 class ResellBoostBot(commands.Bot):
     """
     Classe personnalisée pour le bot, utilisant setup_hook pour un chargement robuste.
@@ -43,9 +143,40 @@ class ResellBoostBot(commands.Bot):
         intents.reactions = True
         intents.guilds = True
         intents.invites = True
-        super().__init__(command_prefix="!", intents=intents)
+        super().__init__(command_prefix="!", intents=intents, tree_cls=InstrumentedCommandTree)
         self.synced = False # Pour s'assurer de ne synchroniser qu'une seule fois
         self.web_runner = None
+        # Reconstruit par ManagerCog à chaque rechargement des données statiques
+        self.static_bundle = StaticDataBundle(STATIC_DATA_FILES)
+        # nom du cog -> événement posé une fois son cog_load terminé
+        self._cog_ready: Dict[str, asyncio.Event] = {}
+        self.startup_seconds: Optional[float] = None
+        self.loop_monitor = LoopLagMonitor(threshold=LOOP_LAG_THRESHOLD_SECONDS)
+        self.health = HealthMonitor(self, self.loop_monitor, COGS_TO_LOAD, lambda: getattr(self.get_cog('ManagerCog'), 'db', None),
+                                    max_loop_lag=HEALTH_MAX_LOOP_LAG_SECONDS, probe_ttl=FIRESTORE_PROBE_TTL_SECONDS)
+
+    def _cog_ready_event(self, name: str) -> asyncio.Event:
+        event = self._cog_ready.get(name)
+        if event is None:
+            event = self._cog_ready[name] = asyncio.Event()
+        return event
+
+    async def add_cog(self, cog: commands.Cog, /, **kwargs):
+        await super().add_cog(cog, **kwargs)  # attend le cog_load
+        self._cog_ready_event(cog.qualified_name).set()
+
+    async def remove_cog(self, name: str, /, **kwargs) -> Optional[commands.Cog]:
+        self._cog_ready_event(name).clear()
+        return await super().remove_cog(name, **kwargs)
+
+    async def wait_until_cog_ready(self, name: str, timeout: float = COG_READY_TIMEOUT) -> Optional[commands.Cog]:
+        """Cog `name` une fois chargé (cog_load terminé), ou None passé le délai. Remplace les attentes fixes."""
+        try:
+            await asyncio.wait_for(self._cog_ready_event(name).wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Le cog '{name}' n'est pas prêt après {timeout:.0f} s.")
+            return None
+        return self.get_cog(name)
 
     async def setup_hook(self):
         """
@@ -53,17 +184,30 @@ class ResellBoostBot(commands.Bot):
         Charge toutes les extensions (cogs) et démarre le serveur web.
         """
         print("--- Démarrage du setup_hook ---")
-        for cog_name in COGS_TO_LOAD:
-            try:
-                await self.load_extension(cog_name)
-                print(f"✅ Cog '{cog_name}' chargé avec succès.")
-            except Exception as e:
-                print(f"❌ Erreur lors du chargement du cog '{cog_name}': {e}")
-                traceback.print_exc()
+        if LOOP_BLOCKING_DEBUG:
+            BLOCKING_CALLS.enable()
+            print("🐢 Détection des appels bloquants activée (LOOP_BLOCKING_DEBUG).")
+        self.loop_monitor.start()
+        REGISTRY.register_collector("event_loop", self.loop_monitor.collect_metrics)
+        loader = CogLoader(self, COGS_TO_LOAD)
+        await loader.load_all()
+        print(loader.report())
+        path, seconds = loader.critical_path()
+        print(f"Chemin critique : {' → '.join(path)} ({seconds:.2f} s)")
         
         # Démarrage du serveur web aiohttp en arrière-plan
+        if not self.static_bundle.ready:
+            await asyncio.to_thread(self.static_bundle.rebuild)
         app = web.Application()
+        app['static_bundle'] = self.static_bundle
+        app['loop_monitor'] = self.loop_monitor
+        app['health'] = self.health
         app.router.add_get('/', health_check)
+        app.router.add_get('/healthz', healthz)
+        app.router.add_get('/readyz', readyz)
+        app.router.add_get('/metrics', metrics)
+        app.router.add_get('/loop', loop_status)
+        app.router.add_get('/{name}.json', static_data)
         self.web_runner = web.AppRunner(app)
         await self.web_runner.setup()
         port = int(os.environ.get('PORT', 8080))
@@ -72,6 +216,46 @@ class ResellBoostBot(commands.Bot):
         print(f"Serveur web pour le health check démarré sur le port {port}.")
 
 
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        """Chaque listener (bot et cogs) passe par ici : mesure sa durée pour /metrics."""
+        listener = getattr(coro, "__qualname__", event_name)
+        set_origin(f"listener:{listener}")  # chaque événement s'exécute dans sa propre tâche
+        start = time.perf_counter()
+        try:
+            await coro(*args, **kwargs)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            EVENT_ERRORS.inc(event=event_name, listener=listener)
+            try:
+                await self.on_error(event_name, *args, **kwargs)
+            except asyncio.CancelledError:
+                pass
+        finally:
+            EVENT_DURATION.observe(time.perf_counter() - start, event=event_name, listener=listener)
+
+    async def on_connect(self):
+        self.health.gateway_connected = True
+        if self.startup_seconds is not None:
+            return  # reconnexions : seul le démarrage à froid est mesuré
+        self.startup_seconds = time.perf_counter() - _PROCESS_START
+        COMPONENT_GAUGE.set(self.startup_seconds, component="startup", stat="seconds_to_gateway")
+        message = f"⏱️ Connecté à la gateway {self.startup_seconds:.2f} s après le lancement du processus"
+        if STARTUP_BUDGET_SECONDS and self.startup_seconds > STARTUP_BUDGET_SECONDS:
+            message += f" ⚠️ budget de {STARTUP_BUDGET_SECONDS:.2f} s dépassé"
+        print(message)
+
+    async def on_resumed(self):
+        self.health.gateway_connected = True
+
+    async def on_disconnect(self):
+        self.health.gateway_connected = False
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        COMMAND_LATENCY.observe(_interaction_age(interaction), command=_command_label(command))
+        # Événement distribué depuis la tâche de la commande : le contexte (et sa trace) est hérité
+        _finish_trace()
+
     async def on_ready(self):
         """
         Événement appelé lorsque le bot est connecté et prêt.
@@ -98,6 +282,8 @@ class ResellBoostBot(commands.Bot):
     async def close(self):
         """S'assure que tout est bien arrêté, y compris le serveur web."""
         await super().close()
+        self.loop_monitor.close()
+        self.health.close()
         if self.web_runner:
             await self.web_runner.cleanup()
             print("Serveur web arrêté proprement.")
@@ -0,0 +1 @@
+# Modules utilitaires partagés par les cogs (aucun n'est chargé comme extension).
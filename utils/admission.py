@@ -0,0 +1,104 @@
+import re
+import time
+import zlib
+from collections import Counter, deque
+from typing import Dict, Any, Optional
+
+# Verdicts renvoyés par MessageAdmissionFilter.check()
+ADMIT = "admit"          # Message récompensable : XP + missions
+COOLDOWN = "cooldown"    # Message légitime mais XP en cooldown : missions uniquement
+TOO_SHORT = "too_short"  # Sous ANTI_FARM_MIN_WORDS : ignoré
+DUPLICATE = "duplicate"  # Copier-coller récent du même auteur : ignoré
+BURST = "burst"          # Rafale de messages (flood) : ignoré
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class _UserState:
+    __slots__ = ("last_admit", "recent", "hashes", "last_seen")
+
+    def __init__(self, burst_max: int, hash_history: int):
+        self.last_admit = float("-inf")
+        self.recent = deque(maxlen=burst_max + 1)
+        self.hashes = deque(maxlen=hash_history)
+        self.last_seen = 0.0
+
+
+class MessageAdmissionFilter:
+    """
+    Filtre anti-farm en mémoire, appliqué avant toute lecture Firestore.
+    Les messages non récompensables sont écartés sans coût réseau ; Firestore reste la source de vérité
+    (le cooldown est revérifié dans grant_xp) pour les redémarrages et les instances multiples.
+    """
+
+    def __init__(self, xp_config: Optional[Dict[str, Any]] = None, hash_history: int = 8):
+        self.hash_history = hash_history
+        self.users: Dict[int, _UserState] = {}
+        self.counters: Counter = Counter()
+        self.configure(xp_config or {})
+
+    def configure(self, xp_config: Dict[str, Any]):
+        self.min_words = xp_config.get("ANTI_FARM_MIN_WORDS", 0)
+        self.cooldown = xp_config.get("ANTI_FARM_COOLDOWN_SECONDS", 60)
+        self.duplicate_window = xp_config.get("ANTI_FARM_DUPLICATE_WINDOW_SECONDS", 300)
+        self.burst_window = xp_config.get("ANTI_FARM_BURST_WINDOW_SECONDS", 10)
+        self.burst_max = xp_config.get("ANTI_FARM_BURST_MAX_MESSAGES", 5)
+        # Au-delà de cette durée d'inactivité, l'état d'un utilisateur n'apporte plus rien
+        self.state_ttl = max(self.cooldown, self.duplicate_window, self.burst_window)
+        self.users.clear()
+
+    @staticmethod
+    def _content_hash(content: str) -> int:
+        normalized = _WHITESPACE_RE.sub(' ', content.lower()).strip()
+        return zlib.crc32(normalized.encode('utf-8'))
+
+    def check(self, user_id: int, content: str, now: Optional[float] = None) -> str:
+        """Classe un message et met à jour l'état de l'auteur. Ne fait aucun appel réseau."""
+        if len(content.split()) < self.min_words:
+            self.counters[TOO_SHORT] += 1
+            return TOO_SHORT
+
+        now = time.monotonic() if now is None else now
+        state = self.users.get(user_id)
+        if state is None:
+            state = self.users[user_id] = _UserState(self.burst_max, self.hash_history)
+        state.last_seen = now
+
+        # Détection de rafale : fenêtre glissante sur les derniers horodatages
+        state.recent.append(now)
+        if len(state.recent) > self.burst_max and now - state.recent[0] < self.burst_window:
+            self.counters[BURST] += 1
+            return BURST
+
+        content_hash = self._content_hash(content)
+        if any(h == content_hash and now - ts < self.duplicate_window for ts, h in state.hashes):
+            self.counters[DUPLICATE] += 1
+            return DUPLICATE
+        state.hashes.append((now, content_hash))
+
+        if now - state.last_admit < self.cooldown:
+            self.counters[COOLDOWN] += 1
+            return COOLDOWN
+
+        state.last_admit = now
+        self.counters[ADMIT] += 1
+        return ADMIT
+
+    def purge(self, now: Optional[float] = None) -> int:
+        """Supprime les états expirés pour borner la mémoire. Renvoie le nombre d'entrées retirées."""
+        now = time.monotonic() if now is None else now
+        expired = [uid for uid, state in self.users.items() if now - state.last_seen > self.state_ttl]
+        for uid in expired:
+            del self.users[uid]
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        # COOLDOWN n'est pas écarté : le message compte encore pour les missions
+        dropped = sum(count for verdict, count in self.counters.items() if verdict not in (ADMIT, COOLDOWN))
+        return {
+            "admitted": self.counters[ADMIT],
+            "cooldown": self.counters[COOLDOWN],
+            "dropped": dropped,
+            "by_verdict": dict(self.counters),
+            "tracked_users": len(self.users),
+        }
@@ -0,0 +1,119 @@
+import math
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+from utils.metrics import REGISTRY
+
+AI_PROMPT_TOKENS = REGISTRY.histogram("ai_prompt_tokens", "Taille des prompts Gemini (jetons estimés avant l'appel).", ("feature",),
+                                      buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000))
+AI_OVER_BUDGET = REGISTRY.counter("ai_prompt_over_budget_total", "Prompts refusés ou signalés pour dépassement de budget.", ("feature",))
+
+# Approximation de la tokenisation Gemini pour le texte (français compris) : environ 4 caractères par jeton
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(value: Any) -> int:
+    """Jetons estimés d'un prompt (texte, liste de parties, {'text': ...}) ou d'une réponse, sans appel réseau."""
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return math.ceil(len(value) / CHARS_PER_TOKEN)
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_tokens(part) for part in value)
+    if isinstance(value, dict):
+        return estimate_tokens(value.get("text")) + estimate_tokens(value.get("parts"))
+    return 0  # images et autres parties binaires : non estimées
+
+
+class PromptBudgetExceeded(Exception):
+    """Prompt plus grand que le budget configuré pour sa fonctionnalité (aucun appel n'est fait)."""
+
+
+class AIAccounting:
+    """
+    Comptabilité des appels Gemini par fonctionnalité (assistant, moderation, promo, coaching, challenges) :
+    jetons du prompt et de la réponse, latence et issue, agrégés par jour UTC. Les cumuls non encore publiés
+    sont versés dans Firestore (ai_usage_daily/{jour}) par incréments, sans écraser les autres instances.
+    """
+
+    def __init__(self):
+        # jour -> fonctionnalité -> compteurs (en mémoire, depuis le démarrage)
+        self.days: Dict[str, Dict[str, Counter]] = {}
+        # idem, depuis la dernière publication
+        self.pending: Dict[str, Dict[str, Counter]] = {}
+        self.configure({})
+
+    def configure(self, accounting_config: Dict[str, Any]):
+        self.budgets: Dict[str, int] = accounting_config.get("PROMPT_TOKEN_BUDGETS", {})
+        self.enforce = accounting_config.get("ENFORCE_BUDGETS", True)
+        self.prices = accounting_config.get("PRICE_PER_MILLION_TOKENS", {"prompt": 0.30, "completion": 2.50})
+        self.retention_days = accounting_config.get("RETENTION_DAYS", 7)
+
+    def check_budget(self, feature: str, prompt_tokens: int):
+        """Lève PromptBudgetExceeded si le prompt dépasse le budget et que les budgets sont appliqués ; sinon avertit."""
+        AI_PROMPT_TOKENS.observe(prompt_tokens, feature=feature)
+        budget = self.budgets.get(feature)
+        if not budget or prompt_tokens <= budget:
+            return
+        AI_OVER_BUDGET.inc(feature=feature)
+        self._add(feature, {"over_budget": 1})
+        message = f"Prompt '{feature}' de ~{prompt_tokens} jetons pour un budget de {budget}"
+        if self.enforce:
+            raise PromptBudgetExceeded(message)
+        print(f"⚠️ {message} (budget non appliqué).")
+
+    def _add(self, feature: str, amounts: Dict[str, int]) -> Counter:
+        """Ajoute aux compteurs du jour et à ceux en attente de publication ; renvoie ceux du jour."""
+        day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        for table in (self.pending, self.days):
+            stats = table.setdefault(day, {}).setdefault(feature, Counter())
+            stats.update(amounts)
+        return stats
+
+    def record(self, feature: str, outcome: str, prompt_tokens: int, completion_tokens: int = 0, seconds: float = 0.0):
+        stats = self._add(feature, {"calls": 1, f"outcome:{outcome}": 1, "prompt_tokens": prompt_tokens,
+                                    "completion_tokens": completion_tokens, "milliseconds": int(seconds * 1000)})
+        stats["max_prompt_tokens"] = max(stats["max_prompt_tokens"], prompt_tokens)
+
+    def estimated_cost(self, stats: Counter) -> float:
+        return (stats["prompt_tokens"] * self.prices.get("prompt", 0) + stats["completion_tokens"] * self.prices.get("completion", 0)) / 1e6
+
+    def take_pending(self) -> Dict[str, Dict[str, Counter]]:
+        """Cumuls à publier, remis à zéro (à réintégrer via restore_pending si la publication échoue)."""
+        pending, self.pending = self.pending, {}
+        return pending
+
+    def restore_pending(self, pending: Dict[str, Dict[str, Counter]]):
+        for day, features in pending.items():
+            for feature, stats in features.items():
+                self.pending.setdefault(day, {}).setdefault(feature, Counter()).update(stats)
+
+    def prune(self):
+        for day in sorted(self.days)[:-self.retention_days or None]:
+            del self.days[day]
+
+    def report(self, day: Optional[str] = None) -> str:
+        """Rapport texte d'une journée (aujourd'hui par défaut), fonctionnalités les plus coûteuses d'abord."""
+        day = day or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        features = self.days.get(day, {})
+        ranked = sorted(features.items(), key=lambda item: self.estimated_cost(item[1]), reverse=True)
+        total = sum((stats for _, stats in ranked), Counter())
+        lines = [f"🤖 Usage Gemini du {day} : {total['calls']} appels, {total['prompt_tokens']} jetons de prompt, "
+                 f"{total['completion_tokens']} de réponse, ~{self.estimated_cost(total):.4f} $"]
+        for feature, stats in ranked:
+            calls = stats["calls"] or 1
+            outcomes = ", ".join(f"{k.split(':', 1)[1]}={v}" for k, v in sorted(stats.items()) if k.startswith("outcome:"))
+            lines.append(f"  {feature:<12} {stats['calls']:>5} appels  prompt moy. {stats['prompt_tokens'] // calls:>6} (max {stats['max_prompt_tokens']})  "
+                         f"réponse moy. {stats['completion_tokens'] // calls:>5}  {stats['milliseconds'] / calls:>6.0f} ms  "
+                         f"~{self.estimated_cost(stats):.4f} $  hors budget={stats['over_budget']}  ({outcomes})")
+        return "\n".join(lines)
+
+    @staticmethod
+    def rollup_document(features: Dict[str, Counter], increment: Any) -> Dict[str, Any]:
+        """Document ai_usage_daily/{jour} (fusion) : un incrément par compteur, `increment` = firestore.Increment."""
+        return {feature: {key.replace(":", "_"): increment(value) for key, value in stats.items() if key != "max_prompt_tokens" and value}
+                for feature, stats in features.items()}
+
+
+AI_ACCOUNTING = AIAccounting()
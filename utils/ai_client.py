@@ -0,0 +1,254 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from typing import Dict, Any, Optional
+
+from utils.metrics import AI_LATENCY, AI_TOKENS, AI_QUEUE_WAIT, AI_RETRIES, COMPONENT_GAUGE
+from utils.ai_accounting import AI_ACCOUNTING, PromptBudgetExceeded, estimate_tokens
+
+INTERACTIVE = "interactive"  # un membre attend la réponse (assistant, commandes)
+BATCH = "batch"              # tâches de fond (coaching hebdomadaire, génération en masse)
+_PRIORITIES = {INTERACTIVE: 0, BATCH: 1}
+
+# Erreurs transitoires du backend (google.api_core.exceptions, reconnues par leur nom pour ne pas importer le SDK)
+RETRYABLE_ERRORS = {"ResourceExhausted", "ServiceUnavailable", "InternalServerError", "DeadlineExceeded",
+                    "TooManyRequests", "GatewayTimeout", "Aborted", "TimeoutError"}
+
+
+class AIUnavailableError(Exception):
+    """Appel IA abandonné (circuit ouvert, délai dépassé, erreurs répétées) sans réponse de repli configurée."""
+
+
+class FallbackResponse:
+    """Réponse de repli, même interface que celle du SDK pour les appelants (`.text`)."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError)) or type(error).__name__ in RETRYABLE_ERRORS
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur : ouvert après `failure_threshold` échecs transitoires consécutifs, il refuse les appels
+    pendant `reset_seconds`, puis laisse passer un seul appel d'essai (semi-ouvert) qui le referme s'il réussit.
+    """
+    CLOSED, HALF_OPEN, OPEN = "fermé", "semi-ouvert", "ouvert"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = 0.0
+        self.state = self.CLOSED
+        self._probing = False
+        self.trips = 0
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return self.state != self.OPEN
+
+    def record_success(self):
+        self.failures = 0
+        self.state = self.CLOSED
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+                print(f"⚡ Disjoncteur IA ouvert après {self.failures} échec(s) : repli pendant {self.reset_seconds:.0f} s.")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release_probe(self):
+        """L'appel d'essai s'est terminé sans verdict sur le backend (ex: erreur de requête)."""
+        self._probing = False
+
+
+class PrioritySemaphore:
+    """Sémaphore dont les places libérées vont d'abord aux appels interactifs, puis par ordre d'arrivée."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiters: list = []  # tas de (priorité, ordre d'arrivée, future)
+        self._order = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    async def acquire(self, priority: int):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # place attribuée au moment de l'annulation : on la rend
+            raise
+
+    def release(self):
+        self.active -= 1
+        while self._waiters and self.active < self.limit:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.active += 1
+                future.set_result(None)
+
+
+class AIClient:
+    """
+    Point d'accès partagé au modèle Gemini : délai global par appel, concurrence bornée (les appels interactifs
+    passent avant les tâches de fond, qui ne peuvent occuper toutes les places), nouvelles tentatives avec
+    attente aléatoire, disjoncteur et réponses de repli par fonctionnalité. Fonctionne avec tout objet
+    exposant `generate_content_async` (SDK, utils.fake_gemini.StubGenerativeModel).
+    """
+
+    def __init__(self, model: Any = None):
+        self.model = model
+        self.model_name = getattr(model, "model_name", "gemini")
+        self.configure({})
+
+    def configure(self, ai_config: Dict[str, Any]):
+        concurrency = ai_config.get("MAX_CONCURRENCY", 4)
+        self.semaphore = PrioritySemaphore(concurrency)
+        self.batch_slots = asyncio.Semaphore(max(1, min(ai_config.get("MAX_BATCH_CONCURRENCY", 2), concurrency)))
+        self.timeouts = {INTERACTIVE: 20.0, BATCH: 60.0, **ai_config.get("TIMEOUT_SECONDS", {})}
+        self.max_attempts = max(1, ai_config.get("MAX_ATTEMPTS", 3))
+        self.backoff_base = ai_config.get("BACKOFF_BASE_SECONDS", 0.5)
+        self.backoff_max = ai_config.get("BACKOFF_MAX_SECONDS", 8.0)
+        if not hasattr(self, "breaker"):
+            self.breaker = CircuitBreaker()
+        # Rechargement de la configuration : l'état du disjoncteur est conservé
+        self.breaker.failure_threshold = ai_config.get("BREAKER_FAILURE_THRESHOLD", 5)
+        self.breaker.reset_seconds = ai_config.get("BREAKER_RESET_SECONDS", 30.0)
+        self.fallbacks: Dict[str, Optional[str]] = ai_config.get("FALLBACKS", {})
+
+    @property
+    def available(self) -> bool:
+        return self.model is not None
+
+    async def generate(self, prompt: Any, feature: str = "default", priority: str = INTERACTIVE,
+                       timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Réponse du modèle, ou la réponse de repli de `feature` (FallbackResponse) si le backend est indisponible.
+        Lève AIUnavailableError sans repli configuré ; les erreurs non transitoires (requête invalide) remontent telles quelles.
+        Un prompt au-delà du budget de jetons de `feature` (AI_ACCOUNTING) est traité comme une indisponibilité, sans appel.
+        """
+        start = time.perf_counter()
+        prompt_tokens = estimate_tokens(prompt)
+        if self.model is None:
+            return self._fallback(feature, "aucun modèle configuré", start, 0, outcome="disabled")
+        try:
+            AI_ACCOUNTING.check_budget(feature, prompt_tokens)
+        except PromptBudgetExceeded as e:
+            print(f"⚠️ {e} : appel IA refusé.")
+            return self._fallback(feature, str(e), start, 0, outcome="over_budget")
+        deadline = start + (timeout or self.timeouts.get(priority, self.timeouts[INTERACTIVE]))
+        batch_slots = self.batch_slots  # configure() peut les remplacer pendant l'appel
+        if priority == BATCH:
+            try:
+                await asyncio.wait_for(batch_slots.acquire(), deadline - time.perf_counter())
+            except asyncio.TimeoutError:
+                return self._fallback(feature, "délai dépassé en file d'attente", start, 0, outcome="timeout")
+        try:
+            return await self._attempts(prompt, feature, priority, start, deadline, prompt_tokens, **kwargs)
+        finally:
+            if priority == BATCH:
+                batch_slots.release()
+
+    async def _attempts(self, prompt: Any, feature: str, priority: str, start: float, deadline: float, prompt_tokens: int, **kwargs) -> Any:
+        semaphore = self.semaphore
+        last_error = "échec"
+        sent_tokens = 0  # jetons de prompt effectivement envoyés (facturés), nuls si aucun appel n'a eu lieu
+        for attempt in range(self.max_attempts):
+            if not self.breaker.allow():
+                return self._fallback(feature, "disjoncteur ouvert", start, sent_tokens, outcome="circuit_open")
+            queued_at = time.perf_counter()
+            try:
+                await asyncio.wait_for(semaphore.acquire(_PRIORITIES.get(priority, 0)), deadline - queued_at)
+            except asyncio.TimeoutError:
+                self.breaker.release_probe()
+                return self._fallback(feature, "délai dépassé en file d'attente", start, sent_tokens, outcome="timeout")
+            except BaseException:  # annulation (interaction, déchargement du cog) : l'essai ne doit pas bloquer le disjoncteur
+                self.breaker.release_probe()
+                raise
+            AI_QUEUE_WAIT.observe(time.perf_counter() - queued_at, priority=priority)
+            sent_tokens += prompt_tokens
+            try:
+                response = await asyncio.wait_for(self.model.generate_content_async(prompt, **kwargs), deadline - time.perf_counter())
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.release_probe()
+                    self._finish(feature, "error", start, sent_tokens)
+                    raise
+                self.breaker.record_failure()
+                last_error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+            except BaseException:  # CancelledError : aucun verdict sur le backend
+                self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                self._record_usage(response, feature, start, prompt_tokens, sent_tokens - prompt_tokens)
+                return response
+            finally:
+                semaphore.release()
+
+            # Attente aléatoire (« full jitter ») avant la tentative suivante, si le délai global le permet
+            backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            if attempt + 1 >= self.max_attempts or time.perf_counter() + backoff >= deadline:
+                break
+            AI_RETRIES.inc(feature=feature)
+            await asyncio.sleep(backoff)
+        outcome = "timeout" if time.perf_counter() >= deadline or "Timeout" in last_error else "error"
+        return self._fallback(feature, last_error, start, sent_tokens, outcome=outcome)
+
+    def _finish(self, feature: str, outcome: str, start: float, prompt_tokens: int, completion_tokens: int = 0):
+        seconds = time.perf_counter() - start
+        AI_LATENCY.observe(seconds, model=self.model_name, feature=feature, outcome=outcome)
+        AI_ACCOUNTING.record(feature, outcome, prompt_tokens, completion_tokens, seconds)
+
+    def _record_usage(self, response: Any, feature: str, start: float, prompt_tokens: int, retried_tokens: int):
+        # Comptes réels du SDK si présents, sinon estimation à partir du texte ; les tentatives échouées s'y ajoutent
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = (getattr(usage, "prompt_token_count", 0) or prompt_tokens) + retried_tokens
+        completion_tokens = getattr(usage, "candidates_token_count", 0)
+        if not completion_tokens:
+            try:
+                completion_tokens = estimate_tokens(response.text)
+            except (AttributeError, ValueError):  # réponse bloquée ou sans texte
+                completion_tokens = 0
+        AI_TOKENS.inc(prompt_tokens, model=self.model_name, feature=feature, kind="prompt")
+        AI_TOKENS.inc(completion_tokens, model=self.model_name, feature=feature, kind="completion")
+        self._finish(feature, "ok", start, prompt_tokens, completion_tokens)
+
+    def _fallback(self, feature: str, reason: str, start: float, prompt_tokens: int, outcome: str = "error") -> FallbackResponse:
+        fallback = self.fallbacks.get(feature)
+        self._finish(feature, outcome if fallback is None else f"{outcome}_fallback", start, prompt_tokens)
+        if fallback is None:
+            raise AIUnavailableError(f"IA indisponible pour '{feature}' : {reason}")
+        return FallbackResponse(fallback)
+
+    def collect_metrics(self):
+        state = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}[self.breaker.state]
+        COMPONENT_GAUGE.set(state, component="ai_client", stat="breaker_state")
+        COMPONENT_GAUGE.set(self.breaker.trips, component="ai_client", stat="breaker_trips")
+        COMPONENT_GAUGE.set(self.semaphore.active, component="ai_client", stat="in_flight")
+        COMPONENT_GAUGE.set(self.semaphore.queued, component="ai_client", stat="queued")
@@ -0,0 +1,89 @@
+import asyncio
+import time
+import traceback
+from typing import Dict, Any, Iterable, List, Tuple
+
+from utils.metrics import COMPONENT_GAUGE
+
+
+def startup_order(dependencies: Dict[str, Iterable[str]]) -> List[str]:
+    """Ordre topologique des extensions ; ValueError si une dépendance est inconnue ou circulaire."""
+    graph = {extension: tuple(deps) for extension, deps in dependencies.items()}
+    for extension, deps in graph.items():
+        unknown = [dep for dep in deps if dep not in graph]
+        if unknown:
+            raise ValueError(f"Dépendance inconnue pour {extension} : {', '.join(unknown)}")
+    order: List[str] = []
+    remaining = dict(graph)
+    while remaining:
+        ready = [extension for extension, deps in remaining.items() if all(dep not in remaining for dep in deps)]
+        if not ready:
+            raise ValueError(f"Dépendances circulaires entre : {', '.join(sorted(remaining))}")
+        for extension in ready:
+            order.append(extension)
+            del remaining[extension]
+    return order
+
+
+class CogLoader:
+    """
+    Charge les extensions du bot selon un graphe de dépendances déclaré : chaque extension démarre dès que
+    les siennes sont chargées, les extensions indépendantes en parallèle. Un échec écarte ses dépendants.
+    """
+
+    def __init__(self, bot: Any, dependencies: Dict[str, Iterable[str]]):
+        self.bot = bot
+        self.dependencies = {extension: tuple(deps) for extension, deps in dependencies.items()}
+        self.order = startup_order(self.dependencies)
+        # extension -> {"status", "waited", "duration", "started"} (secondes, relatives au début du chargement)
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self.total_seconds = 0.0
+
+    async def load_all(self) -> Dict[str, Dict[str, Any]]:
+        start = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def load(extension: str) -> bool:
+            results = await asyncio.gather(*(tasks[dep] for dep in self.dependencies[extension]))
+            ready_at = time.perf_counter()
+            timing = self.timings[extension] = {"status": "ok", "waited": ready_at - start, "duration": 0.0, "started": ready_at - start}
+            if not all(results):
+                timing["status"] = "ignoré"
+                print(f"⏭️ Cog '{extension}' non chargé : une dépendance a échoué.")
+                return False
+            try:
+                await self.bot.load_extension(extension)
+                print(f"✅ Cog '{extension}' chargé avec succès.")
+                return True
+            except Exception as e:
+                timing["status"] = "erreur"
+                print(f"❌ Erreur lors du chargement du cog '{extension}': {e}")
+                traceback.print_exc()
+                return False
+            finally:
+                timing["duration"] = time.perf_counter() - ready_at
+                COMPONENT_GAUGE.set(timing["duration"], component=extension, stat="load_seconds")
+
+        # Toutes les tâches existent avant que l'une d'elles n'attende ses dépendances
+        for extension in self.order:
+            tasks[extension] = asyncio.create_task(load(extension), name=f"load:{extension}")
+        await asyncio.gather(*tasks.values())
+        self.total_seconds = time.perf_counter() - start
+        return self.timings
+
+    def report(self) -> str:
+        sequential = sum(timing["duration"] for timing in self.timings.values())
+        lines = [f"⏱️ Cogs chargés en {self.total_seconds:.2f} s (somme des chargements : {sequential:.2f} s)"]
+        for extension, timing in sorted(self.timings.items(), key=lambda item: item[1]["started"]):
+            lines.append(f"  {extension:<26} départ +{timing['started']:.2f} s  durée {timing['duration']:.2f} s  {timing['status']}")
+        return "\n".join(lines)
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """Chaîne de dépendances la plus longue (en durée de chargement) : ce qui borne le démarrage."""
+        best: Dict[str, Tuple[float, List[str]]] = {}
+        for extension in self.order:
+            duration = self.timings.get(extension, {}).get("duration", 0.0)
+            previous = max((best[dep] for dep in self.dependencies[extension]), default=(0.0, []), key=lambda item: item[0])
+            best[extension] = (previous[0] + duration, previous[1] + [extension])
+        total, path = max(best.values(), default=(0.0, []), key=lambda item: item[0])
+        return path, total
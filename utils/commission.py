@@ -0,0 +1,178 @@
+import bisect
+import functools
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Sequence, NamedTuple, Tuple
+
+from utils.lazy_imports import LazyModule, module_available
+
+NUMPY_AVAILABLE = module_available("numpy")
+np = LazyModule("numpy")  # chargé au premier calcul vectorisé, pas au démarrage du bot
+
+EVENT_PREFIX = "commission_boost"  # événements serveur (EVENTS_CONFIG) qui ajoutent `bonus_add` au taux
+_GUILD_TYPES = {"top1": 1, "top2": 2, "top3": 3}
+
+
+@functools.lru_cache(maxsize=8192)
+def parse_expiry(value: Optional[str]) -> float:
+    """Horodatage POSIX d'une date d'expiration ISO (naïve = UTC) ; 0 si absente ou illisible. Chaque chaîne n'est analysée qu'une fois."""
+    if not value:
+        return 0.0
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return 0.0
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class ReferrerProfile(NamedTuple):
+    """Données d'un parrain utiles au calcul, extraites une fois par instantané (dates déjà converties)."""
+    level: int
+    guild_type: int             # 0 aucun, 1/2/3 top guilde de la semaine
+    guild_boost: float
+    guild_cap: float
+    vip_expires: float
+    vip_months: int
+    loyalty: bool
+    affiliate_booster: float
+    boosters: Tuple[Tuple[float, float], ...]  # (expiration, bonus) des boosters de commission
+
+
+class CommissionEngine:
+    """
+    Taux de commission d'affiliation compilés depuis config.json : paliers de niveau et de VIP en tableaux
+    triés (recherche dichotomique), bonus fixes précalculés, événements serveur `commission_boost_*` actifs.
+    `commission()` traite un achat ; `batch_commissions()` évalue des milliers de couples (parrain, prix) avec NumPy.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.events: Tuple[Tuple[float, float], ...] = ()
+        self.compile(config or {})
+
+    def compile(self, config: Dict[str, Any]):
+        gamification = config.get("GAMIFICATION_CONFIG", {})
+        affiliate = gamification.get("AFFILIATE_SYSTEM", {})
+        premium = gamification.get("VIP_SYSTEM", {}).get("PREMIUM", {})
+        self.tier_levels, self.tier_rates = self._tiers(affiliate.get("COMMISSION_TIERS", []), "level", "rate")
+        self.vip_months, self.vip_bonuses = self._tiers(premium.get("COMMISSION_BONUS_TIERS", []), "consecutive_months", "bonus")
+        self.loyalty_rate = affiliate.get("PERMANENT_LOYALTY_BONUS", {}).get("RATE", 0)
+        self.top1_rate = config.get("GUILD_SYSTEM", {}).get("WEEKLY_REWARDS", {}).get("TOP_1", {}).get("commission_rate", 0.90)
+
+    @staticmethod
+    def _tiers(tiers: List[Dict[str, Any]], key: str, value: str) -> Tuple[List[int], List[float]]:
+        """Paliers triés par seuil croissant ; à seuil égal, le premier déclaré l'emporte (comme l'ancien tri stable)."""
+        by_threshold: Dict[int, float] = {}
+        for tier in tiers:
+            by_threshold.setdefault(tier.get(key, 999), tier.get(value, 0))
+        thresholds = sorted(by_threshold)
+        return thresholds, [by_threshold[threshold] for threshold in thresholds]
+
+    def set_events(self, active_events: Dict[str, Dict[str, Any]]):
+        """À appeler à chaque changement de ManagerCog.active_events."""
+        self.events = tuple((parse_expiry(event.get("ends_at")) or float("inf"), event.get("bonus_add", 0.0))
+                            for event_id, event in active_events.items() if event_id.startswith(EVENT_PREFIX))
+
+    # --- Calcul unitaire ---
+
+    @staticmethod
+    def profile(referrer_data: Dict[str, Any]) -> ReferrerProfile:
+        guild_bonus = referrer_data.get("guild_bonus") or {}
+        guild_type = _GUILD_TYPES.get(guild_bonus.get("type"), 0)
+        vip = referrer_data.get("vip_premium") or {}
+        return ReferrerProfile(
+            level=referrer_data.get("level", 1),
+            guild_type=guild_type,
+            guild_boost=guild_bonus.get("commission_boost", 0.0) if guild_type in (2, 3) else 0.0,
+            guild_cap=guild_bonus.get("max_commission_rate", 1.0) if guild_type in (2, 3) else 1.0,
+            vip_expires=parse_expiry(vip.get("expires_at")) if vip else 0.0,
+            vip_months=vip.get("consecutive_months", 0),
+            loyalty=bool(referrer_data.get("permanent_affiliate_bonus", False)),
+            affiliate_booster=referrer_data.get("affiliate_booster", 0.0),
+            boosters=tuple((parse_expiry(booster.get("expires_at")), booster.get("bonus", 0.0))
+                           for booster_id, booster in (referrer_data.get("active_boosters") or {}).items()
+                           if 'commission_booster' in booster_id),
+        )
+
+    def base_rate(self, level: int) -> float:
+        index = bisect.bisect_right(self.tier_levels, level) - 1
+        return self.tier_rates[index] if index >= 0 else 0
+
+    def vip_bonus(self, months: int) -> float:
+        index = bisect.bisect_right(self.vip_months, months) - 1
+        return self.vip_bonuses[index] if index >= 0 else 0
+
+    def event_bonus(self, now: float) -> float:
+        return sum(bonus for ends_at, bonus in self.events if ends_at > now)
+
+    def rate(self, profile: ReferrerProfile, now: Optional[float] = None) -> float:
+        if profile.guild_type == 1:
+            return self.top1_rate
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        boost = profile.affiliate_booster + profile.guild_boost + self.event_bonus(now)
+        if profile.vip_expires > now:
+            boost += self.vip_bonus(profile.vip_months)
+        if profile.loyalty:
+            boost += self.loyalty_rate
+        boost += sum(bonus for expires, bonus in profile.boosters if expires > now)
+        return min(self.base_rate(profile.level) + boost, profile.guild_cap)
+
+    @staticmethod
+    def commissionable_amount(price: float, product: Dict[str, Any], option: Optional[Dict[str, Any]]) -> float:
+        if product.get("margin_type", "total") != "net":
+            return price
+        return price - (option.get("purchase_cost", 0) if option else product.get("purchase_cost", 0))
+
+    def commission(self, referrer_data: Dict[str, Any], price: float, product: Dict[str, Any], option: Optional[Dict[str, Any]] = None,
+                   now: Optional[float] = None) -> float:
+        amount = self.commissionable_amount(price, product, option)
+        if amount <= 0:
+            return 0.0
+        return amount * self.rate(self.profile(referrer_data), now)
+
+    # --- Calcul vectorisé ---
+
+    def batch_rates(self, profiles: Sequence[ReferrerProfile], now: Optional[float] = None) -> 'np.ndarray':
+        """Taux de commission de chaque profil (mêmes règles que rate())."""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy est requis pour le calcul vectorisé des commissions.")
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        levels = np.fromiter((p.level for p in profiles), dtype=np.int64, count=len(profiles))
+        guild_types = np.fromiter((p.guild_type for p in profiles), dtype=np.int8, count=len(profiles))
+        vip_active = np.fromiter((p.vip_expires > now for p in profiles), dtype=bool, count=len(profiles))
+        vip_months = np.fromiter((p.vip_months for p in profiles), dtype=np.int64, count=len(profiles))
+        fixed = np.fromiter((p.affiliate_booster + p.guild_boost + (self.loyalty_rate if p.loyalty else 0.0)
+                             + sum(bonus for expires, bonus in p.boosters if expires > now) for p in profiles),
+                            dtype=np.float64, count=len(profiles))
+        caps = np.fromiter((p.guild_cap for p in profiles), dtype=np.float64, count=len(profiles))
+        return self.array_rates(levels, vip_active, vip_months, fixed, guild_types, caps, now)
+
+    def array_rates(self, levels: 'np.ndarray', vip_active: 'np.ndarray', vip_months: 'np.ndarray', fixed_bonus: 'np.ndarray',
+                    guild_types: Optional['np.ndarray'] = None, caps: Optional['np.ndarray'] = None, now: Optional[float] = None) -> 'np.ndarray':
+        """
+        Taux à partir de colonnes déjà vectorisées (simulateur d'économie) : `fixed_bonus` regroupe booster d'affiliation,
+        bonus de guilde, fidélité et boosters actifs ; `guild_types` 0 à 3 ; `caps` plafond par parrain.
+        """
+        now = datetime.now(timezone.utc).timestamp() if now is None else now
+        rates = self._lookup(self.tier_levels, self.tier_rates, levels)
+        rates += np.where(vip_active, self._lookup(self.vip_months, self.vip_bonuses, vip_months), 0.0)
+        rates += fixed_bonus + self.event_bonus(now)
+        if caps is not None:
+            rates = np.minimum(rates, caps)
+        return rates if guild_types is None else np.where(guild_types == 1, self.top1_rate, rates)
+
+    @staticmethod
+    def _lookup(thresholds: List[int], values: List[float], keys: 'np.ndarray') -> 'np.ndarray':
+        table = np.asarray([0.0] + list(values), dtype=np.float64)  # indice 0 : sous le premier palier
+        return table[np.searchsorted(np.asarray(thresholds, dtype=np.int64), keys, side="right")]
+
+    def batch_commissions(self, profiles: Sequence[ReferrerProfile], prices: Sequence[float], costs: Optional[Sequence[float]] = None,
+                          now: Optional[float] = None) -> 'np.ndarray':
+        """
+        Commissions de couples (profils[i], prix[i]). `costs` : coût d'achat déduit pour les produits à marge nette
+        (0 pour les autres). Un même profil peut apparaître plusieurs fois.
+        """
+        amounts = np.asarray(prices, dtype=np.float64)
+        if costs is not None:
+            amounts = amounts - np.asarray(costs, dtype=np.float64)
+        return np.where(amounts > 0, amounts * self.batch_rates(profiles, now), 0.0)
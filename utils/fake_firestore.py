@@ -0,0 +1,634 @@
+"""
+Client Firestore asynchrone en mémoire, pour les bancs d'essai et la vérification hors ligne.
+
+Implémente le sous-ensemble utilisé par les cogs : collections et sous-collections, documents
+(get/set/update/create/delete, merge, chemins pointés), requêtes where/order_by/limit/select/stream,
+get_all, lots d'écriture, transactions optimistes et transformations (Increment, ArrayUnion, ArrayRemove,
+DELETE_FIELD, SERVER_TIMESTAMP). Les sentinelles du SDK google-cloud-firestore sont reconnues au même titre
+que celles de ce module, et ses transactions se rejouent avec le décorateur async_transactional du SDK
+(ou celui de ce module) : `await fonction(db.transaction(), *args)`.
+
+La latence réseau est simulée sur une horloge virtuelle (`db.time()`, `db.sleep()`) qui n'avance que lorsque
+plus aucune tâche n'est prête : à graine égale, l'entrelacement des tâches, les conflits de transaction et les
+compteurs ne dépendent pas de la vitesse de la machine.
+
+    db = FakeFirestoreClient(latency=0.02, jitter=0.01, seed=1)
+    manager = ManagerCog(bot, db=db)
+"""
+import asyncio
+import copy
+import heapq
+import itertools
+import random
+import string
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+
+# Exceptions du SDK si disponible, pour que le code appelant les traite comme en production
+try:
+    from google.api_core.exceptions import NotFound, Conflict, Aborted
+except ImportError:
+    class NotFound(Exception):
+        pass
+
+    class Conflict(Exception):
+        pass
+
+    class Aborted(Exception):
+        pass
+
+MAX_BATCH_WRITES = 500
+MAX_TRANSACTION_ATTEMPTS = 5
+_AUTO_ID_CHARS = string.ascii_letters + string.digits
+
+
+class ReadAfterWriteError(Exception):
+    """Lecture après une écriture dans une même transaction (interdit par Firestore)."""
+
+
+# --- Sentinelles et transformations ---
+
+class Sentinel:
+    __slots__ = ("description",)
+
+    def __init__(self, description: str):
+        self.description = description
+
+    def __repr__(self) -> str:
+        return f"Sentinel: {self.description}"
+
+
+DELETE_FIELD = Sentinel("Value used to delete a field in a document.")
+SERVER_TIMESTAMP = Sentinel("Value used to set a document field to the server timestamp.")
+
+
+class Increment:
+    def __init__(self, value):
+        self.value = value
+
+
+class ArrayUnion:
+    def __init__(self, values):
+        self.values = list(values)
+
+
+class ArrayRemove:
+    def __init__(self, values):
+        self.values = list(values)
+
+
+class Query:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+
+def _kind(value: Any) -> Optional[str]:
+    """Transformation représentée par `value` (sentinelles de ce module ou du SDK), None pour une valeur simple."""
+    name = type(value).__name__
+    if name == "Sentinel":
+        return "delete" if "delete" in value.description.lower() else "timestamp"
+    if name in ("Increment", "ArrayUnion", "ArrayRemove"):
+        return name
+    return None
+
+
+def _transformed(current: Any, value: Any) -> Any:
+    kind = _kind(value)
+    if kind == "timestamp":
+        return datetime.now(timezone.utc)
+    if kind == "Increment":
+        return current + value.value if isinstance(current, (int, float)) and not isinstance(current, bool) else value.value
+    if kind == "ArrayUnion":
+        result = list(current) if isinstance(current, list) else []
+        result.extend(v for v in value.values if v not in result)
+        return result
+    if kind == "ArrayRemove":
+        return [v for v in current if v not in value.values] if isinstance(current, list) else []
+    return copy.deepcopy(value)
+
+
+def _merge_into(target: Dict[str, Any], data: Dict[str, Any], merge: bool):
+    for key, value in data.items():
+        if _kind(value) == "delete":
+            target.pop(key, None)
+        elif merge and isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge_into(target[key], value, merge)
+        elif isinstance(value, dict):
+            target[key] = {}
+            _merge_into(target[key], value, merge)
+        else:
+            target[key] = _transformed(target.get(key), value)
+
+
+def _apply_update(target: Dict[str, Any], data: Dict[str, Any]):
+    """update() : les clés pointées désignent des champs imbriqués, les dictionnaires remplacent le champ entier."""
+    for field_path, value in data.items():
+        *parents, leaf = field_path.split(".")
+        node = target
+        for part in parents:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        if _kind(value) == "delete":
+            node.pop(leaf, None)
+        elif isinstance(value, dict):
+            node[leaf] = {}
+            _merge_into(node[leaf], value, merge=False)
+        else:
+            node[leaf] = _transformed(node.get(leaf), value)
+
+
+_MISSING = object()
+
+
+def _lookup(data: Dict[str, Any], field_path: str) -> Any:
+    node: Any = data
+    for part in field_path.split("."):
+        if not isinstance(node, dict) or part not in node:
+            return _MISSING
+        node = node[part]
+    return node
+
+
+def _type_rank(value: Any) -> int:
+    # Ordre des types Firestore : null < booléens < nombres < dates < chaînes < ... ; les filtres d'inégalité n'en croisent pas deux
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, list):
+        return 8
+    return 9
+
+
+def _matches(value: Any, op: str, expected: Any) -> bool:
+    if value is _MISSING:
+        return False
+    if op == "==":
+        return value == expected and _type_rank(value) == _type_rank(expected)
+    if op == "!=":
+        return value is not None and not (value == expected and _type_rank(value) == _type_rank(expected))
+    if op == "in":
+        return any(_matches(value, "==", candidate) for candidate in expected)
+    if op == "not-in":
+        return value is not None and not any(_matches(value, "==", candidate) for candidate in expected)
+    if op == "array-contains":
+        return isinstance(value, list) and expected in value
+    if op == "array-contains-any":
+        return isinstance(value, list) and any(candidate in value for candidate in expected)
+    if _type_rank(value) != _type_rank(expected) or value is None:
+        return False
+    if op == "<":
+        return value < expected
+    if op == "<=":
+        return value <= expected
+    if op == ">":
+        return value > expected
+    if op == ">=":
+        return value >= expected
+    raise ValueError(f"Opérateur de requête non supporté : {op}")
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    return (_type_rank(value), value if _type_rank(value) in (1, 2, 3, 4, 5) else repr(value))
+
+
+def _split_path(path: str) -> List[str]:
+    return [part for part in path.split("/") if part]
+
+
+# --- Instantanés et références ---
+
+class FakeDocumentSnapshot:
+    def __init__(self, reference: 'FakeDocumentReference', data: Optional[Dict[str, Any]], update_time: Optional[int] = None):
+        self.reference = reference
+        self._data = data  # jamais modifié en place par le client : pas de copie à la lecture
+        self.update_time = update_time
+
+    @property
+    def id(self) -> str:
+        return self.reference.id
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        if self._data is None:
+            return None
+        value = _lookup(self._data, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class FakeDocumentReference:
+    def __init__(self, client: 'FakeFirestoreClient', path: str):
+        self._client = client
+        self.path = path
+        self._collection_path, _, self.id = path.rpartition("/")
+
+    @property
+    def parent(self) -> 'FakeCollectionReference':
+        return FakeCollectionReference(self._client, self._collection_path)
+
+    def collection(self, collection_id: str) -> 'FakeCollectionReference':
+        return FakeCollectionReference(self._client, f"{self.path}/{collection_id}")
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, FakeDocumentReference) and other.path == self.path
+
+    def __hash__(self) -> int:
+        return hash(self.path)
+
+    def __repr__(self) -> str:
+        return f"FakeDocumentReference({self.path!r})"
+
+    async def get(self, field_paths: Optional[Iterable[str]] = None, transaction: Optional['FakeTransaction'] = None) -> FakeDocumentSnapshot:
+        await self._client._network()
+        if transaction is not None:
+            transaction._record_read(self.path)
+        return self._client._snapshot(self, field_paths)
+
+    async def set(self, document_data: Dict[str, Any], merge: bool = False):
+        await self._client._network()
+        self._client._commit([("set", self.path, document_data, merge)])
+
+    async def update(self, field_updates: Dict[str, Any]):
+        await self._client._network()
+        self._client._commit([("update", self.path, field_updates, False)])
+
+    async def create(self, document_data: Dict[str, Any]):
+        await self._client._network()
+        self._client._commit([("create", self.path, document_data, False)])
+
+    async def delete(self):
+        await self._client._network()
+        self._client._commit([("delete", self.path, None, False)])
+
+
+class FakeQuery:
+    def __init__(self, client: 'FakeFirestoreClient', collection_path: str, filters: tuple = (), orders: tuple = (),
+                 limit: Optional[int] = None, offset: int = 0, projection: Optional[tuple] = None):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit
+        self._offset = offset
+        self._projection = projection
+
+    def _copy(self, **changes) -> 'FakeQuery':
+        state = {"filters": self._filters, "orders": self._orders, "limit": self._limit, "offset": self._offset, "projection": self._projection}
+        state.update(changes)
+        return FakeQuery(self._client, self._collection_path, **state)
+
+    def where(self, field_path: Optional[str] = None, op_string: Optional[str] = None, value: Any = None, *, filter: Any = None) -> 'FakeQuery':
+        if filter is not None:  # FieldFilter du SDK
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = Query.ASCENDING) -> 'FakeQuery':
+        return self._copy(orders=self._orders + ((field_path, str(direction).upper().endswith("DESCENDING")),))
+
+    def limit(self, count: int) -> 'FakeQuery':
+        return self._copy(limit=count)
+
+    def offset(self, count: int) -> 'FakeQuery':
+        return self._copy(offset=count)
+
+    def select(self, field_paths: Iterable[str]) -> 'FakeQuery':
+        return self._copy(projection=tuple(field_paths))
+
+    def _run(self) -> List[FakeDocumentSnapshot]:
+        documents = self._client._collections.get(self._collection_path, {})
+        rows = [(doc_id, data) for doc_id, data in documents.items()
+                if all(_matches(_lookup(data, f), op, v) for f, op, v in self._filters)]
+        # Firestore exclut les documents sans le champ trié ; l'id départage
+        order_fields = [field for field, _ in self._orders]
+        rows = [row for row in rows if all(_lookup(row[1], field) is not _MISSING for field in order_fields)]
+        rows.sort(key=lambda row: row[0])
+        for field, descending in reversed(self._orders):
+            rows.sort(key=lambda row: _sort_key(_lookup(row[1], field)), reverse=descending)
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        self._client.counters["reads"] += max(1, len(rows))  # une requête vide est facturée une lecture
+        return [FakeDocumentSnapshot(FakeDocumentReference(self._client, f"{self._collection_path}/{doc_id}"),
+                                     _project(data, self._projection), self._client._versions.get(f"{self._collection_path}/{doc_id}"))
+                for doc_id, data in rows]
+
+    async def get(self, transaction: Optional['FakeTransaction'] = None) -> List[FakeDocumentSnapshot]:
+        await self._client._network()
+        snapshots = self._run()
+        if transaction is not None:
+            for snapshot in snapshots:
+                transaction._record_read(snapshot.reference.path)
+        return snapshots
+
+    async def stream(self, transaction: Optional['FakeTransaction'] = None):
+        for snapshot in await self.get(transaction=transaction):
+            yield snapshot
+
+
+class FakeCollectionReference(FakeQuery):
+    def __init__(self, client: 'FakeFirestoreClient', path: str):
+        super().__init__(client, path)
+        self.path = path
+        self.id = path.rpartition("/")[2]
+
+    def document(self, document_id: Optional[str] = None) -> FakeDocumentReference:
+        if document_id is None:
+            document_id = "".join(self._client._rng.choice(_AUTO_ID_CHARS) for _ in range(20))
+        return FakeDocumentReference(self._client, f"{self.path}/{document_id}")
+
+    async def add(self, document_data: Dict[str, Any], document_id: Optional[str] = None):
+        reference = self.document(document_id)
+        await reference.create(document_data)
+        return datetime.now(timezone.utc), reference
+
+    async def list_documents(self):
+        for doc_id in sorted(self._client._collections.get(self.path, {})):
+            yield self.document(doc_id)
+
+
+def _project(data: Dict[str, Any], projection: Optional[tuple]) -> Dict[str, Any]:
+    if projection is None:
+        return data
+    projected: Dict[str, Any] = {}
+    for field_path in projection:
+        value = _lookup(data, field_path)
+        if value is not _MISSING:
+            _apply_update(projected, {field_path: value})
+    return projected
+
+
+# --- Écritures groupées ---
+
+class FakeWriteBatch:
+    def __init__(self, client: 'FakeFirestoreClient'):
+        self._client = client
+        self._writes: List[tuple] = []
+
+    def _add(self, write: tuple):
+        if len(self._writes) >= MAX_BATCH_WRITES:
+            raise ValueError(f"Un lot ne peut contenir plus de {MAX_BATCH_WRITES} écritures.")
+        self._writes.append(write)
+
+    def set(self, reference: FakeDocumentReference, document_data: Dict[str, Any], merge: bool = False):
+        self._add(("set", _path(reference), document_data, merge))
+
+    def update(self, reference: FakeDocumentReference, field_updates: Dict[str, Any]):
+        self._add(("update", _path(reference), field_updates, False))
+
+    def create(self, reference: FakeDocumentReference, document_data: Dict[str, Any]):
+        self._add(("create", _path(reference), document_data, False))
+
+    def delete(self, reference: FakeDocumentReference):
+        self._add(("delete", _path(reference), None, False))
+
+    async def commit(self) -> list:
+        await self._client._network()
+        writes, self._writes = self._writes, []
+        return self._client._commit(writes)
+
+    def __len__(self) -> int:
+        return len(self._writes)
+
+
+class FakeTransaction(FakeWriteBatch):
+    """
+    Transaction optimiste : les versions des documents lus sont vérifiées au commit, Aborted si l'un a changé.
+    Expose les méthodes internes qu'appelle le décorateur du SDK (_begin, _commit, _rollback, _clean_up).
+    """
+
+    def __init__(self, client: 'FakeFirestoreClient', max_attempts: int = MAX_TRANSACTION_ATTEMPTS, read_only: bool = False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id: Optional[int] = None  # change à chaque essai, comme l'identifiant d'une transaction native
+        self._read_versions: Dict[str, int] = {}
+
+    @property
+    def id(self) -> Optional[int]:
+        return self._id
+
+    @property
+    def in_progress(self) -> bool:
+        return self._id is not None
+
+    def _record_read(self, path: str):
+        if self._writes:
+            raise ReadAfterWriteError("Attempted read after write in a transaction.")
+        self._read_versions.setdefault(path, self._client._versions.get(path, 0))
+
+    # Comme le SDK : coroutines qui renvoient un générateur asynchrone d'instantanés, même pour une seule référence
+    async def get(self, ref_or_query, **kwargs):
+        if isinstance(ref_or_query, FakeDocumentReference):
+            return self._client.get_all([ref_or_query], transaction=self, **kwargs)
+        return ref_or_query.stream(transaction=self)
+
+    async def get_all(self, references: Iterable[FakeDocumentReference], **kwargs):
+        return self._client.get_all(references, transaction=self, **kwargs)
+
+    def _clean_up(self):
+        self._writes = []
+        self._read_versions = {}
+        self._id = None
+
+    async def _begin(self, retry_id: Optional[int] = None):
+        if self.in_progress:
+            raise ValueError("Une transaction est déjà en cours.")
+        await self._client._network()
+        self._client.counters["transactions"] += 1
+        self._id = next(self._client._transaction_ids)
+
+    async def _rollback(self):
+        if not self.in_progress:
+            return
+        try:
+            await self._client._network()
+        finally:
+            self._clean_up()
+
+    async def _commit(self) -> list:
+        if not self.in_progress:
+            raise ValueError("Aucune transaction en cours à valider.")
+        await self._client._network()
+        conflicts = [path for path, version in self._read_versions.items() if self._client._versions.get(path, 0) != version]
+        if conflicts:
+            self._client.counters["aborted_transactions"] += 1
+            raise Aborted(f"Transaction en conflit sur {conflicts[0]}")
+        result = self._client._commit(self._writes)
+        self._clean_up()
+        return result
+
+
+def _path(reference: Any) -> str:
+    # Accepte aussi les références enveloppées (utils.firestore_metrics.InstrumentedFirestore)
+    return getattr(reference, "path", None) or getattr(reference, "wrapped").path
+
+
+def async_transactional(to_wrap):
+    """Équivalent de google.cloud.firestore_v1.async_transaction.async_transactional, sans le SDK."""
+    return _FakeTransactional(to_wrap)
+
+
+class _FakeTransactional:
+    """Même contrat que le décorateur du SDK : essai rejoué tant que le commit est en conflit, annulé sur erreur."""
+
+    def __init__(self, to_wrap):
+        self.to_wrap = to_wrap
+
+    async def __call__(self, transaction: FakeTransaction, *args, **kwargs):
+        last_exc = None
+        try:
+            for _ in range(transaction._max_attempts):
+                transaction._clean_up()
+                await transaction._begin()
+                result = await self.to_wrap(transaction, *args, **kwargs)
+                try:
+                    await transaction._commit()
+                    return result
+                except Aborted as exc:
+                    last_exc = exc
+            raise ValueError(f"Transaction abandonnée après {transaction._max_attempts} essais.") from last_exc
+        except BaseException:
+            await transaction._rollback()
+            raise
+
+
+# --- Client ---
+
+class FakeFirestoreClient:
+    """
+    Remplaçant en mémoire de firestore.AsyncClient. `latency` (+ `jitter` aléatoire, graine `seed`) est
+    attendue sur l'horloge virtuelle à chaque aller-retour réseau simulé. `counters` compte lectures,
+    écritures et transactions.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seed: Optional[int] = None,
+                 max_attempts: int = MAX_TRANSACTION_ATTEMPTS):
+        self.latency = latency
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self._rng = random.Random(seed)
+        # chemin de collection -> id -> données ; les dictionnaires stockés ne sont jamais modifiés en place
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._clock = 0
+        self._transaction_ids = itertools.count(1)
+        self.counters: Counter = Counter()
+        # Horloge virtuelle : tas (échéance, ordre d'arrivée, future) réveillé par une seule tâche
+        self._now = 0.0
+        self._timers: List[tuple] = []
+        self._timer_order = itertools.count()
+        self._driver: Optional[asyncio.Task] = None
+
+    def time(self) -> float:
+        """Temps virtuel écoulé (s) ; n'avance que lorsque toutes les tâches attendent la base ou db.sleep()."""
+        return self._now
+
+    async def sleep(self, delay: float):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._timers, (self._now + max(0.0, delay), next(self._timer_order), future))
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.create_task(self._drive())
+        await future
+
+    async def _drive(self):
+        loop = asyncio.get_running_loop()
+        while self._timers:
+            await asyncio.sleep(0)
+            # File des rappels prêts de la boucle (CPython) : tant qu'une tâche peut avancer, le temps est figé
+            if getattr(loop, "_ready", None):
+                continue
+            self._now, _, future = heapq.heappop(self._timers)
+            if not future.done():  # appelant annulé entre-temps
+                future.set_result(None)
+
+    async def _network(self):
+        self.counters["round_trips"] += 1
+        # Même à latence nulle, l'aller-retour laisse les autres tâches s'intercaler
+        await self.sleep(self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0))
+
+    def collection(self, path: str) -> FakeCollectionReference:
+        if len(_split_path(path)) % 2 != 1:
+            raise ValueError(f"Chemin de collection invalide : {path}")
+        return FakeCollectionReference(self, "/".join(_split_path(path)))
+
+    def document(self, path: str) -> FakeDocumentReference:
+        if len(_split_path(path)) % 2 != 0:
+            raise ValueError(f"Chemin de document invalide : {path}")
+        return FakeDocumentReference(self, "/".join(_split_path(path)))
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def transaction(self, max_attempts: Optional[int] = None, read_only: bool = False) -> FakeTransaction:
+        return FakeTransaction(self, max_attempts or self.max_attempts, read_only)
+
+    async def get_all(self, references: Iterable[FakeDocumentReference], field_paths: Optional[Iterable[str]] = None,
+                      transaction: Optional[FakeTransaction] = None):
+        references = list(references)
+        await self._network()
+        for reference in references:
+            if transaction is not None:
+                transaction._record_read(_path(reference))
+            yield self._snapshot(reference, field_paths)
+
+    def _snapshot(self, reference: Any, field_paths: Optional[Iterable[str]] = None) -> FakeDocumentSnapshot:
+        path = _path(reference)
+        collection_path, _, doc_id = path.rpartition("/")
+        data = self._collections.get(collection_path, {}).get(doc_id)
+        self.counters["reads"] += 1
+        if data is not None and field_paths is not None:
+            data = _project(data, tuple(field_paths))
+        return FakeDocumentSnapshot(reference, data, self._versions.get(path))
+
+    def _commit(self, writes: List[tuple]) -> list:
+        """Applique atomiquement une liste d'écritures (op, chemin, données, merge)."""
+        staged: Dict[str, Optional[Dict[str, Any]]] = {}
+        for op, path, data, merge in writes:
+            collection_path, _, doc_id = path.rpartition("/")
+            current = staged[path] if path in staged else self._collections.get(collection_path, {}).get(doc_id)
+            if op == "delete":
+                staged[path] = None
+                continue
+            if op == "update" and current is None:
+                raise NotFound(f"Aucun document à mettre à jour : {path}")
+            if op == "create" and current is not None:
+                raise Conflict(f"Le document existe déjà : {path}")
+            document = copy.deepcopy(current) if current is not None and (merge or op == "update") else {}
+            if op == "update":
+                _apply_update(document, data)
+            else:
+                _merge_into(document, data, merge)
+            staged[path] = document
+        self._clock += 1
+        for path, document in staged.items():
+            collection_path, _, doc_id = path.rpartition("/")
+            if document is None:
+                self._collections.get(collection_path, {}).pop(doc_id, None)
+                self.counters["deletes"] += 1
+            else:
+                self._collections.setdefault(collection_path, {})[doc_id] = document
+                self.counters["writes"] += 1
+            self._versions[path] = self._clock
+        return [self._clock] * len(writes)
+
+    def dump(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Copie complète du contenu, pour comparer deux exécutions."""
+        return copy.deepcopy(self._collections)
@@ -0,0 +1,81 @@
+"""
+Modèle Gemini local pour les bancs d'essai et la vérification hors ligne : latence, erreurs transitoires
+et blocages configurables, réponses déterministes à graine fixe.
+
+    model = StubGenerativeModel(latency=0.3, failure_rate=0.2, seed=1)
+    manager = ManagerCog(bot, db=FakeFirestoreClient(), model=model)
+"""
+import asyncio
+import json
+import random
+from collections import Counter
+from typing import Any, Callable, Optional
+
+# Exceptions du SDK si disponible, pour que le code appelant les traite comme en production
+try:
+    from google.api_core.exceptions import ServiceUnavailable
+except ImportError:
+    class ServiceUnavailable(Exception):
+        pass
+
+
+class StubUsage:
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class StubGenerationResponse:
+    def __init__(self, text: str, prompt: str):
+        self.text = text
+        # Approximation de la tokenisation Gemini : environ 4 caractères par jeton
+        self.usage_metadata = StubUsage(max(1, len(prompt) // 4), max(1, len(text) // 4))
+
+
+class StubGenerativeModel:
+    """
+    Remplace genai.GenerativeModel (generate_content_async seulement). `failure_rate` : part des appels en
+    ServiceUnavailable ; `hang_rate` : part des appels qui ne répondent jamais (pour les délais).
+    `responder(prompt)` fournit le texte ; par défaut un JSON générique si la réponse JSON est demandée.
+    """
+
+    def __init__(self, latency: float = 0.2, jitter: float = 0.1, failure_rate: float = 0.0, hang_rate: float = 0.0,
+                 seed: Optional[int] = None, responder: Optional[Callable[[str], str]] = None, model_name: str = "stub-gemini"):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.hang_rate = hang_rate
+        self.random = random.Random(seed)
+        self.responder = responder
+        self.model_name = model_name
+        self.counters: Counter = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content_async(self, prompt: Any, generation_config: Any = None, **kwargs) -> StubGenerationResponse:
+        self.counters["calls"] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            roll = self.random.random()
+            if roll < self.hang_rate:
+                self.counters["hangs"] += 1
+                await asyncio.Event().wait()  # jamais réveillé : seul le délai de l'appelant y met fin
+            await asyncio.sleep(max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter)))
+            if roll < self.hang_rate + self.failure_rate:
+                self.counters["failures"] += 1
+                raise ServiceUnavailable("503 Le modèle est surchargé (simulé).")
+            prompt_text = prompt if isinstance(prompt, str) else str(prompt)
+            self.counters["ok"] += 1
+            return StubGenerationResponse(self._respond(prompt_text, generation_config), prompt_text)
+        finally:
+            self.in_flight -= 1
+
+    def _respond(self, prompt: str, generation_config: Any) -> str:
+        if self.responder:
+            return self.responder(prompt)
+        if "json" in str(getattr(generation_config, "response_mime_type", generation_config) or "").lower():
+            return json.dumps({"response_type": "answer", "content": "Réponse simulée.", "suggested_follow_up": None,
+                               "generated_description": "Description simulée."})
+        return "Réponse simulée."
@@ -0,0 +1,154 @@
+import contextvars
+import random
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+
+from utils.metrics import REGISTRY
+
+UNKNOWN_ORIGIN = "inconnu"
+
+# Origine (commande, listener, tâche) de l'opération Firestore en cours. Hérité par les tâches asyncio créées depuis ce contexte.
+_origin: contextvars.ContextVar[str] = contextvars.ContextVar("firestore_origin", default=UNKNOWN_ORIGIN)
+_trace: contextvars.ContextVar[Optional['OperationTrace']] = contextvars.ContextVar("firestore_trace", default=None)
+
+ORIGIN_OPERATIONS = REGISTRY.counter("firestore_origin_operations_total", "Opérations Firestore par origine (commande, listener, tâche).", ("origin", "kind"))
+ORIGIN_BYTES = REGISTRY.counter("firestore_origin_bytes_total", "Octets Firestore estimés par origine.", ("origin", "direction"))
+
+
+def estimate_size(value: Any) -> int:
+    """Taille de stockage Firestore approximative d'une valeur (règles de calcul documentées par Google)."""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(k).encode("utf-8")) + 1 + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(estimate_size(v) for v in value)
+    return 8  # sentinelles (Increment, SERVER_TIMESTAMP...), dates, références
+
+
+def current_origin() -> str:
+    return _origin.get()
+
+
+def current_trace() -> Optional['OperationTrace']:
+    return _trace.get()
+
+
+def set_origin(origin: str, trace: bool = False) -> Optional['OperationTrace']:
+    """
+    Attribue les opérations suivantes du contexte courant (tâche asyncio) à `origin`.
+    Sans `trace`, une trace héritée (ex: listener distribué depuis une commande tracée) reste active.
+    """
+    _origin.set(origin)
+    if trace:
+        _trace.set(OperationTrace(origin))
+    return _trace.get()
+
+
+@contextmanager
+def attributed(origin: str):
+    """Attribution temporaire, restaurée en sortie de bloc."""
+    origin_token = _origin.set(origin)
+    trace_token = _trace.set(None)
+    try:
+        yield
+    finally:
+        _origin.reset(origin_token)
+        _trace.reset(trace_token)
+
+
+class OperationTrace:
+    """Journal détaillé des opérations Firestore d'une interaction (débogage)."""
+
+    def __init__(self, origin: str):
+        self.origin = origin
+        self.started = time.perf_counter()
+        self.operations: List[tuple] = []
+
+    def add(self, operation: str, collection: str, documents: int, size: int, seconds: float):
+        self.operations.append((round((time.perf_counter() - self.started) * 1000, 1), operation, collection, documents, size, round(seconds * 1000, 1)))
+
+    def render(self) -> str:
+        lines = [f"Trace Firestore '{self.origin}' : {len(self.operations)} opération(s) en {(time.perf_counter() - self.started) * 1000:.0f} ms"]
+        for at_ms, operation, collection, documents, size, duration_ms in self.operations:
+            lines.append(f"  +{at_ms:>7} ms  {operation:<8} {collection:<28} docs={documents:<5} octets={size:<7} {duration_ms} ms")
+        return "\n".join(lines)
+
+
+class FirestoreAccounting:
+    """
+    Agrège lectures, écritures, suppressions et octets par origine, sur une fenêtre remise à zéro à chaque rapport.
+    Alimenté par InstrumentedFirestore ; les origines sont posées par le bot (commandes, listeners) et @timed_task.
+    """
+
+    def __init__(self):
+        self.window: Dict[str, Counter] = {}
+        self.window_started = time.time()
+        self.recent_traces: deque = deque(maxlen=50)
+        self.configure({})
+
+    def configure(self, accounting_config: Dict[str, Any]):
+        self.prices = accounting_config.get("PRICE_PER_100K", {"read": 0.06, "write": 0.18, "delete": 0.02})
+        self.trace_commands = set(accounting_config.get("TRACE_COMMANDS", []))
+        self.trace_sample_rate = accounting_config.get("TRACE_SAMPLE_RATE", 0.0)
+        self.report_top = accounting_config.get("REPORT_TOP", 10)
+
+    def should_trace(self, command_name: str) -> bool:
+        return command_name in self.trace_commands or (self.trace_sample_rate > 0 and random.random() < self.trace_sample_rate)
+
+    def _stats(self, origin: str) -> Counter:
+        stats = self.window.get(origin)
+        if stats is None:
+            stats = self.window[origin] = Counter()
+        return stats
+
+    def record(self, kind: str, collection: str, operation: str, documents: int = 1, size: int = 0, seconds: float = 0.0):
+        """kind : 'read', 'write' ou 'delete'."""
+        origin = _origin.get()
+        stats = self._stats(origin)
+        stats[kind] += documents
+        stats["bytes_read" if kind == "read" else "bytes_written"] += size
+        stats[f"{kind}:{collection}"] += documents
+        ORIGIN_OPERATIONS.inc(documents, origin=origin, kind=kind)
+        if size:
+            ORIGIN_BYTES.inc(size, origin=origin, direction="read" if kind == "read" else "write")
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(operation, collection, documents, size, seconds)
+
+    def finish_trace(self, trace: OperationTrace):
+        self.recent_traces.append(trace)
+        print(trace.render())
+
+    def estimated_cost(self, stats: Counter) -> float:
+        return sum(stats.get(kind, 0) * self.prices.get(kind, 0) / 100000 for kind in ("read", "write", "delete"))
+
+    def report(self, reset: bool = True) -> str:
+        """Rapport texte des origines les plus coûteuses depuis le dernier rapport."""
+        elapsed_minutes = (time.time() - self.window_started) / 60
+        ranked = sorted(self.window.items(), key=lambda item: self.estimated_cost(item[1]), reverse=True)
+        total = Counter()
+        for _, stats in ranked:
+            total.update({k: v for k, v in stats.items() if ":" not in k})
+        lines = [f"💰 Coût Firestore sur {elapsed_minutes:.0f} min : {total['read']} lectures, {total['write']} écritures, "
+                 f"{total['delete']} suppressions, ~{self.estimated_cost(total):.4f} $"]
+        for origin, stats in ranked[:self.report_top]:
+            collections = sorted(((k, v) for k, v in stats.items() if ":" in k), key=lambda kv: kv[1], reverse=True)[:3]
+            detail = ", ".join(f"{k.split(':', 1)[1]} {k.split(':', 1)[0]}={v}" for k, v in collections)
+            lines.append(f"  {origin:<45} R={stats['read']:<7} W={stats['write']:<6} D={stats['delete']:<5} "
+                         f"~{self.estimated_cost(stats):.4f} $  ({detail})")
+        if reset:
+            self.window = {}
+            self.window_started = time.time()
+        return "\n".join(lines)
+
+
+ACCOUNTING = FirestoreAccounting()
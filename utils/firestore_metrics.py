@@ -0,0 +1,142 @@
+import inspect
+import time
+from typing import Any
+
+from utils.firestore_accounting import ACCOUNTING, estimate_size
+from utils.metrics import FIRESTORE_LATENCY, FIRESTORE_ERRORS, FIRESTORE_DOCUMENTS
+
+# Méthodes réseau mesurées, et méthodes qui renvoient une nouvelle référence/requête à envelopper
+_TIMED = frozenset({"get", "set", "update", "delete", "create", "commit"})
+_STREAMED = frozenset({"stream", "get_all"})
+_CHAINED = frozenset({"collection", "document", "where", "order_by", "limit", "limit_to_last", "offset",
+                      "select", "start_at", "start_after", "end_at", "end_before", "batch", "transaction", "count"})
+_WRITES = {"set": "write", "update": "write", "create": "write", "delete": "delete"}
+
+
+class InstrumentedFirestore:
+    """
+    Enveloppe transparente d'un client Firestore (et des références, requêtes et lots qui en dérivent)
+    qui mesure la latence et le nombre d'opérations par collection, et impute lectures et écritures à l'origine
+    courante (utils.firestore_accounting). Les attributs non mesurés sont délégués :
+    les transactions et lots du SDK acceptent ces enveloppes comme des références natives (`_document_path`).
+    """
+
+    __slots__ = ("_target", "_collection")
+
+    def __init__(self, target: Any, collection: str = ""):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_collection", collection)
+
+    @property
+    def wrapped(self) -> Any:
+        return self._target
+
+    def _label(self, name: str, args: tuple) -> str:
+        if name == "collection" and args:
+            return f"{self._collection}/{args[0]}" if self._collection else str(args[0]).split("/")[0]
+        if name == "document" and args and not self._collection:
+            # client.document("users/123") : la collection est le premier segment
+            return str(args[0]).split("/")[0]
+        if name in ("batch", "transaction"):
+            return name
+        return self._collection
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+        if name in _CHAINED:
+            def chained(*args, **kwargs):
+                return InstrumentedFirestore(attr(*args, **kwargs), self._label(name, args))
+            return chained
+        if name in _TIMED or name in _STREAMED:
+            return self._instrumented(name, attr)
+        return attr
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._target, name, value)
+
+    def __eq__(self, other: Any) -> bool:
+        return self._target == (other._target if isinstance(other, InstrumentedFirestore) else other)
+
+    def __hash__(self) -> int:
+        return hash(self._target)
+
+    def __repr__(self) -> str:
+        return f"InstrumentedFirestore({self._target!r})"
+
+    def _instrumented(self, operation: str, method):
+        collection = self._collection or "client"
+
+        def call(*args, **kwargs):
+            if operation == "get_all" and args:
+                args = ([unwrap(ref) for ref in args[0]],) + args[1:]
+            if "transaction" in kwargs:
+                kwargs["transaction"] = unwrap(kwargs["transaction"])
+            start = time.perf_counter()
+            result = method(*args, **kwargs)
+            if inspect.isawaitable(result):
+                return _timed(result, collection, operation, start, args)
+            if hasattr(result, "__aiter__"):
+                return _streamed(result, collection, operation, start)
+            if operation in _WRITES:
+                # Écriture mise en tampon par un lot ou une transaction : facturée au commit, attribuée ici
+                target = args[0] if args else None
+                target_collection = target._collection if isinstance(target, InstrumentedFirestore) else collection
+                ACCOUNTING.record(_WRITES[operation], target_collection, operation, size=_payload_size(args[1:]))
+            return result
+        return call
+
+
+def _payload_size(args: tuple) -> int:
+    return estimate_size(args[0]) if args and isinstance(args[0], dict) else 0
+
+
+def _snapshot_size(snapshot: Any) -> int:
+    # _data évite la copie profonde de to_dict() ; None pour un document inexistant (lecture tout de même facturée)
+    data = getattr(snapshot, "_data", None)
+    return estimate_size(data) if isinstance(data, dict) else 0
+
+
+async def _timed(awaitable, collection: str, operation: str, start: float, payload: tuple = ()):
+    try:
+        result = await awaitable
+    except Exception:
+        FIRESTORE_ERRORS.inc(collection=collection, operation=operation)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        FIRESTORE_LATENCY.observe(elapsed, collection=collection, operation=operation)
+    if operation == "get":
+        if isinstance(result, list):
+            documents, size = len(result), sum(_snapshot_size(snapshot) for snapshot in result)
+        else:
+            documents, size = 1, _snapshot_size(result)
+        FIRESTORE_DOCUMENTS.inc(documents, collection=collection)
+        ACCOUNTING.record("read", collection, operation, documents, size, elapsed)
+    elif operation in _WRITES:
+        ACCOUNTING.record(_WRITES[operation], collection, operation, size=_payload_size(payload), seconds=elapsed)
+    return result
+
+
+async def _streamed(iterator, collection: str, operation: str, start: float):
+    documents = size = 0
+    try:
+        async for item in iterator:
+            documents += 1
+            size += _snapshot_size(item)
+            yield item
+    except Exception:
+        FIRESTORE_ERRORS.inc(collection=collection, operation=operation)
+        raise
+    finally:
+        # Durée totale de l'itération, attente du consommateur comprise
+        elapsed = time.perf_counter() - start
+        FIRESTORE_LATENCY.observe(elapsed, collection=collection, operation=operation)
+        FIRESTORE_DOCUMENTS.inc(documents, collection=collection)
+        ACCOUNTING.record("read", collection, operation, documents, size, elapsed)
+
+
+def unwrap(obj: Any) -> Any:
+    """Objet Firestore natif derrière une éventuelle enveloppe de mesure."""
+    return obj.wrapped if isinstance(obj, InstrumentedFirestore) else obj
@@ -0,0 +1,37 @@
+from typing import Any
+
+from utils.lazy_imports import LazyModule, module_available
+
+# Le SDK Gemini (et ses dépendances gRPC/protobuf) n'est importé qu'au premier appel de l'IA
+AI_AVAILABLE = module_available("google.generativeai")
+genai = LazyModule("google.generativeai")
+genai_types = LazyModule("google.generativeai.types")
+
+
+def build_generation_config(**kwargs) -> Any:
+    """
+    google.generativeai.types.GenerationConfig, importé à la demande. Sans le SDK (modèle local des bancs
+    d'essai), le dictionnaire équivalent, que le SDK accepte aussi.
+    """
+    return genai_types.GenerationConfig(**kwargs) if AI_AVAILABLE else dict(kwargs)
+
+
+class LazyGenerativeModel:
+    """Façade de genai.GenerativeModel : configure le SDK et construit le modèle au premier usage."""
+
+    def __init__(self, model_name: str, api_key: str):
+        self.model_name = model_name
+        self._api_key = api_key
+        self._model = None
+
+    def _get(self) -> Any:
+        if self._model is None:
+            genai.configure(api_key=self._api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    async def generate_content_async(self, *args, **kwargs) -> Any:
+        return await self._get().generate_content_async(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get(), name)
@@ -0,0 +1,125 @@
+import random
+from collections import Counter
+from typing import Dict, Any, List, Optional, Iterable, Set
+
+from google.cloud import firestore
+
+GIVEAWAY_EMOJI = "🎉"
+DEFAULT_SHARDS = 16
+
+
+class GiveawayEntrants:
+    """
+    Participants des giveaways suivis en direct depuis les réactions (événements raw).
+    Chaque giveaway garde un ensemble en mémoire et sa copie persistée, répartie sur
+    `giveaways/{id}/entrants/{shard}` (champ `ids`, une liste d'identifiants par shard).
+    Les ajouts/retraits sont tamponnés puis écrits par flush() en ArrayUnion/ArrayRemove.
+    """
+
+    def __init__(self, db: Any):
+        self.db = db
+        self.entrants: Dict[int, Set[int]] = {}
+        self.shards: Dict[int, int] = {}
+        # giveaway_id -> {user_id: True (ajout) / False (retrait)} ; la dernière action l'emporte
+        self.pending: Dict[int, Dict[int, bool]] = {}
+        self.counters: Counter = Counter()
+
+    def _shard_collection(self, giveaway_id: int):
+        return self.db.collection('giveaways').document(str(giveaway_id)).collection('entrants')
+
+    def is_tracked(self, giveaway_id: int) -> bool:
+        return giveaway_id in self.entrants
+
+    def track(self, giveaway_id: int, shards: int = DEFAULT_SHARDS, entrants: Iterable[int] = ()):
+        self.entrants[giveaway_id] = set(entrants)
+        self.shards[giveaway_id] = shards
+
+    def forget(self, giveaway_id: int):
+        self.entrants.pop(giveaway_id, None)
+        self.shards.pop(giveaway_id, None)
+        self.pending.pop(giveaway_id, None)
+
+    async def load(self, giveaway_id: int, shards: int = DEFAULT_SHARDS) -> Set[int]:
+        """Recharge les participants persistés d'un giveaway (démarrage, reroll)."""
+        entrants: Set[int] = set()
+        async for shard in self._shard_collection(giveaway_id).stream():
+            entrants.update(shard.to_dict().get("ids", []))
+        self.counters["loads"] += 1
+        self.track(giveaway_id, shards, entrants)
+        return entrants
+
+    # --- Événements de réaction (aucun appel réseau) ---
+
+    def add(self, giveaway_id: int, user_id: int):
+        entrants = self.entrants.get(giveaway_id)
+        if entrants is None or user_id in entrants:
+            return
+        entrants.add(user_id)
+        self.pending.setdefault(giveaway_id, {})[user_id] = True
+        self.counters["added"] += 1
+
+    def remove(self, giveaway_id: int, user_id: int):
+        entrants = self.entrants.get(giveaway_id)
+        if entrants is None or user_id not in entrants:
+            return
+        entrants.discard(user_id)
+        self.pending.setdefault(giveaway_id, {})[user_id] = False
+        self.counters["removed"] += 1
+
+    # --- Persistance ---
+
+    async def flush(self, giveaway_id: Optional[int] = None):
+        """Écrit les changements en attente, un lot par giveaway (au plus deux écritures par shard)."""
+        targets = [giveaway_id] if giveaway_id is not None else list(self.pending)
+        for gid in targets:
+            changes = self.pending.pop(gid, None)
+            if not changes:
+                continue
+            shards = self.shards.get(gid, DEFAULT_SHARDS)
+            by_shard: Dict[int, Dict[bool, List[int]]] = {}
+            for user_id, added in changes.items():
+                by_shard.setdefault(user_id % shards, {True: [], False: []})[added].append(user_id)
+
+            batch = self.db.batch()
+            collection = self._shard_collection(gid)
+            for shard, ops in by_shard.items():
+                ref = collection.document(str(shard))
+                if ops[True]:
+                    batch.set(ref, {"ids": firestore.ArrayUnion(ops[True])}, merge=True)
+                if ops[False]:
+                    batch.set(ref, {"ids": firestore.ArrayRemove(ops[False])}, merge=True)
+            try:
+                await batch.commit()
+                self.counters["flushes"] += 1
+            except Exception as e:
+                # On remet les changements en attente sans écraser ceux arrivés entre-temps
+                merged = self.pending.setdefault(gid, {})
+                for user_id, added in changes.items():
+                    merged.setdefault(user_id, added)
+                print(f"Erreur d'écriture des participants du giveaway {gid}: {e}")
+
+    async def replace(self, giveaway_id: int, entrants: Iterable[int]):
+        """Remplace intégralement les participants (réconciliation) et réécrit tous les shards."""
+        shards = self.shards.get(giveaway_id, DEFAULT_SHARDS)
+        self.track(giveaway_id, shards, entrants)
+        self.pending.pop(giveaway_id, None)
+        by_shard: Dict[int, List[int]] = {shard: [] for shard in range(shards)}
+        for user_id in self.entrants[giveaway_id]:
+            by_shard[user_id % shards].append(user_id)
+        batch = self.db.batch()
+        collection = self._shard_collection(giveaway_id)
+        for shard, ids in by_shard.items():
+            batch.set(collection.document(str(shard)), {"ids": ids})
+        await batch.commit()
+        self.counters["reconciled"] += 1
+
+    def draw(self, giveaway_id: int, winner_count: int, exclude: Iterable[int] = ()) -> List[int]:
+        """Tire les gagnants depuis les données locales."""
+        excluded = set(exclude)
+        pool = [user_id for user_id in self.entrants.get(giveaway_id, ()) if user_id not in excluded]
+        return random.sample(pool, min(winner_count, len(pool)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "tracked_giveaways": len(self.entrants),
+                "tracked_entrants": sum(len(e) for e in self.entrants.values()),
+                "pending_changes": sum(len(p) for p in self.pending.values())}
@@ -0,0 +1,95 @@
+import asyncio
+import time
+from typing import Dict, Any, Optional, Callable, Iterable, Tuple
+
+from discord.ext import tasks
+
+from utils.firestore_accounting import attributed
+from utils.loop_monitor import LoopLagMonitor
+
+
+class HealthMonitor:
+    """
+    Vivacité (/healthz) et disponibilité (/readyz) du bot, assez légères pour être sondées chaque seconde :
+    seul Firestore demande un appel réseau, fait en arrière-plan et mis en cache `probe_ttl` secondes.
+    """
+
+    def __init__(self, bot: Any, loop_monitor: LoopLagMonitor, extensions: Iterable[str], db_getter: Callable[[], Any],
+                 max_loop_lag: float = 2.0, probe_ttl: float = 15.0, probe_timeout: float = 3.0):
+        self.bot = bot
+        self.loop_monitor = loop_monitor
+        self.extensions = tuple(extensions)
+        self.db_getter = db_getter
+        self.max_loop_lag = max_loop_lag
+        self.probe_ttl = probe_ttl
+        self.probe_timeout = probe_timeout
+        self.gateway_connected = False  # tenu à jour par on_connect / on_resumed / on_disconnect
+        self._probe: Dict[str, Any] = {"ok": False, "checked_at": None, "error": "pas encore sondé"}
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def liveness(self) -> Tuple[bool, Dict[str, Any]]:
+        lag = self.loop_monitor.current_lag()
+        checks = {
+            "loop_monitor": self.loop_monitor.running,
+            "loop_lag": lag <= self.max_loop_lag,
+        }
+        return all(checks.values()), {"checks": checks, "loop_lag_seconds": round(lag, 4), "max_loop_lag_seconds": self.max_loop_lag}
+
+    async def readiness(self) -> Tuple[bool, Dict[str, Any]]:
+        missing = [extension for extension in self.extensions if extension not in self.bot.extensions]
+        stopped = self._stopped_tasks()
+        firestore = await self._firestore_status()
+        checks = {
+            "gateway": self.gateway_connected and self.bot.is_ready() and not self.bot.is_closed(),
+            "cogs": not missing,
+            "firestore": firestore["ok"],
+            "background_tasks": not stopped,
+        }
+        detail = {
+            "checks": checks,
+            "latency_seconds": round(self.bot.latency, 4) if self.gateway_connected else None,
+            "missing_cogs": missing,
+            "stopped_tasks": stopped,
+            "firestore": firestore,
+        }
+        return all(checks.values()), detail
+
+    def _stopped_tasks(self):
+        """Boucles tasks.loop des cogs chargés qui ne tournent plus (jamais démarrées ou arrêtées sur erreur)."""
+        stopped = []
+        for cog_name, cog in list(self.bot.cogs.items()):
+            for attr, value in vars(type(cog)).items():
+                if isinstance(value, tasks.Loop) and not getattr(cog, attr).is_running():
+                    stopped.append(f"{cog_name}.{attr}")
+        return stopped
+
+    async def _firestore_status(self) -> Dict[str, Any]:
+        checked_at = self._probe["checked_at"]
+        stale = checked_at is None or time.monotonic() - checked_at > self.probe_ttl
+        if stale and (self._probe_task is None or self._probe_task.done()):
+            self._probe_task = asyncio.create_task(self._probe_firestore(), name="readyz-firestore-probe")
+        if checked_at is None:
+            await asyncio.shield(self._probe_task)  # jamais sondé : on attend la première sonde, bornée par probe_timeout
+        status = dict(self._probe)
+        status["age_seconds"] = round(time.monotonic() - status.pop("checked_at"), 1)
+        if status["ok"] and status["age_seconds"] > 3 * self.probe_ttl:
+            status.update(ok=False, error="sonde périmée")
+        return status
+
+    async def _probe_firestore(self):
+        db = self.db_getter()
+        start = time.perf_counter()
+        try:
+            if db is None:
+                raise RuntimeError("client Firestore non initialisé")
+            with attributed("health:readyz"):
+                await asyncio.wait_for(db.collection('system').document('events').get(), self.probe_timeout)
+            self._probe = {"ok": True, "checked_at": time.monotonic(), "latency_seconds": round(time.perf_counter() - start, 4), "error": None}
+        except Exception as e:
+            self._probe = {"ok": False, "checked_at": time.monotonic(), "latency_seconds": round(time.perf_counter() - start, 4),
+                           "error": f"{type(e).__name__}: {e}"}
+
+    def close(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
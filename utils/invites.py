@@ -0,0 +1,166 @@
+import asyncio
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+import discord
+
+
+class _InviteSnapshot:
+    __slots__ = ("uses", "max_uses", "inviter")
+
+    def __init__(self, uses: int, max_uses: int, inviter: Optional[discord.abc.User]):
+        self.uses = uses or 0
+        self.max_uses = max_uses or 0
+        self.inviter = inviter
+
+    @classmethod
+    def from_invite(cls, invite: discord.Invite) -> '_InviteSnapshot':
+        return cls(invite.uses, invite.max_uses, invite.inviter)
+
+    def nearly_exhausted(self) -> bool:
+        return bool(self.max_uses) and self.uses + 1 >= self.max_uses
+
+
+class InviteTracker:
+    """
+    Attribution des arrivées aux invitations, avec un seul appel REST `guild.invites()` par rafale d'arrivées.
+    Les arrivées d'une même guilde sont regroupées pendant `coalesce_seconds`, puis traitées sous un verrou par guilde :
+    un seul diff des compteurs d'utilisation attribue tout le lot. En cas d'ambiguïté (plusieurs parrains possibles),
+    les membres concernés ne sont pas attribués plutôt que mal attribués.
+    """
+
+    def __init__(self, coalesce_seconds: float = 1.5):
+        self.coalesce_seconds = coalesce_seconds
+        self.snapshots: Dict[int, Dict[str, _InviteSnapshot]] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._pending: Dict[int, List[Tuple[int, asyncio.Future]]] = {}
+        self.counters: Counter = Counter()
+
+    def configure(self, invite_config: Dict[str, Any]):
+        self.coalesce_seconds = invite_config.get("COALESCE_SECONDS", 1.5)
+
+    def _lock(self, guild_id: int) -> asyncio.Lock:
+        lock = self._locks.get(guild_id)
+        if lock is None:
+            lock = self._locks[guild_id] = asyncio.Lock()
+        return lock
+
+    async def _fetch(self, guild: discord.Guild) -> Optional[Dict[str, _InviteSnapshot]]:
+        self.counters["rest_calls"] += 1
+        try:
+            invites = await guild.invites()
+        except discord.Forbidden:
+            print(f"Permissions manquantes pour récupérer les invitations de la guilde {guild.name}")
+            self.counters["fetch_errors"] += 1
+            return None
+        except discord.HTTPException as e:
+            print(f"Erreur lors de la récupération des invitations de {guild.name}: {e}")
+            self.counters["fetch_errors"] += 1
+            return None
+        return {invite.code: _InviteSnapshot.from_invite(invite) for invite in invites}
+
+    async def refresh(self, guild: discord.Guild) -> bool:
+        """Recharge complètement le cache d'une guilde (démarrage)."""
+        async with self._lock(guild.id):
+            snapshot = await self._fetch(guild)
+            if snapshot is None:
+                return False
+            self.snapshots[guild.id] = snapshot
+            return True
+
+    # --- Mises à jour locales depuis la gateway, sans appel REST ---
+
+    def on_create(self, invite: discord.Invite):
+        if invite.guild is None:
+            return
+        self.snapshots.setdefault(invite.guild.id, {})[invite.code] = _InviteSnapshot.from_invite(invite)
+        self.counters["rest_calls_saved"] += 1
+
+    def on_delete(self, invite: discord.Invite):
+        if invite.guild is None:
+            return
+        guild_invites = self.snapshots.get(invite.guild.id, {})
+        snapshot = guild_invites.get(invite.code)
+        # Une invitation à usage limité disparaît souvent juste avant l'événement d'arrivée qui l'a consommée :
+        # on la garde jusqu'au prochain diff pour pouvoir attribuer ce membre.
+        if snapshot is not None and not snapshot.nearly_exhausted():
+            del guild_invites[invite.code]
+        self.counters["rest_calls_saved"] += 1
+
+    # --- Attribution ---
+
+    @staticmethod
+    def _diff(old: Dict[str, _InviteSnapshot], new: Dict[str, _InviteSnapshot]) -> Tuple[Dict[int, int], Dict[int, discord.abc.User]]:
+        """Utilisations consommées par parrain depuis le dernier instantané, en une passe."""
+        used_by: Dict[int, int] = {}
+        inviters: Dict[int, discord.abc.User] = {}
+        for code, before in old.items():
+            after = new.get(code)
+            if after is not None:
+                delta = after.uses - before.uses
+            elif before.nearly_exhausted():
+                delta = before.max_uses - before.uses  # invitation épuisée puis supprimée par Discord
+            else:
+                delta = 0
+            if delta > 0 and before.inviter is not None:
+                used_by[before.inviter.id] = used_by.get(before.inviter.id, 0) + delta
+                inviters[before.inviter.id] = before.inviter
+        return used_by, inviters
+
+    def _attribute(self, guild_id: int, members: List[int], new: Dict[str, _InviteSnapshot]) -> List[Optional[discord.abc.User]]:
+        old = self.snapshots.get(guild_id)
+        self.snapshots[guild_id] = new
+        if old is None:
+            self.counters["unattributed"] += len(members)
+            return [None] * len(members)
+
+        used_by, inviters = self._diff(old, new)
+        if len(used_by) == 1:
+            inviter_id, uses = next(iter(used_by.items()))
+            if uses >= len(members):
+                self.counters["attributed"] += len(members)
+                return [inviters[inviter_id]] * len(members)
+        if used_by:
+            # Plusieurs parrains pour un même lot, ou moins d'utilisations que d'arrivées (URL personnalisée, OAuth) :
+            # impossible de savoir qui a utilisé quelle invitation.
+            self.counters["ambiguous"] += len(members)
+        else:
+            self.counters["unattributed"] += len(members)
+        return [None] * len(members)
+
+    async def attribute(self, member: discord.Member) -> Optional[discord.abc.User]:
+        """Renvoie le parrain de `member`, ou None si l'invitation ne peut pas être déterminée avec certitude."""
+        guild = member.guild
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.setdefault(guild.id, [])
+        pending.append((member.id, future))
+        self.counters["joins"] += 1
+        if len(pending) > 1:
+            # Un autre appel pilote déjà ce lot : on attend son résultat
+            return await future
+
+        batch: List[Tuple[int, asyncio.Future]] = []
+        try:
+            async with self._lock(guild.id):
+                await asyncio.sleep(self.coalesce_seconds)
+                batch = self._pending.pop(guild.id, [])
+                new = await self._fetch(guild)
+                if new is None:
+                    results = [None] * len(batch)
+                    self.counters["unattributed"] += len(batch)
+                else:
+                    results = self._attribute(guild.id, [member_id for member_id, _ in batch], new)
+                # Avant : deux appels REST par arrivée (diff puis rafraîchissement du cache)
+                self.counters["rest_calls_saved"] += 2 * len(batch) - 1
+                for (_, fut), inviter in zip(batch, results):
+                    if not fut.done():
+                        fut.set_result(inviter)
+        finally:
+            for _, fut in batch or self._pending.pop(guild.id, []):
+                if not fut.done():
+                    fut.set_result(None)
+        return future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "guilds": len(self.snapshots),
+                "cached_invites": sum(len(invites) for invites in self.snapshots.values())}
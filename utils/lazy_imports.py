@@ -0,0 +1,44 @@
+import importlib
+import importlib.util
+import time
+from types import ModuleType
+from typing import Dict
+
+# Module -> secondes passées à l'importer au premier usage (rapportées par benchmarks.startup_profile et /metrics)
+IMPORT_TIMINGS: Dict[str, float] = {}
+
+
+def module_available(name: str) -> bool:
+    """Le module est-il installé ? Ne l'exécute pas (seuls ses paquets parents sont importés)."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    """
+    Module importé au premier accès à l'un de ses attributs, pour sortir les SDK lourds (Gemini, Pillow)
+    du démarrage. `LazyModule("PIL.Image").new(...)` équivaut à `from PIL import Image; Image.new(...)`.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: ModuleType = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            start = time.perf_counter()
+            self._module = importlib.import_module(self._name)
+            IMPORT_TIMINGS[self._name] = time.perf_counter() - start
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        return f"<LazyModule {self._name} ({'chargé' if self.loaded else 'non chargé'})>"
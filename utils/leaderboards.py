@@ -0,0 +1,200 @@
+import bisect
+import sys
+import time
+from array import array
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+# Champs utilisateur exposés par /classement
+LEADERBOARD_KEYS = ("xp", "weekly_xp", "store_credit", "weekly_affiliate_earnings", "affiliate_earnings")
+WEEKLY_KEYS = ("weekly_xp", "weekly_affiliate_earnings")
+
+
+class RankIndex:
+    """
+    Index d'ordre statistique d'un champ : deux tableaux compacts triés par (-valeur, user_id).
+    Le rang d'un utilisateur est sa position (bisect) ; seules les valeurs > 0 sont indexées, comme dans /classement.
+    Au-delà de `max_users`, les plus petites valeurs sont écartées et `floor` retient la plus haute valeur écartée :
+    toute entrée strictement au-dessus a un rang exact.
+    """
+
+    def __init__(self, key: str, max_users: int = 200000):
+        self.key = key
+        self.max_users = max_users
+        self.neg_values = array('d')
+        self.ids = array('q')
+        self.values: Dict[int, float] = {}
+        self.floor = 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def load(self, pairs: Iterable[Tuple[int, float]]):
+        """Construction en bloc (O(n log n)) à partir de couples (user_id, valeur)."""
+        entries = sorted((-value, user_id) for user_id, value in pairs if value > 0)
+        self.floor = 0.0
+        if len(entries) > self.max_users:
+            self.floor = -entries[self.max_users][0]
+            entries = entries[:self.max_users]
+        self.neg_values = array('d', (neg for neg, _ in entries))
+        self.ids = array('q', (user_id for _, user_id in entries))
+        self.values = {user_id: -neg for neg, user_id in entries}
+
+    def _locate(self, neg_value: float, user_id: int) -> int:
+        lo = bisect.bisect_left(self.neg_values, neg_value)
+        hi = bisect.bisect_right(self.neg_values, neg_value, lo)
+        return bisect.bisect_left(self.ids, user_id, lo, hi)
+
+    def position(self, user_id: int) -> Optional[int]:
+        value = self.values.get(user_id)
+        return None if value is None else self._locate(-value, user_id)
+
+    def update(self, user_id: int, value: float):
+        """Applique la nouvelle valeur absolue d'un utilisateur (idempotent)."""
+        old = self.values.get(user_id)
+        if old == value:
+            return
+        if old is not None:
+            index = self._locate(-old, user_id)
+            del self.neg_values[index]
+            del self.ids[index]
+            del self.values[user_id]
+        if value <= 0 or value <= self.floor:
+            return
+        index = self._locate(-value, user_id)
+        self.neg_values.insert(index, -value)
+        self.ids.insert(index, user_id)
+        self.values[user_id] = value
+        if len(self.ids) > self.max_users:
+            evicted_id = self.ids.pop()
+            self.floor = max(self.floor, -self.neg_values.pop())
+            del self.values[evicted_id]
+
+    def reset(self):
+        self.neg_values = array('d')
+        self.ids = array('q')
+        self.values = {}
+        self.floor = 0.0
+
+    def exact_until(self) -> int:
+        """Nombre d'entrées en tête dont le rang est garanti exact."""
+        if self.floor <= 0:
+            return len(self.ids)
+        return bisect.bisect_left(self.neg_values, -self.floor)
+
+    def entries(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        start, stop = max(start, 0), min(stop, len(self.ids))
+        return [{"id": str(self.ids[i]), "value": -self.neg_values[i], "rank": i + 1} for i in range(start, stop)]
+
+    def memory_bytes(self) -> int:
+        """Estimation de l'empreinte mémoire : tableaux + dictionnaire + objets int/float référencés."""
+        dict_objects = len(self.values) * (sys.getsizeof(2 ** 62) + sys.getsizeof(1.0))
+        return self.neg_values.buffer_info()[1] * self.neg_values.itemsize + self.ids.buffer_info()[1] * self.ids.itemsize + sys.getsizeof(self.values) + dict_objects
+
+
+class LeaderboardCache:
+    """
+    Classements en mémoire partagés entre ManagerCog (écritures) et LeaderboardCog (lectures).
+    Pendant une reconstruction depuis Firestore, les écritures sont aussi mises de côté puis rejouées sur le nouvel index.
+    """
+
+    def __init__(self, keys: Iterable[str] = LEADERBOARD_KEYS, max_users: int = 200000):
+        self.keys = tuple(keys)
+        self.boards: Dict[str, RankIndex] = {key: RankIndex(key, max_users) for key in self.keys}
+        self.seeded = False
+        self.seeded_at = 0.0
+        self._pending: Optional[Dict[Tuple[str, int], float]] = None
+        self._pending_resets: set = set()
+        self._columns: Dict[str, List[Tuple[int, float]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_users: int):
+        for board in self.boards.values():
+            board.max_users = max_users
+
+    def get(self, key: str) -> Optional[RankIndex]:
+        return self.boards.get(key)
+
+    @staticmethod
+    def _user_key(user_id: Any) -> Optional[int]:
+        try:
+            return int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+    def publish(self, user_id: Any, field: str, value: Any):
+        board = self.boards.get(field)
+        uid = self._user_key(user_id)
+        if board is None or uid is None or not isinstance(value, (int, float)):
+            return
+        board.update(uid, value)
+        if self._pending is not None:
+            self._pending[(field, uid)] = value
+
+    def begin_seed(self):
+        """Démarre une reconstruction : les lignes arrivent par add_seed_row(), les écritures concurrentes sont notées."""
+        self._pending = {}
+        self._columns = {key: [] for key in self.keys}
+
+    def add_seed_row(self, user_id: Any, data: Dict[str, Any]):
+        uid = self._user_key(user_id)
+        if uid is None:
+            return
+        for key in self.keys:
+            value = data.get(key, 0)
+            if isinstance(value, (int, float)) and value > 0:
+                self._columns[key].append((uid, value))
+
+    def finish_seed(self):
+        """Reconstruit tous les index puis rejoue les écritures survenues pendant la lecture."""
+        for key, pairs in self._columns.items():
+            self.boards[key].load(pairs)
+        for key in self._pending_resets:
+            self.boards[key].reset()
+        pending, self._pending, self._pending_resets, self._columns = self._pending or {}, None, set(), {}
+        for (field, uid), value in pending.items():
+            self.boards[field].update(uid, value)
+        self.seeded = True
+        self.seeded_at = time.monotonic()
+
+    def abort_seed(self):
+        self._pending, self._pending_resets, self._columns = None, set(), {}
+
+    def reset(self, keys: Iterable[str]):
+        for key in keys:
+            if key not in self.boards:
+                continue
+            self.boards[key].reset()
+            if self._pending is not None:
+                # La reconstruction en cours a pu lire les anciennes valeurs : la remise à zéro sera réappliquée
+                self._pending_resets.add(key)
+                self._pending = {k: v for k, v in self._pending.items() if k[0] != key}
+
+    def top(self, key: str, top_n: int, offset: int = 0) -> Optional[List[Dict[str, Any]]]:
+        """Page du classement depuis la mémoire, ou None si l'index ne peut pas la garantir."""
+        board = self.boards.get(key)
+        if not self.seeded or board is None or min(offset + top_n, len(board)) > board.exact_until():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return board.entries(offset, offset + top_n)
+
+    def rank_of(self, key: str, user_id: Any) -> Optional[Dict[str, Any]]:
+        """Rang, total et percentile d'un utilisateur ; None s'il n'est pas classé."""
+        board = self.boards.get(key)
+        uid = self._user_key(user_id)
+        if not self.seeded or board is None or uid is None:
+            return None
+        position = board.position(uid)
+        if position is None or position >= board.exact_until():
+            return None
+        total = len(board)
+        return {"rank": position + 1, "total": total, "value": board.values[uid],
+                "percentile": 100.0 * (total - position) / total}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "seeded": self.seeded, "hits": self.hits, "misses": self.misses,
+            "sizes": {key: len(board) for key, board in self.boards.items()},
+            "memory_bytes": sum(board.memory_bytes() for board in self.boards.values()),
+        }
@@ -0,0 +1,195 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, Any, Optional, Tuple
+
+from utils.metrics import LOOP_LAG, COMPONENT_GAUGE
+
+# Événements d'audit (PEP 578) considérés comme bloquants lorsqu'ils surviennent dans une coroutine
+BLOCKING_AUDIT_EVENTS = {
+    "open": "fichier",
+    "os.listdir": "fichier",
+    "os.scandir": "fichier",
+    "socket.connect": "réseau",
+    "socket.getaddrinfo": "réseau",
+    "socket.gethostbyname": "réseau",
+    "subprocess.Popen": "processus",
+}
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class LoopLagMonitor:
+    """
+    Mesure en continu le retard de la boucle asyncio : une tâche se réveille toutes les `interval` secondes
+    et note l'écart avec l'heure prévue. Un thread de surveillance repère les rappels qui monopolisent la boucle
+    au-delà de `threshold` et journalise la pile du code fautif pendant qu'il bloque encore.
+    """
+
+    def __init__(self, interval: float = 0.25, threshold: float = 0.25, window: int = 2400):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples: deque = deque(maxlen=window)  # retards (s) des derniers réveils
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.task: Optional[asyncio.Task] = None
+        self._heartbeat = time.monotonic()
+        self._stopped = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.task is not None and not self.task.done():
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self.task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def close(self):
+        self._stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - expected)
+            self.samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+
+    def _watch(self):
+        reported = 0.0  # battement déjà signalé : une seule pile par blocage
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked > self.threshold and heartbeat != reported:
+                reported = heartbeat
+                self.stalls += 1
+                self._dump_stack(blocked)
+
+    def _dump_stack(self, blocked: float):
+        frame = sys._current_frames().get(self.loop_thread_id)
+        if frame is None:
+            return
+        task = asyncio.current_task(self.loop) if self.loop is not None else None
+        task_name = task.get_name() if task is not None else "rappel hors tâche"
+        stack = "".join(traceback.format_stack(frame, limit=12))
+        print(f"⚠️ Boucle asyncio bloquée depuis {blocked * 1000:.0f} ms ({task_name}) :\n{stack}", flush=True)
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def current_lag(self) -> float:
+        """Retard récent : le pire des derniers réveils, ou le blocage en cours s'il est plus long."""
+        recent = list(self.samples)[-8:]
+        blocked = time.monotonic() - self._heartbeat - self.interval
+        return max([blocked] + recent + [0.0])
+
+    def percentiles(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+        return {
+            "p50": _percentile(ordered, 0.50),
+            "p95": _percentile(ordered, 0.95),
+            "p99": _percentile(ordered, 0.99),
+            "max": self.max_lag,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """État servi par le serveur de santé (/loop)."""
+        return {
+            "interval_seconds": self.interval,
+            "threshold_seconds": self.threshold,
+            "samples": len(self.samples),
+            "stalls": self.stalls,
+            "lag_seconds": self.percentiles(),
+            "blocking_calls": BLOCKING_CALLS.snapshot() if BLOCKING_CALLS.enabled else None,
+        }
+
+    def collect_metrics(self):
+        for name, value in self.percentiles().items():
+            COMPONENT_GAUGE.set(value, component="event_loop", stat=f"lag_{name}_seconds")
+        COMPONENT_GAUGE.set(self.stalls, component="event_loop", stat="stalls")
+
+
+class BlockingCallDetector:
+    """
+    Mode de débogage (opt-in) : signale les appels fichier/réseau/processus bloquants faits depuis une coroutine,
+    via les hooks d'audit. Un hook d'audit ne peut pas être retiré ; `disable()` le rend inerte.
+    Chaque site d'appel (fichier du projet, ligne) n'est signalé qu'une fois.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._installed = False
+        self._guard = threading.local()
+        self.sites: Dict[Tuple[str, str, int], int] = {}
+
+    def enable(self):
+        self.enabled = True
+        if not self._installed:
+            sys.addaudithook(self._hook)
+            self._installed = True
+
+    def disable(self):
+        self.enabled = False
+
+    def _hook(self, event: str, args: tuple):
+        if not self.enabled or event not in BLOCKING_AUDIT_EVENTS or getattr(self._guard, "active", False):
+            return
+        if event == "socket.connect" and not args[0].getblocking():
+            return  # socket non bloquant (asyncio.open_connection, aiohttp) : la boucle n'attend pas
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # thread de travail (to_thread, pools) ou code synchrone : rien à signaler
+        self._guard.active = True
+        try:
+            self._report(event, args)
+        finally:
+            self._guard.active = False
+
+    def _report(self, event: str, args: tuple):
+        # Premier cadre du projet en remontant la pile (sans lire les sources : pas d'E/S dans le hook)
+        frame = sys._getframe(2)
+        while frame is not None and not (frame.f_code.co_filename.startswith(_PROJECT_ROOT) and frame.f_code.co_filename != __file__):
+            if frame.f_code.co_filename.startswith("<frozen importlib"):
+                return  # lecture des sources d'un import (paresseux) : mesurée par IMPORT_TIMINGS
+            frame = frame.f_back
+        if frame is None:
+            return  # appel interne à une bibliothèque, hors de notre code
+        filename = os.path.relpath(frame.f_code.co_filename, _PROJECT_ROOT)
+        site = (event, filename, frame.f_lineno)
+        count = self.sites.get(site, 0)
+        self.sites[site] = count + 1
+        if count == 0:
+            target = f" {args[0]!r}" if args and isinstance(args[0], (str, bytes)) else ""
+            print(f"⚠️ Appel bloquant ({BLOCKING_AUDIT_EVENTS[event]}) '{event}'{target} depuis une coroutine : "
+                  f"{filename}:{frame.f_lineno} ({frame.f_code.co_name})", flush=True)
+
+    def snapshot(self) -> list:
+        return [{"event": event, "site": f"{filename}:{line}", "count": count}
+                for (event, filename, line), count in sorted(self.sites.items(), key=lambda item: item[1], reverse=True)]
+
+
+BLOCKING_CALLS = BlockingCallDetector()
@@ -0,0 +1,242 @@
+import bisect
+import functools
+import math
+import threading
+import time
+from typing import Dict, Any, List, Optional, Callable, Iterable, Tuple
+
+# Bornes (secondes) des histogrammes de latence, de l'appel en mémoire au traitement de fond
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()  # les workers (to_thread, pools) peuvent aussi publier
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in sorted(self.values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in sorted(self.values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # clé -> [compteurs par borne (non cumulés), somme, total]
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels) -> '_Timer':
+        return _Timer(self, labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class _Timer:
+    """Chronomètre utilisable en `with` ou `async with` ; n'observe qu'une fois le bloc terminé."""
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, Any]):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+
+class MetricsRegistry:
+    """Registre des métriques, rendu au format texte Prometheus par /metrics."""
+
+    def __init__(self, prefix: str = "resellboost"):
+        self.prefix = prefix
+        self.metrics: Dict[str, _Metric] = {}
+        # Fonctions appelées juste avant chaque rendu (ex: statistiques de caches des cogs)
+        self.collectors: Dict[str, Callable[[], None]] = {}
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        full_name = f"{self.prefix}_{name}"
+        metric = self.metrics.get(full_name)
+        if metric is None:
+            metric = self.metrics[full_name] = cls(full_name, *args, **kwargs)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def register_collector(self, name: str, collector: Callable[[], None]):
+        self.collectors[name] = collector
+
+    def unregister_collector(self, name: str):
+        self.collectors.pop(name, None)
+
+    def render(self) -> str:
+        for name, collector in list(self.collectors.items()):
+            try:
+                collector()
+            except Exception as e:
+                print(f"Erreur du collecteur de métriques '{name}': {e}")
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# --- Métriques partagées ---
+EVENT_DURATION = REGISTRY.histogram("gateway_event_duration_seconds", "Durée de traitement d'un événement gateway par listener.", ("event", "listener"))
+EVENT_ERRORS = REGISTRY.counter("gateway_event_errors_total", "Exceptions levées par les listeners.", ("event", "listener"))
+COMMAND_LATENCY = REGISTRY.histogram("app_command_latency_seconds", "Latence des commandes slash, de la création de l'interaction à la fin du callback.", ("command",))
+COMMAND_ERRORS = REGISTRY.counter("app_command_errors_total", "Commandes slash terminées en erreur.", ("command",))
+FIRESTORE_LATENCY = REGISTRY.histogram("firestore_operation_duration_seconds", "Latence des opérations Firestore.", ("collection", "operation"))
+FIRESTORE_ERRORS = REGISTRY.counter("firestore_operation_errors_total", "Opérations Firestore en erreur.", ("collection", "operation"))
+FIRESTORE_DOCUMENTS = REGISTRY.counter("firestore_documents_read_total", "Documents lus (get, stream, get_all).", ("collection",))
+AI_LATENCY = REGISTRY.histogram("ai_request_duration_seconds", "Latence des appels Gemini (file d'attente et nouvelles tentatives comprises).", ("model", "feature", "outcome"))
+AI_QUEUE_WAIT = REGISTRY.histogram("ai_queue_wait_seconds", "Attente d'une place de concurrence avant un appel Gemini.", ("priority",))
+AI_RETRIES = REGISTRY.counter("ai_retries_total", "Nouvelles tentatives d'appels Gemini après une erreur transitoire.", ("feature",))
+AI_TOKENS = REGISTRY.counter("ai_tokens_total", "Jetons Gemini consommés (comptés par le SDK, estimés à défaut).", ("model", "feature", "kind"))
+TASK_DURATION = REGISTRY.histogram("background_task_duration_seconds", "Durée d'une itération de tâche de fond.", ("task",))
+TASK_ERRORS = REGISTRY.counter("background_task_errors_total", "Itérations de tâches de fond en erreur.", ("task",))
+LOOP_LAG = REGISTRY.histogram("event_loop_lag_seconds", "Retard de réveil de la boucle asyncio (temps pendant lequel elle était occupée).",
+                              buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+COMPONENT_GAUGE = REGISTRY.gauge("component_state", "État instantané des composants (tailles de files, de caches, mémoire).", ("component", "stat"))
+CACHE_HITS = REGISTRY.gauge("cache_hits", "Succès cumulés des caches en mémoire.", ("cache",))
+CACHE_MISSES = REGISTRY.gauge("cache_misses", "Échecs cumulés des caches en mémoire.", ("cache",))
+CACHE_HIT_RATIO = REGISTRY.gauge("cache_hit_ratio", "Taux de succès des caches en mémoire.", ("cache",))
+
+
+def record_cache(cache: str, hits: int, misses: int):
+    """Publie les compteurs d'un cache (appelé par les collecteurs)."""
+    CACHE_HITS.set(hits, cache=cache)
+    CACHE_MISSES.set(misses, cache=cache)
+    total = hits + misses
+    CACHE_HIT_RATIO.set(hits / total if total else 0.0, cache=cache)
+
+
+def timed_task(name: Optional[str] = None):
+    """
+    Décorateur pour les coroutines de tasks.loop : mesure chaque itération (à placer sous @tasks.loop)
+    et lui impute les opérations Firestore effectuées.
+    """
+    from utils.firestore_accounting import attributed  # import différé : firestore_accounting dépend de ce module
+
+    def decorator(func):
+        task_name = name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with attributed(f"task:{task_name}"):
+                    return await func(*args, **kwargs)
+            except Exception:
+                TASK_ERRORS.inc(task=task_name)
+                raise
+            finally:
+                TASK_DURATION.observe(time.perf_counter() - start, task=task_name)
+        return wrapper
+    return decorator
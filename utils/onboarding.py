@@ -0,0 +1,145 @@
+import asyncio
+import time
+from collections import Counter
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+
+import discord
+from google.cloud.firestore_v1.async_transaction import async_transactional
+
+from utils.firestore_accounting import set_origin
+
+# Limite Firestore : 500 écritures par lot ou transaction
+FIRESTORE_BATCH_LIMIT = 500
+
+
+class OnboardingQueue:
+    """
+    File d'accueil des nouveaux membres. on_member_join se contente d'y déposer le membre ;
+    un worker traite les arrivées par lots : rôles appliqués avec une concurrence bornée, documents
+    utilisateurs créés par une transaction (une lecture groupée + ses écritures), parrainages crédités une fois par parrain.
+    """
+
+    def __init__(self, db: Any,
+                 default_user_data: Callable[[], Dict[str, Any]],
+                 attribute: Callable[[discord.Member], Awaitable[Optional[discord.abc.User]]],
+                 credit_referrals: Callable[[discord.abc.User, List[discord.Member]], Awaitable[None]]):
+        self.db = db
+        self.default_user_data = default_user_data
+        self.attribute = attribute
+        self.credit_referrals = credit_referrals
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.worker: Optional[asyncio.Task] = None
+        self.counters: Counter = Counter()
+        self.configure({})
+
+    def configure(self, onboarding_config: Dict[str, Any]):
+        self.batch_size = min(onboarding_config.get("BATCH_SIZE", 200), FIRESTORE_BATCH_LIMIT)
+        self.flush_seconds = onboarding_config.get("FLUSH_SECONDS", 2.0)
+        self.role_concurrency = onboarding_config.get("ROLE_CONCURRENCY", 5)
+
+    def start(self):
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._run())
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker = None
+
+    def enqueue(self, member: discord.Member, role: Optional[discord.Role] = None):
+        """Appelé depuis on_member_join : ne fait aucun appel réseau."""
+        self.queue.put_nowait((member, role))
+        self.counters["enqueued"] += 1
+        self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], self.queue.qsize())
+
+    async def _next_batch(self) -> List[Tuple[discord.Member, Optional[discord.Role]]]:
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        set_origin("worker:onboarding")
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._process(batch)
+            except Exception as e:
+                self.counters["failed_batches"] += 1
+                print(f"Erreur lors du traitement d'un lot d'arrivées ({len(batch)} membres): {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _apply_roles(self, batch: List[Tuple[discord.Member, Optional[discord.Role]]]):
+        semaphore = asyncio.Semaphore(self.role_concurrency)
+
+        async def apply(member: discord.Member, role: discord.Role):
+            async with semaphore:
+                try:
+                    await member.add_roles(role, reason="Nouveau membre")
+                    self.counters["roles_applied"] += 1
+                except discord.Forbidden:
+                    self.counters["role_failures"] += 1
+                    print(f"Permissions manquantes pour assigner le rôle '{role.name}' à {member.name}")
+                except discord.HTTPException as e:
+                    self.counters["role_failures"] += 1
+                    print(f"Erreur lors de l'assignation du rôle à {member.name}: {e}")
+
+        await asyncio.gather(*(apply(member, role) for member, role in batch if role is not None))
+
+    async def _process(self, batch: List[Tuple[discord.Member, Optional[discord.Role]]]):
+        members = [member for member, _ in batch]
+        # Rôles et attribution des invitations en parallèle ; les attributions d'un même lot partagent un appel REST
+        _, inviters = await asyncio.gather(
+            self._apply_roles(batch),
+            asyncio.gather(*(self.attribute(member) for member in members)),
+        )
+
+        refs = [self.db.collection('users').document(str(member.id)) for member in members]
+        referrers = [inviter if inviter is not None and inviter.id != member.id else None for member, inviter in zip(members, inviters)]
+
+        @async_transactional
+        async def create_users(trans) -> int:
+            # Lecture et écritures dans la même transaction : un document créé entre-temps
+            # (premier message du membre -> grant_xp) fait rejouer l'essai au lieu d'être écrasé
+            existing = {snapshot.id async for snapshot in self.db.get_all(refs, transaction=trans) if snapshot.exists}
+            created = 0
+            for ref, referrer in zip(refs, referrers):
+                if ref.id not in existing:
+                    data = self.default_user_data()
+                    if referrer:
+                        data["referrer"] = str(referrer.id)
+                    trans.set(ref, data)
+                    created += 1
+                elif referrer:
+                    trans.set(ref, {"referrer": str(referrer.id)}, merge=True)
+            return created
+
+        self.counters["users_created"] += await create_users(self.db.transaction())
+        referrals: Dict[int, Tuple[discord.abc.User, List[discord.Member]]] = {}
+        for member, referrer in zip(members, referrers):
+            if referrer:
+                referrals.setdefault(referrer.id, (referrer, []))[1].append(member)
+        self.counters["batches"] += 1
+        self.counters["processed"] += len(batch)
+
+        # Une transaction par parrain, même s'il a amené plusieurs membres dans le lot
+        results = await asyncio.gather(*(self.credit_referrals(inviter, invited) for inviter, invited in referrals.values()), return_exceptions=True)
+        for (inviter, invited), result in zip(referrals.values(), results):
+            if isinstance(result, Exception):
+                self.counters["referral_failures"] += 1
+                print(f"Erreur de crédit de parrainage pour {inviter.name} ({len(invited)} membres): {result}")
+            else:
+                self.counters["referrals_credited"] += len(invited)
+                print(f"{', '.join(m.name for m in invited)} invité(s) par {inviter.name}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.counters, "queue_depth": self.queue.qsize()}
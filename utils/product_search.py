@@ -0,0 +1,153 @@
+import re
+import unicodedata
+from typing import Dict, Any, List, Iterable, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Poids des correspondances, du plus précis au plus approximatif
+EXACT_ID, ID_PREFIX, NAME_START, TOKEN_PREFIX, FUZZY = 100, 80, 60, 40, 15
+
+
+def normalize(text: str) -> str:
+    """Minuscules sans accents : 'Réseaux' -> 'reseaux'."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def _deletions(token: str) -> Set[str]:
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+class _TrieNode:
+    __slots__ = ("children", "products")
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.products: List[int] = []
+
+
+class ProductSearchIndex:
+    """
+    Index d'autocomplétion du catalogue : trie de préfixes sur les jetons des ids, noms et tags,
+    plus un index de suppressions (distance d'édition 1) pour tolérer les fautes de frappe.
+    Chaque nœud du trie garde au plus `node_cap` produits candidats : une requête ne parcourt jamais un sous-arbre.
+    """
+
+    def __init__(self, node_cap: int = 200, fuzzy_min_length: int = 4):
+        self.node_cap = node_cap
+        self.fuzzy_min_length = fuzzy_min_length
+        self.products: List[Dict[str, Any]] = []
+        self.product_tokens: List[Tuple[str, ...]] = []
+        self.name_starts: List[str] = []
+        self.root = _TrieNode()
+        self.vocabulary: Dict[str, Set[int]] = {}
+        self.deletion_index: Dict[str, Set[str]] = {}
+
+    def build(self, products: Iterable[Dict[str, Any]]):
+        # Ordre d'insertion = ordre de priorité des candidats gardés dans chaque nœud
+        self.products = sorted((p for p in products if p.get('id')), key=lambda p: (len(p.get('name', '')), p.get('name', '')))
+        self.product_tokens = []
+        self.name_starts = []
+        self.root = _TrieNode()
+        self.vocabulary = {}
+        self.deletion_index = {}
+        for index, product in enumerate(self.products):
+            name_tokens = tokenize(product.get('name', ''))
+            self.name_starts.append(name_tokens[0] if name_tokens else "")
+            tokens = [normalize(product['id'])] + tokenize(product['id']) + name_tokens
+            for tag in product.get('tags', []):
+                tokens.extend(tokenize(tag))
+            unique = tuple(dict.fromkeys(tokens))
+            self.product_tokens.append(unique)
+            for token in unique:
+                self._insert(token, index)
+                self.vocabulary.setdefault(token, set()).add(index)
+        for token in self.vocabulary:
+            if len(token) >= self.fuzzy_min_length:
+                for deletion in _deletions(token):
+                    self.deletion_index.setdefault(deletion, set()).add(token)
+
+    def _insert(self, token: str, index: int):
+        node = self.root
+        for char in token:
+            node = node.children.setdefault(char, _TrieNode())
+            if len(node.products) < self.node_cap and (not node.products or node.products[-1] != index):
+                node.products.append(index)
+
+    def _prefix_candidates(self, prefix: str) -> List[int]:
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.products
+
+    def _fuzzy_tokens(self, token: str) -> Set[str]:
+        """Jetons du vocabulaire à une distance d'édition 1 (insertion, suppression, substitution)."""
+        if len(token) < self.fuzzy_min_length - 1:
+            return set()
+        matches: Set[str] = set()
+        if token in self.deletion_index:          # le jeton saisi a perdu un caractère
+            matches |= self.deletion_index[token]
+        for deletion in _deletions(token):
+            if deletion in self.vocabulary:       # le jeton saisi a un caractère en trop
+                matches.add(deletion)
+            matches |= self.deletion_index.get(deletion, set())  # substitution
+        matches.discard(token)
+        return matches
+
+    def _score(self, index: int, query: str, query_tokens: List[str], fuzzy: Dict[str, Set[str]]) -> int:
+        tokens = self.product_tokens[index]
+        product_id = tokens[0]
+        if product_id == query:
+            return EXACT_ID
+        score = ID_PREFIX if product_id.startswith(query) else 0
+        if self.name_starts[index].startswith(query_tokens[0]):
+            score = max(score, NAME_START)
+        total = 0
+        for query_token in query_tokens:
+            if any(token.startswith(query_token) for token in tokens):
+                total += TOKEN_PREFIX
+            elif fuzzy.get(query_token) and any(token in fuzzy[query_token] for token in tokens):
+                total += FUZZY
+            else:
+                return 0  # chaque mot de la requête doit correspondre à quelque chose
+        return score + total
+
+    def search(self, query: str, limit: int = 25) -> List[Dict[str, Any]]:
+        query_tokens = tokenize(query)
+        if not query_tokens:
+            return self.products[:limit]
+        normalized = normalize(query.strip())
+
+        # Candidats : préfixe du jeton le plus sélectif (le moins de candidats : un nœud plein à node_cap en omet),
+        # complétés par les variantes approchées
+        candidates: Set[int] = set(self._prefix_candidates(normalized))
+        prefixes = {token: self._prefix_candidates(token) for token in query_tokens}
+        anchor = min(query_tokens, key=lambda token: (len(prefixes[token]), -len(token)))
+        candidates.update(prefixes[anchor])
+        fuzzy: Dict[str, Set[str]] = {}
+        if len(candidates) < limit:
+            for query_token in query_tokens:
+                fuzzy[query_token] = self._fuzzy_tokens(query_token)
+            for token in fuzzy.get(anchor, ()):
+                candidates.update(self.vocabulary[token])
+
+        scored = []
+        for index in candidates:
+            score = self._score(index, normalized, query_tokens, fuzzy)
+            if score:
+                scored.append((-score, index))
+        scored.sort()
+        return [self.products[index] for _, index in scored[:limit]]
+
+    def best_match(self, query: str) -> Optional[Dict[str, Any]]:
+        results = self.search(query, limit=1)
+        return results[0] if results else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"products": len(self.products), "tokens": len(self.vocabulary), "deletions": len(self.deletion_index)}
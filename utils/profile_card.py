@@ -0,0 +1,181 @@
+import asyncio
+import io
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+
+from utils.lazy_imports import LazyModule, module_available
+
+# Pillow n'est importé qu'au premier rendu (dans les processus du pool), pas au démarrage du bot
+IMAGING_AVAILABLE = module_available("PIL")
+Image = LazyModule("PIL.Image")
+ImageDraw = LazyModule("PIL.ImageDraw")
+ImageFont = LazyModule("PIL.ImageFont")
+ImageOps = LazyModule("PIL.ImageOps")
+
+CARD_SIZE = (900, 300)
+AVATAR_SIZE = 200
+FONT_CANDIDATES = ("DejaVuSans-Bold.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", "arial.ttf")
+
+# --- Rendu (exécuté dans les processus du pool, jamais sur la boucle d'événements) ---
+# Les caches ci-dessous vivent dans chaque processus worker et survivent d'une carte à l'autre.
+
+def _hex_to_rgb(value: str) -> Tuple[int, int, int]:
+    value = value.lstrip('#')
+    return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+
+@lru_cache(maxsize=32)
+def _background(palette: Tuple[Tuple[str, str], ...]) -> 'Image.Image':
+    """Fond pré-rendu (couleur, panneau, emplacement de barre) pour une palette donnée."""
+    colors = dict(palette)
+    img = Image.new("RGBA", CARD_SIZE, _hex_to_rgb(colors["background"]))
+    draw = ImageDraw.Draw(img)
+    draw.rounded_rectangle((20, 20, CARD_SIZE[0] - 20, CARD_SIZE[1] - 20), radius=24, fill=_hex_to_rgb(colors["surface"]))
+    draw.rounded_rectangle((270, 200, CARD_SIZE[0] - 50, 230), radius=15, fill=_hex_to_rgb(colors["background"]))
+    return img
+
+@lru_cache(maxsize=16)
+def _font(size: int) -> 'ImageFont.ImageFont':
+    for candidate in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+_avatar_cache: 'OrderedDict[str, Image.Image]' = OrderedDict()
+_AVATAR_CACHE_SIZE = 256
+
+@lru_cache(maxsize=1)
+def _avatar_mask() -> 'Image.Image':
+    mask = Image.new("L", (AVATAR_SIZE, AVATAR_SIZE), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, AVATAR_SIZE, AVATAR_SIZE), fill=255)
+    return mask
+
+def _avatar(key: str, data: Optional[bytes]) -> Optional['Image.Image']:
+    """Avatar décodé, redimensionné et détouré, mis en cache LRU par clé (utilisateur + hash d'avatar)."""
+    if key in _avatar_cache:
+        _avatar_cache.move_to_end(key)
+        return _avatar_cache[key]
+    if not data:
+        return None
+    avatar = ImageOps.fit(Image.open(io.BytesIO(data)).convert("RGBA"), (AVATAR_SIZE, AVATAR_SIZE))
+    avatar.putalpha(_avatar_mask())
+    _avatar_cache[key] = avatar
+    while len(_avatar_cache) > _AVATAR_CACHE_SIZE:
+        _avatar_cache.popitem(last=False)
+    return avatar
+
+def render_profile_card(card: Dict[str, Any]) -> Tuple[bytes, float]:
+    """Rend une carte de profil en PNG. Fonction pure et picklable : renvoie (octets PNG, durée en secondes)."""
+    start = time.perf_counter()
+    palette = card["palette"]
+    text_color = _hex_to_rgb(palette["text"])
+    accent = _hex_to_rgb(palette["accent"])
+
+    img = _background(tuple(sorted(palette.items()))).copy()
+    draw = ImageDraw.Draw(img)
+
+    avatar = _avatar(card["avatar_key"], card.get("avatar_bytes"))
+    if avatar is not None:
+        img.paste(avatar, (45, 50), avatar)
+    else:
+        draw.ellipse((45, 50, 45 + AVATAR_SIZE, 50 + AVATAR_SIZE), fill=accent)
+
+    draw.text((270, 45), card["display_name"][:28], font=_font(40), fill=text_color)
+    draw.text((270, 100), f"Niveau {card['level']}", font=_font(28), fill=accent)
+    draw.text((270, 145), f"{card['store_credit']:.2f} crédits  •  {card['affiliate_earnings']:.2f} € d'affiliation", font=_font(22), fill=text_color)
+
+    progress = max(0.0, min(1.0, card["xp"] / card["xp_needed"])) if card["xp_needed"] else 1.0
+    bar_end = 270 + int((CARD_SIZE[0] - 50 - 270) * progress)
+    if bar_end > 285:
+        draw.rounded_rectangle((270, 200, bar_end, 230), radius=15, fill=accent)
+    draw.text((270, 240), f"{card['xp']} / {card['xp_needed']} XP", font=_font(20), fill=text_color)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", compress_level=1)  # compression légère : l'encodage domine le temps de rendu
+    return buffer.getvalue(), time.perf_counter() - start
+
+
+class ProfileCardRenderer:
+    """Génère les cartes de profil dans un pool de processus, sans bloquer la boucle d'événements."""
+
+    def __init__(self, card_config: Dict[str, Any], max_workers: int = 2, avatar_cache_size: int = 512):
+        self.max_workers = max_workers
+        self.avatar_cache_size = avatar_cache_size
+        self.avatar_cache: 'OrderedDict[str, bytes]' = OrderedDict()
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.metrics = {"rendered": 0, "failed": 0, "render_seconds_total": 0.0, "render_seconds_max": 0.0,
+                        "wall_seconds_total": 0.0, "avatar_cache_hits": 0, "avatar_cache_misses": 0}
+        self.configure(card_config)
+
+    def configure(self, card_config: Dict[str, Any]):
+        self.default_palette = card_config.get("DEFAULT_PALETTE", {"background": "#111827", "surface": "#1f2937", "text": "#f9fafb", "accent": "#3b82f6"})
+        self.level_palettes = sorted(card_config.get("LEVEL_PALETTES", []), key=lambda p: p.get("level", 0), reverse=True)
+
+    def palette_for_level(self, level: int) -> Dict[str, str]:
+        return next((p["palette"] for p in self.level_palettes if level >= p.get("level", 999)), self.default_palette)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            # 'spawn' évite de dupliquer l'état de la boucle asyncio et des sockets du processus parent
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    async def _fetch_avatar(self, member: Any) -> Tuple[str, Optional[bytes]]:
+        asset = member.display_avatar
+        key = f"{member.id}:{asset.key}"
+        if key in self.avatar_cache:
+            self.avatar_cache.move_to_end(key)
+            self.metrics["avatar_cache_hits"] += 1
+            return key, self.avatar_cache[key]
+        self.metrics["avatar_cache_misses"] += 1
+        try:
+            data = await asset.replace(size=256, format="png").read()
+        except Exception as e:
+            print(f"Erreur téléchargement avatar {member.id}: {e}")
+            return key, None
+        self.avatar_cache[key] = data
+        while len(self.avatar_cache) > self.avatar_cache_size:
+            self.avatar_cache.popitem(last=False)
+        return key, data
+
+    async def render(self, member: Any, user_data: Dict[str, Any], xp_needed: int) -> io.BytesIO:
+        """Renvoie la carte PNG de `member` dans un BytesIO prêt pour discord.File."""
+        start = time.perf_counter()
+        avatar_key, avatar_bytes = await self._fetch_avatar(member)
+        level = user_data.get("level", 1)
+        card = {
+            "display_name": member.display_name, "level": level,
+            "xp": int(user_data.get("xp", 0)), "xp_needed": xp_needed,
+            "store_credit": float(user_data.get("store_credit", 0.0)),
+            "affiliate_earnings": float(user_data.get("affiliate_earnings", 0.0)),
+            "palette": self.palette_for_level(level),
+            "avatar_key": avatar_key, "avatar_bytes": avatar_bytes,
+        }
+        try:
+            png, render_seconds = await asyncio.get_running_loop().run_in_executor(self._get_executor(), render_profile_card, card)
+        except Exception:
+            self.metrics["failed"] += 1
+            raise
+        self.metrics["rendered"] += 1
+        self.metrics["render_seconds_total"] += render_seconds
+        self.metrics["render_seconds_max"] = max(self.metrics["render_seconds_max"], render_seconds)
+        self.metrics["wall_seconds_total"] += time.perf_counter() - start
+        return io.BytesIO(png)
+
+    def stats(self) -> Dict[str, Any]:
+        rendered = self.metrics["rendered"]
+        return {
+            **self.metrics,
+            "render_ms_avg": (self.metrics["render_seconds_total"] / rendered * 1000) if rendered else 0.0,
+            "wall_ms_avg": (self.metrics["wall_seconds_total"] / rendered * 1000) if rendered else 0.0,
+        }
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
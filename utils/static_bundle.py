@@ -0,0 +1,112 @@
+import gzip
+import hashlib
+import json
+from typing import Dict, Any, Optional, Tuple
+
+# Dépendance optionnelle : compression brotli
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+BUNDLE_NAME = "bundle"
+
+
+_ETAG_SUFFIXES = {"identity": "", "gzip": "-gz", "br": "-br"}
+
+
+class _Payload:
+    __slots__ = ("etags", "encodings")
+
+    def __init__(self, body: bytes):
+        # Variantes pré-compressées une fois pour toutes : aucune compression à la requête
+        self.encodings: Dict[str, bytes] = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if BROTLI_AVAILABLE:
+            self.encodings["br"] = brotli.compress(body, quality=11)
+        # ETag fort par représentation : les octets de chaque encodage diffèrent
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etags: Dict[str, str] = {encoding: f'"{digest}{_ETAG_SUFFIXES[encoding]}"' for encoding in self.encodings}
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class StaticDataBundle:
+    """
+    Fichiers JSON du tableau de bord servis par le serveur aiohttp du bot : chaque fichier et un paquet
+    regroupant tous les fichiers, pré-compressés (gzip, brotli si disponible) avec un ETag fort par encodage.
+    Reconstruit par rebuild() à chaque rechargement des données.
+    """
+
+    def __init__(self, files: Dict[str, str], max_age: int = 60):
+        self.files = files
+        self.max_age = max_age
+        self.payloads: Dict[str, _Payload] = {}
+        self.counters = {"requests": 0, "not_modified": 0, "bytes_sent": 0, "bytes_saved": 0}
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.payloads)
+
+    def rebuild(self):
+        """Relit les fichiers et régénère toutes les variantes. Bloquant : appeler via asyncio.to_thread."""
+        payloads, bundle = {}, {}
+        for name, path in self.files.items():
+            try:
+                with open(path, 'rb') as f:
+                    raw = f.read()
+                bundle[name] = json.loads(raw)
+            except (FileNotFoundError, json.JSONDecodeError) as e:
+                print(f"Erreur chargement fichier statique {path}: {e}")
+                continue
+            payloads[name] = _Payload(raw)
+        payloads[BUNDLE_NAME] = _Payload(json.dumps(bundle, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self.payloads = payloads
+
+    def respond(self, name: str, if_none_match: Optional[str], accept_encoding: Optional[str]) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """(statut, en-têtes, corps) pour une requête, ou None si le fichier est inconnu."""
+        payload = self.payloads.get(name)
+        if payload is None:
+            return None
+        self.counters["requests"] += 1
+        accepted = _accepted_encodings(accept_encoding or "")
+        encoding = next((e for e in ("br", "gzip") if e in payload.encodings and accepted.get(e, accepted.get("*", 0)) > 0), "identity")
+        headers = {
+            "ETag": payload.etags[encoding],
+            "Cache-Control": f"public, max-age={self.max_age}, must-revalidate",
+            "Vary": "Accept-Encoding",
+        }
+        if if_none_match:
+            # Comparaison faible, comme l'exige If-None-Match ; toute variante du même contenu est acceptée
+            candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in candidates or not candidates.isdisjoint(payload.etags.values()):
+                self.counters["not_modified"] += 1
+                self.counters["bytes_saved"] += len(payload.encodings["identity"])
+                return 304, headers, b""
+
+        body = payload.encodings[encoding]
+        headers["Content-Type"] = "application/json; charset=utf-8"
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        self.counters["bytes_sent"] += len(body)
+        self.counters["bytes_saved"] += len(payload.encodings["identity"]) - len(body)
+        return 200, headers, body
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = {name: {enc: len(body) for enc, body in p.encodings.items()} for name, p in self.payloads.items()}
+        return {**self.counters, "brotli": BROTLI_AVAILABLE, "sizes": sizes}